@@ -1,6 +1,7 @@
 # api/balance_history.py
 
 from flask import Blueprint, jsonify
+from api.responses import respond
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from dal.balance_history import BalanceHistoryDAL
 from dal.users import UserDAL
@@ -29,15 +30,15 @@ def get_engineer_balance_history(engineer_id: int):
             return jsonify({'error': history}), 500
 
         if not history:  # пустая история
-            return jsonify({
+            return respond({
                 'message': 'No balance history found for this engineer',
                 'history': []
-            }), 200
+            })
 
-        return jsonify({
+        return respond({
             'engineer_id': engineer_id,
             'history': history
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching balance history: {e}")
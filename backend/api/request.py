@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
+from api.responses import respond
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from dal.request import RequestDAL
+from dal.request import RequestDAL, parse_fields
+from dal.query_builder import RequestFilter, parse_sort
 from dal.users import UserDAL
 import logging
 from datetime import datetime, time
@@ -87,22 +89,28 @@ def my_requests():
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
 
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Фильтруем по status_id = 2 и 3
         requests = RequestDAL.get_requests_by_engineer(
             engineer_id=current_user_id,
             status_ids=[2, 3, 4],
-            date_filter=date_filter
+            date_filter=date_filter,
+            fields=fields
         )
 
         if isinstance(requests, str):  # Ошибка
             return jsonify({'error': requests}), 500
 
-        return jsonify({
+        return respond({
             "engineer_id": current_user_id,
             "total": len(requests),
             "date_filter": date_str,
             "requests": requests
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching requests: {e}")
@@ -120,24 +128,57 @@ def my_completed_requests(page: int):
 
         per_page = 10
 
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Получаем данные и общее количество
-        data = RequestDAL.get_completed_requests_with_total(current_user_id, page, per_page)
+        data = RequestDAL.get_completed_requests_with_total(current_user_id, page, per_page, fields=fields)
 
         if isinstance(data, str):  # Ошибка
             return jsonify({'error': data}), 500
 
-        return jsonify({
+        return respond({
             "engineer_id": current_user_id,
             "page": page,
             "per_page": per_page,
             "total": data['total'],
             "requests": data['requests']
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching completed requests: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@requests_bp.route('/<int:request_id>', methods=['GET'])
+@jwt_required()
+def get_request(request_id: int):
+    try:
+        current_user_id = get_jwt_identity()
+        user = UserDAL.get_user_by_id(current_user_id)
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        result = RequestDAL.get_request_by_id(request_id)
+
+        if isinstance(result, str):  # Ошибка
+            return jsonify({'error': result}), 500
+
+        if not result:
+            return jsonify({'error': 'Request not found'}), 404
+
+        # Инженер видит только назначенные ему заявки
+        if user['role_id'] == 1 and result['engineer_id'] != int(current_user_id):
+            return jsonify({'error': 'Access denied'}), 403
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching request {request_id}: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @requests_bp.route('/engineer/<int:request_id>', methods=['PUT'])
 @jwt_required()
 def update_request(request_id: int):
@@ -202,7 +243,7 @@ def get_completed_requests():
             if isinstance(count, str):
                 return jsonify({'error': count}), 500
 
-            return jsonify({
+            return respond({
                 'engineer_id': current_user_id,
                 'engineer_name': user['name'],
                 'total_completed': count,
@@ -210,7 +251,7 @@ def get_completed_requests():
                     'start_date': start_date.isoformat(),
                     'end_date': end_date.isoformat()
                 }
-            }), 200
+            })
 
         elif role_id == 3:  # Менеджер — все инженеры
             engineer_list = RequestDAL.count_all_engineers_completed_requests(start_date, end_date)
@@ -218,7 +259,7 @@ def get_completed_requests():
             if isinstance(engineer_list, str):
                 return jsonify({'error': engineer_list}), 500
 
-            return jsonify({
+            return respond({
                 'manager_id': current_user_id,
                 'manager_name': user['name'],
                 'reports': engineer_list,
@@ -226,7 +267,7 @@ def get_completed_requests():
                     'start_date': start_date.isoformat(),
                     'end_date': end_date.isoformat()
                 }
-            }), 200
+            })
 
         else:
             return jsonify({'error': 'Access denied'}), 403
@@ -279,37 +320,43 @@ def filter_requests():
         if not user or user['role_id'] not in [2, 3]:  # менеджер или оператор
             return jsonify({'error': 'Access denied'}), 403
 
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
 
         # Парсим параметры из JSON
         engineer_id = data.get('engineer_id')
+        engineer_ids = data.get('engineer_ids')  # Несколько инженеров сразу
+        if engineer_id is not None and not engineer_ids:
+            engineer_ids = [engineer_id]
         status_ids = data.get('status_ids')  # Ожидаем список чисел
-        start_date_str = data.get('start_date')  # Формат: "YYYY-MM-DD"
-        end_date_str = data.get('end_date')      # Формат: "YYYY-MM-DD"
+        operator_id = data.get('operator_id')
         page = data.get('page', 1)
         per_page = data.get('per_page', 10)
 
-        # Конвертируем даты без времени
-        start_date = None
-        end_date = None
-
-        if start_date_str:
-            try:
-                start_date = datetime.combine(
-                    datetime.fromisoformat(start_date_str).date(),
-                    time.min
-                )
-            except ValueError:
-                return jsonify({'error': 'Invalid date format for start_date. Use YYYY-MM-DD'}), 400
+        for name, value in (('engineer_ids', engineer_ids), ('status_ids', status_ids)):
+            if value is not None and (not isinstance(value, list) or not all(isinstance(v, int) for v in value)):
+                return jsonify({'error': f'{name} must be a list of integers'}), 400
+        if operator_id is not None and not isinstance(operator_id, int):
+            return jsonify({'error': 'operator_id must be an integer'}), 400
 
-        if end_date_str:
+        try:
+            fields = parse_fields(data.get('fields', request.args.get('fields')))
+            sort = parse_sort(data.get('sort'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Конвертируем даты без времени: начало периода — 00:00, конец — 23:59:59.999999
+        dates = {}
+        for name, bound in (('start_date', time.min), ('end_date', time.max),
+                            ('assigned_start', time.min), ('assigned_end', time.max),
+                            ('done_start', time.min), ('done_end', time.max)):
+            value = data.get(name)
+            if not value:
+                dates[name] = None
+                continue
             try:
-                end_date = datetime.combine(
-                    datetime.fromisoformat(end_date_str).date(),
-                    time.max
-                )
-            except ValueError:
-                return jsonify({'error': 'Invalid date format for end_date. Use YYYY-MM-DD'}), 400
+                dates[name] = datetime.combine(datetime.fromisoformat(value).date(), bound)
+            except (TypeError, ValueError):
+                return jsonify({'error': f'Invalid date format for {name}. Use YYYY-MM-DD'}), 400
 
         # Проверяем типы
         if not isinstance(page, int) or page < 1:
@@ -317,44 +364,52 @@ def filter_requests():
         if not isinstance(per_page, int) or per_page < 1 or per_page > 100:
             per_page = 10
 
-        # Получаем общее количество записей
-        total = RequestDAL.get_filtered_requests_total(
-            engineer_id=engineer_id,
+        filters = RequestFilter(
+            engineer_ids=engineer_ids,
             status_ids=status_ids,
-            start_date=start_date,
-            end_date=end_date
+            operator_id=operator_id,
+            creation_from=dates['start_date'],
+            creation_to=dates['end_date'],
+            assigned_from=dates['assigned_start'],
+            assigned_to=dates['assigned_end'],
+            done_from=dates['done_start'],
+            done_to=dates['done_end']
         )
 
+        # Получаем общее количество записей
+        total = RequestDAL.get_filtered_requests_total(filters)
+
         if isinstance(total, str):
             return jsonify({'error': total}), 500
 
         # Получаем данные для текущей страницы
         result = RequestDAL.get_filtered_requests(
-            engineer_id=engineer_id,
-            status_ids=status_ids,
-            start_date=start_date,
-            end_date=end_date,
+            filters,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            sort=sort,
+            fields=fields
         )
 
         if isinstance(result, str):
             return jsonify({'error': result}), 500
 
-        return jsonify({
+        return respond({
             'manager_name': user['name'],
             'filters': {
                 'engineer_id': engineer_id,
+                'engineer_ids': engineer_ids,
                 'status_ids': status_ids or list(range(1, 5)),
-                'start_date': start_date.isoformat() if start_date else None,
-                'end_date': end_date.isoformat() if end_date else None,
+                'operator_id': operator_id,
+                **{name: value.isoformat() if value else None for name, value in dates.items()},
+                'sort': sort,
                 'page': page,
                 'per_page': per_page
             },
             'total': total,
             'current_page_count': len(result),
             'requests': result
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error filtering requests: {e}")
@@ -392,7 +447,7 @@ def get_engineers_stats():
         # Вычисляем общее количество записей отдельным запросом
         total = RequestDAL.get_total_engineers_count()
 
-        return jsonify({
+        return respond({
             'manager_name': user['name'],
             'period': {
                 'start_date': datetime(datetime.today().year, datetime.today().month, 1).isoformat(),
@@ -404,7 +459,7 @@ def get_engineers_stats():
             },
             'total': total,
             'engineers': result
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching engineers statistics: {e}")
@@ -451,17 +506,22 @@ def my_assigned_requests():
         if not user or user['role_id'] != 1:  # Только инженер
             return jsonify({'error': 'Access denied'}), 403
 
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         # Получаем заявки через DAL
-        result = RequestDAL.get_assigned_and_in_works_requests(current_user_id)
+        result = RequestDAL.get_assigned_and_in_works_requests(current_user_id, fields=fields)
 
         if isinstance(result, str):
             return jsonify({'error': result}), 500
 
-        return jsonify({
+        return respond({
             'engineer_id': current_user_id,
             'total': len(result),
             'requests': result
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching assigned requests: {e}")
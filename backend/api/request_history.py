@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify
+from api.responses import respond
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from dal.request_history import RequestHistoryDAL
 from dal.users import UserDAL
@@ -20,10 +21,10 @@ def get_history(request_id: int):
 
         history = RequestHistoryDAL.get_request_history(request_id)
 
-        return jsonify({
+        return respond({
             'request_id': request_id,
             'history': history
-        }), 200
+        })
 
     except Exception as e:
         logger.error(f"Error fetching history: {e}")
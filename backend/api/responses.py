@@ -0,0 +1,37 @@
+import time
+from typing import Any
+
+from flask import current_app, jsonify, request
+
+from metrics import current_request
+from serialization import packb_wire
+from tracing import span
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def wants_msgpack() -> bool:
+    """Клиент явно предпочитает MessagePack (по заголовку Accept). По умолчанию — JSON"""
+    best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def respond(payload: Any, status: int = 200):
+    """
+    Ответ со списком данных с учётом Accept:
+    application/msgpack — компактный MessagePack, иначе JSON
+    """
+    if wants_msgpack():
+        started = time.perf_counter()
+        with span('serialize.msgpack'):
+            data = packb_wire(payload)
+        stats = current_request()
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - started
+        response = current_app.response_class(data, mimetype=MSGPACK_MIMETYPES[0])
+    else:
+        # Время JSON учитывает ORJSONProvider
+        response = jsonify(payload)
+    response.status_code = status
+    response.vary.add('Accept')
+    return response
@@ -1,12 +1,9 @@
 from flask import Blueprint, request, jsonify
+from api.responses import respond
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 import logging
 
 from dal.users import UserDAL
-from dal.request import RequestDAL
-from dal.balance_history import BalanceHistoryDAL
-from dal.request_history import RequestHistoryDAL
-from dal.engineer_profile import EngineerProfileDAL
 
 
 # Создание блюпринта
@@ -251,29 +248,12 @@ def delete_user(user_id: int):
         if not current_user or current_user['role_id'] != 3 or int(current_user_id) == user_id:
             return jsonify({'error': 'Access denied'}), 403
 
-        # Получаем данные удаляемого пользователя
-        target_user = UserDAL.get_user_by_id(user_id)
-        if not target_user:
+        # Ссылки на пользователя обнуляются в той же транзакции, что и удаление
+        result = UserDAL.delete_user(user_id)
+        if result == "User not found":
             return jsonify({'error': 'User not found'}), 404
-
-        role_id = target_user['role_id']
-
-        # Обнуляем все ссылки на пользователя
-        RequestDAL.nullify_engineer_id_in_requests(user_id)
-        RequestDAL.nullify_operator_id_in_requests(user_id)
-        RequestHistoryDAL.nullify_changer_id_in_request_history(user_id)
-
-        # Если пользователь — инженер
-        if role_id == 1:
-            BalanceHistoryDAL.delete_balance_history_by_engineer(user_id)
-            EngineerProfileDAL.delete_engineer_profile(user_id)
-
-        # Если пользователь — менеджер
-        elif role_id == 2:
-            BalanceHistoryDAL.nullify_admin_id_in_balance_history(user_id)
-
-        # Удаляем самого пользователя
-        UserDAL.delete_user(user_id)
+        if result != "OK":
+            return jsonify({'error': 'Internal server error'}), 500
 
         return jsonify({
             'message': 'User deleted successfully',
@@ -323,7 +303,7 @@ def get_all_users():
 
             response.append(user_data)
 
-        return jsonify(response), 200
+        return respond(response)
 
     except Exception as e:
         logger.error(f"Error fetching users: {e}")
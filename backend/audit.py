@@ -0,0 +1,110 @@
+"""
+Журнал изменений заявок (request_history): кто пишет историю.
+
+app — RequestDAL.update_request пишет строку на каждое поле сам.
+trigger — триггер request_audit на таблице request (миграция 0004)
+пишет изменившиеся поля тем же оператором UPDATE, Python ничего не пишет.
+
+Триггер установлен в обоих режимах: изменения в обход update_request
+(массовые UPDATE, правки из psql) попадают в историю всегда, с пустым
+changer_id. В режиме app update_request помечает свою транзакцию
+remont.audit = 'app', и триггер её пропускает, чтобы история не записалась
+дважды. Изменения, которые сознательно идут без истории (обнуление ссылок
+в UserDAL.delete_user), ставят remont.audit = 'off' (миграция 0009).
+Автор изменения передаётся триггеру через настройку транзакции
+remont.changer_id.
+
+Значения в истории одинаковы в обоих режимах — текст, как его даёт str()
+в Python: время '2026-01-01 10:00:00', без 'T' из jsonb (request_audit_value).
+
+Формат хранения (REQUEST_HISTORY_FORMAT): rows — строка request_history
+на каждое поле, compact — одна строка request_change на изменение с diff
+{"поле": [старое, новое]} (миграция 0005). Читается история из обеих
+таблиц, так что формат можно менять в любой момент; старые строки
+request_history переносит в request_change отдельная команда
+python -m migrations.compact_history run. Формат для изменений
+в обход приложения задаёт настройка базы remont.history_format.
+
+Запись (REQUEST_HISTORY_WRITE_MODE): sync — в транзакции изменения,
+buffered — изменение ложится одной строкой в request_history_buffer
+(таблица без индексов, миграция 0007), а HistoryFlusher (history_flusher.py)
+переносит буфер пачками в формат хранения. Буфер пишется той же
+транзакцией, поэтому изменение и его история не расходятся. Пока поток
+переноса не запущен или буфер переполнен, запись идёт сразу (sync).
+"""
+import logging
+from typing import Tuple
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+APP = 'app'
+TRIGGER = 'trigger'
+
+ROWS = 'rows'
+COMPACT = 'compact'
+
+SYNC = 'sync'
+BUFFERED = 'buffered'
+
+# remont.audit для изменений, которые сознательно не пишут историю
+OFF = 'off'
+
+
+class RequestAudit:
+    mode: str = APP
+    history_format: str = ROWS
+    write_mode: str = SYNC
+    # Состояние буфера ставит HistoryFlusher: поток работает, буфер не переполнен
+    _flusher_running: bool = False
+    _saturated: bool = False
+
+    @classmethod
+    def initialize(cls, config: Settings):
+        if config.REQUEST_AUDIT_MODE not in (APP, TRIGGER):
+            raise ValueError(f"Unknown request audit mode: {config.REQUEST_AUDIT_MODE}")
+        if config.REQUEST_HISTORY_FORMAT not in (ROWS, COMPACT):
+            raise ValueError(f"Unknown request history format: {config.REQUEST_HISTORY_FORMAT}")
+        if config.REQUEST_HISTORY_WRITE_MODE not in (SYNC, BUFFERED):
+            raise ValueError(f"Unknown request history write mode: {config.REQUEST_HISTORY_WRITE_MODE}")
+        cls.mode = config.REQUEST_AUDIT_MODE
+        cls.history_format = config.REQUEST_HISTORY_FORMAT
+        cls.write_mode = config.REQUEST_HISTORY_WRITE_MODE
+        logger.info(f"Request audit mode: {cls.mode}, history format: {cls.history_format}, "
+                    f"write mode: {cls.write_mode}")
+
+    @classmethod
+    def by_trigger(cls) -> bool:
+        return cls.mode == TRIGGER
+
+    @classmethod
+    def compact(cls) -> bool:
+        return cls.history_format == COMPACT
+
+    @classmethod
+    def buffered(cls) -> bool:
+        """Писать историю в буфер: режим buffered, поток переноса работает и догоняет"""
+        return cls.write_mode == BUFFERED and cls._flusher_running and not cls._saturated
+
+    @classmethod
+    def set_buffer_state(cls, running: bool, saturated: bool = False) -> None:
+        if saturated and not cls._saturated:
+            logger.warning("Request history buffer is full, writing history synchronously")
+        elif cls._saturated and not saturated and running:
+            logger.info("Request history buffer drained, writing history to the buffer again")
+        cls._flusher_running = running
+        cls._saturated = saturated
+
+    @classmethod
+    def session_settings(cls, changer_id: int) -> Tuple[str, tuple]:
+        """
+        Выражение SQL, которое ставит настройки транзакции для триггера:
+        автора изменения, формат истории, запись через буфер и, в режиме
+        app, отметку «история пишется приложением». Встраивается в сам
+        UPDATE, чтобы не тратить на него отдельный обмен.
+        """
+        return ("set_config('remont.changer_id', %s, true) || set_config('remont.audit', %s, true)"
+                " || set_config('remont.history_format', %s, true)"
+                " || set_config('remont.history_write', %s, true)",
+                (str(changer_id), cls.mode, cls.history_format, BUFFERED if cls.buffered() else SYNC))
@@ -0,0 +1,282 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import redis
+
+from config import Settings
+from metrics import CACHE_REQUESTS
+from serialization import packb, unpackb
+
+logger = logging.getLogger(__name__)
+
+# Маркер промаха, чтобы отличать его от закэшированных False/0/[]
+MISS = object()
+
+
+class CacheBackend:
+    """
+    Интерфейс хранилища кэша. Значения — уже сериализованные байты,
+    ключи сгруппированы по пространствам имён (namespace), которые можно
+    сбросить целиком одной операцией.
+    """
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryLRUBackend(CacheBackend):
+    """LRU-кэш в памяти процесса. Подходит для разработки и одного воркера"""
+
+    def __init__(self, max_entries: int = 4096):
+        self._max_entries = max_entries
+        self._data: "OrderedDict[Tuple[str, str], Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._namespaces: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove((namespace, key))
+                return None
+            self._data.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[(namespace, key)] = (value, expires_at)
+            self._data.move_to_end((namespace, key))
+            self._namespaces.setdefault(namespace, set()).add(key)
+            while len(self._data) > self._max_entries:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._remove((namespace, key))
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            for key in self._namespaces.pop(namespace, set()):
+                self._data.pop((namespace, key), None)
+
+    def _remove(self, item: Tuple[str, str]) -> None:
+        if self._data.pop(item, None) is not None:
+            keys = self._namespaces.get(item[0])
+            if keys is not None:
+                keys.discard(item[1])
+
+
+class RedisBackend(CacheBackend):
+    """
+    Общий для всех воркеров кэш на любом сервере с протоколом Redis.
+    Для каждого namespace ведётся множество ключей, по которому
+    namespace сбрасывается целиком. Индекс не истекает: иначе он мог бы
+    пропасть раньше ключей с большим TTL, и clear() их бы не нашёл.
+    Ключи, истёкшие сами, вычищаются из индекса, когда он вырастает
+    больше prune_threshold.
+    """
+
+    # Сколько членов индекса проверять одной транзакцией при чистке
+    PRUNE_CHUNK = 500
+
+    def __init__(self, url: str, prefix: str = 'remont', prune_threshold: int = 10_000):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._prefix = prefix
+        self._prune_threshold = prune_threshold
+        # namespace -> размер индекса, после которого его снова чистить
+        self._next_prune: Dict[str, int] = {}
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self._prefix}:{namespace}:{key}"
+
+    def _index(self, namespace: str) -> str:
+        return f"{self._prefix}:{namespace}:__keys__"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._client.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        full_key = self._key(namespace, key)
+        index = self._index(namespace)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(full_key, value, ex=ttl)
+        pipe.sadd(index, full_key)
+        pipe.scard(index)
+        size = pipe.execute()[-1]
+        if size > self._next_prune.get(namespace, self._prune_threshold):
+            live = self._prune(index)
+            # Живых ключей много — следующая чистка не раньше, чем индекс удвоится
+            self._next_prune[namespace] = max(self._prune_threshold, live * 2)
+
+    def _prune(self, index: str) -> int:
+        """Убирает из индекса истёкшие ключи. Возвращает размер индекса после чистки"""
+        for members in self._chunks(index):
+            def drop_expired(pipe):
+                # WATCH на проверяемых ключах: записанный заново между EXISTS
+                # и SREM ключ отменит транзакцию, и он останется в индексе
+                expired = [member for member in members if not pipe.exists(member)]
+                pipe.multi()
+                if expired:
+                    pipe.srem(index, *expired)
+
+            self._client.transaction(drop_expired, *members)
+        return self._client.scard(index)
+
+    def _chunks(self, index: str):
+        cursor = 0
+        while True:
+            cursor, members = self._client.sscan(index, cursor, count=self.PRUNE_CHUNK)
+            if members:
+                yield list(members)
+            if cursor == 0:
+                return
+
+    def delete(self, namespace: str, key: str) -> None:
+        full_key = self._key(namespace, key)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(full_key)
+        pipe.srem(self._index(namespace), full_key)
+        pipe.execute()
+
+    def clear(self, namespace: str) -> None:
+        index = self._index(namespace)
+
+        def drop(pipe):
+            # WATCH на индексе: если между SMEMBERS и EXEC кто-то записал ключ
+            # в namespace, транзакция не выполнится и redis-py повторит её,
+            # так что ключ не останется в кэше без индекса
+            keys = pipe.smembers(index)
+            pipe.multi()
+            pipe.delete(index, *keys)
+
+        self._client.transaction(drop, index)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class CacheManager:
+    _backend: Optional[CacheBackend] = None
+    _default_ttl: Optional[int] = None
+
+    @classmethod
+    def initialize(cls, config: Settings):
+        """Создание хранилища кэша при старте приложения"""
+        if cls._backend is not None:
+            return
+        if config.CACHE_BACKEND == 'redis':
+            cls._backend = RedisBackend(config.CACHE_URL, prefix=config.CACHE_PREFIX)
+        elif config.CACHE_BACKEND == 'memory':
+            cls._backend = MemoryLRUBackend(max_entries=config.CACHE_MAX_ENTRIES)
+        elif config.CACHE_BACKEND == 'none':
+            cls._backend = None
+        else:
+            raise ValueError(f"Unknown cache backend: {config.CACHE_BACKEND}")
+        cls._default_ttl = config.CACHE_DEFAULT_TTL or None
+        logger.info(f"Cache backend initialized: {config.CACHE_BACKEND}")
+
+    @classmethod
+    def get(cls, namespace: str, key: str) -> Any:
+        """Возвращает значение из кэша или MISS"""
+        if cls._backend is None:
+            return MISS
+        try:
+            data = cls._backend.get(namespace, key)
+            CACHE_REQUESTS.labels(namespace, 'miss' if data is None else 'hit').inc()
+            return MISS if data is None else unpackb(data)
+        except Exception as e:
+            CACHE_REQUESTS.labels(namespace, 'error').inc()
+            logger.warning(f"Cache get failed for {namespace}:{key}: {e}")
+            return MISS
+
+    @classmethod
+    def set(cls, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        if cls._backend is None:
+            return
+        try:
+            cls._backend.set(namespace, key, packb(value), ttl or cls._default_ttl)
+        except Exception as e:
+            logger.warning(f"Cache set failed for {namespace}:{key}: {e}")
+
+    @classmethod
+    def delete(cls, namespace: str, key: str) -> None:
+        if cls._backend is None:
+            return
+        try:
+            cls._backend.delete(namespace, key)
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {namespace}:{key}: {e}")
+
+    @classmethod
+    def invalidate(cls, namespace: str) -> None:
+        """Сбрасывает все ключи пространства имён во всех воркерах"""
+        if cls._backend is None:
+            return
+        try:
+            cls._backend.clear(namespace)
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+
+    @classmethod
+    def close_all(cls):
+        if cls._backend is not None:
+            cls._backend.close()
+            cls._backend = None
+
+
+def _not_cacheable(value: Any) -> bool:
+    # DAL возвращает None при отсутствии записи и строку при ошибке
+    return value is None or isinstance(value, str)
+
+
+def cached(namespace: str, ttl: Optional[int] = None,
+           skip: Callable[[Any], bool] = _not_cacheable):
+    """
+    Декоратор для методов DAL: кэширует результат по аргументам вызова.
+    Сброс одной записи — func.invalidate(*args), всего namespace —
+    CacheManager.invalidate(namespace).
+    """
+    def decorator(func):
+        prefix = func.__qualname__
+
+        def make_key(args, kwargs) -> str:
+            parts = [str(arg) for arg in args]
+            parts.extend(f"{name}={kwargs[name]}" for name in sorted(kwargs))
+            return f"{prefix}:{':'.join(parts)}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            value = CacheManager.get(namespace, key)
+            if value is not MISS:
+                return value
+            value = func(*args, **kwargs)
+            if not skip(value):
+                CacheManager.set(namespace, key, value, ttl)
+            return value
+
+        wrapper.invalidate = lambda *args, **kwargs: CacheManager.delete(namespace, make_key(args, kwargs))
+        return wrapper
+
+    return decorator
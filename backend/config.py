@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +11,91 @@ class Settings(BaseSettings):
     HOST_NAME: str
     SECRET_KEY: str
 
+    # Пул соединений: размер, ожидание свободного соединения (сек), время жизни соединения (сек, 0 — без ограничения)
+    DB_POOL_MIN: int = 1
+    DB_POOL_MAX: int = 10
+    DB_POOL_TIMEOUT: float = 5.0
+    DB_POOL_MAX_LIFETIME: int = 3600
+    # Соединение, простоявшее дольше стольких секунд, проверяется SELECT 1 перед выдачей (0 — не проверять)
+    DB_POOL_HEALTHCHECK_IDLE: float = 30.0
+    # Пул interactive (DB_POOL_*): короткие запросы инженеров и операторов. statement_timeout в мс, 0 — без ограничения
+    DB_POOL_STATEMENT_TIMEOUT: int = 5000
+    # Пул reporting: отчёты и выборки за большие периоды. Отдельные соединения,
+    # чтобы тяжёлые запросы не занимали места, нужные для быстрых обновлений
+    DB_REPORTING_POOL_MIN: int = 0
+    DB_REPORTING_POOL_MAX: int = 3
+    DB_REPORTING_POOL_TIMEOUT: float = 15.0
+    DB_REPORTING_STATEMENT_TIMEOUT: int = 60000
+
+    # Запросы дольше стольких мс пишутся в лог (без значений параметров), 0 — не писать
+    DB_SLOW_QUERY_MS: int = 500
+    # statement_timeout (мс) для отдельных DAL-методов поверх таймаута пула, JSON:
+    # DB_STATEMENT_BUDGETS='{"RequestDAL.get_filtered_requests": 3000}'
+    DB_STATEMENT_BUDGETS: Dict[str, int] = {}
+
+    # Бюджет одного HTTP-запроса: превышение пишется в лог (0 — не проверять).
+    # REQUEST_REPEATED_STATEMENT_LIMIT — один и тот же запрос столько раз за HTTP-запрос похож на N+1
+    REQUEST_MAX_DB_CHECKOUTS: int = 6
+    REQUEST_MAX_DB_STATEMENTS: int = 15
+    REQUEST_MAX_DB_MS: int = 1000
+    REQUEST_REPEATED_STATEMENT_LIMIT: int = 5
+
+    # Профилирование запросов (cProfile): по заголовку X-Profile: 1 в запросе администратора
+    # (PROFILE_ON_DEMAND) и/или случайной доле запросов PROFILE_SAMPLE_RATE (0.001 — каждый тысячный).
+    # False и 0 — выключено
+    PROFILE_ON_DEMAND: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = "/tmp/remont-profiles"
+    PROFILE_KEEP: int = 200  # сколько последних файлов хранить
+
+    # Трассировка: none — выключена, file — JSONL в TRACE_FILE, otlp — OTLP/HTTP JSON в TRACE_OTLP_ENDPOINT.
+    # TRACE_SAMPLE_RATE — доля запросов без входящего traceparent с флагом sampled
+    TRACE_EXPORTER: str = "none"
+    TRACE_FILE: str = "/tmp/remont-traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "remont-backend"
+    TRACE_SAMPLE_RATE: float = 1.0
+
+    # Реплики для чтения: JSON-список строк подключения libpq, например
+    # DB_REPLICA_DSNS='["host=replica1", "host=replica2 port=5433"]'.
+    # Пользователь, пароль, база и порт по умолчанию берутся у мастера
+    DB_REPLICA_DSNS: List[str] = []
+    DB_REPLICA_MAX_LAG: float = 5.0  # реплика, отставшая больше (сек), не используется
+    DB_REPLICA_CHECK_INTERVAL: float = 2.0  # как часто проверять отставание (сек)
+    # После записи чтения пользователя столько секунд идут на мастер.
+    # Между запросами метка хранится в кэше, поэтому для нескольких воркеров нужен CACHE_BACKEND=redis
+    DB_READ_YOUR_WRITES_WINDOW: int = 5
+
+    # История заявок: app — update_request пишет строки request_history сам,
+    # trigger — пишет триггер request_audit (миграция 0004), одной вставкой на UPDATE
+    REQUEST_AUDIT_MODE: str = "app"
+    # Хранение истории: rows — строка на каждое поле, compact — строка request_change на изменение (JSONB diff)
+    REQUEST_HISTORY_FORMAT: str = "rows"
+    # Запись истории: sync — в той же транзакции, что и изменение заявки, buffered — через буфер
+    # request_history_buffer (миграция 0007), который фоновый поток воркера переносит пачками.
+    # Если в буфере больше REQUEST_HISTORY_BUFFER_LIMIT строк, запись снова идёт сразу, пока поток не догонит
+    REQUEST_HISTORY_WRITE_MODE: str = "sync"
+    REQUEST_HISTORY_BUFFER_LIMIT: int = 10_000
+    REQUEST_HISTORY_FLUSH_INTERVAL: float = 1.0  # пауза между переносами (сек)
+    REQUEST_HISTORY_FLUSH_BATCH: int = 1000  # строк буфера за один перенос
+
+    # Кэш: memory — LRU внутри процесса, redis — общий для всех воркеров, none — выключен
+    CACHE_BACKEND: str = "memory"
+    CACHE_URL: str = "redis://localhost:6379/0"
+    CACHE_PREFIX: str = "remont"
+    CACHE_MAX_ENTRIES: int = 4096
+    CACHE_DEFAULT_TTL: int = 300
+
+    # gunicorn (gunicorn.conf.py). WEB_WORKERS=0 — по числу ядер: 2 * CPU + 1
+    WEB_BIND: str = "0.0.0.0:5000"
+    WEB_WORKERS: int = 0
+    WEB_WORKER_CLASS: str = "gthread"  # gthread или gevent
+    WEB_THREADS: int = 4
+    WEB_WORKER_CONNECTIONS: int = 1000  # только для gevent
+    WEB_TIMEOUT: int = 30
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_KEEPALIVE: int = 5
+    WEB_MAX_REQUESTS: int = 0
 
     class Config:
         env_file = ".env"
@@ -2,10 +2,12 @@
 
 from typing import List, Union
 from db_manager import DatabaseManager
+from tracing import traced
 import logging
 
 logger = logging.getLogger(__name__)
 
+@traced
 class BalanceHistoryDAL:
     @staticmethod
     def get_balance_history(engineer_id: int) -> Union[List[dict], str]:
@@ -13,7 +15,7 @@ class BalanceHistoryDAL:
         Получает историю изменений баланса для конкретного инженера
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 query = """
                     SELECT 
                         bh.bh_id,
@@ -31,36 +33,4 @@ class BalanceHistoryDAL:
                 return result if result else []
         except Exception as e:
             logger.error(f"Error fetching balance history for engineer {engineer_id}: {e}")
-            return "Internal server error"
-
-    @staticmethod
-    def nullify_admin_id_in_balance_history(admin_id: int):
-        """
-        Обнуляет admin_id у всех записей в истории баланса, где он был указан
-        """
-        try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("""
-                    UPDATE balance_history
-                    SET admin_id = NULL
-                    WHERE admin_id = %s;
-                """, (admin_id,))
-        except Exception as e:
-            logger.error(f"Error nullifying admin_id in balance_history: {e}")
-            return "Internal server error"
-
-    @staticmethod
-    def delete_balance_history_by_engineer(engineer_id: int):
-        """
-        Удаляет всю историю баланса, связанную с инженером
-        """
-        try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("""
-                    DELETE FROM balance_history
-                    WHERE engineer_id = %s;
-                """, (engineer_id,))
-                return "OK"
-        except Exception as e:
-            logger.error(f"Error deleting balance history for engineer {engineer_id}: {e}")
             return "Internal server error"
\ No newline at end of file
@@ -1,9 +1,12 @@
 from typing import Optional, Dict, Union
 import logging
 from db_manager import DatabaseManager
+from tracing import traced
+from cache import CacheManager
 
 logger = logging.getLogger(__name__)
 
+@traced
 class EngineerProfileDAL:
     @staticmethod
     def create_profile(user_id: int, schedule: str = None) -> int:
@@ -27,7 +30,7 @@ class EngineerProfileDAL:
     def get_profile(user_id: int) -> Optional[Dict]:
         """Получает профиль инженера"""
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     """
                     SELECT engin_id, user_id, balance, schedule
@@ -103,13 +106,14 @@ class EngineerProfileDAL:
                         ) VALUES (%s, %s, %s, %s);
                     """, (admin_id, engineer_id, old_balance, new_balance))
 
-                logger.info(f"Balance updated for engineer {engineer_id} by admin {admin_id}")
+            logger.info(f"Balance updated for engineer {engineer_id} by admin {admin_id}")
+            CacheManager.invalidate('reports')
 
-                return {
-                    "message": "Balance updated successfully",
-                    "old_balance": old_balance,
-                    "new_balance": new_balance
-                }
+            return {
+                "message": "Balance updated successfully",
+                "old_balance": old_balance,
+                "new_balance": new_balance
+            }
 
         except Exception as e:
             logger.error(f"Error updating engineer balance: {e}")
@@ -121,10 +125,10 @@ class EngineerProfileDAL:
         Получает баланс инженера по его user_id
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 query = """
                         SELECT 
-                            ep.balance,
+                            COALESCE(ep.balance, 0) AS balance,
                             u.name AS engineer_name
                         FROM engineer_profile ep
                         JOIN users u ON ep.user_id = u.user_id
@@ -140,7 +144,7 @@ class EngineerProfileDAL:
                 return {
                     'engineer_id': engineer_user_id,
                     'engineer_name': result['engineer_name'],
-                    'balance': float(result['balance']) if result['balance'] else 0.0
+                    'balance': float(result['balance'])
                 }
 
         except Exception as e:
@@ -155,7 +159,8 @@ class EngineerProfileDAL:
         try:
             with DatabaseManager.get_cursor() as cursor:
                 cursor.execute("DELETE FROM engineer_profile WHERE user_id = %s", (engineer_id,))
-                return "OK"
+            CacheManager.invalidate('reports')
+            return "OK"
         except Exception as e:
             logger.error(f"Error deleting engineer profile: {e}")
             return "Internal server error"
\ No newline at end of file
@@ -0,0 +1,133 @@
+# dal/query_builder.py
+
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+# Ключи сортировки, доступные клиенту: имя -> колонка
+SORT_KEYS = {
+    'request_id': 'r.request_id',
+    'creation_date': 'r.creation_date',
+    'assigned_time': 'r.assigned_time',
+    'in_works_time': 'r.in_works_time',
+    'done_time': 'r.done_time',
+    'status_id': 'r.status_id',
+}
+DEFAULT_SORT = '-creation_date'
+
+# Диапазоны по времени: имя фильтра -> колонка. Порядок определяет порядок условий в SQL
+RANGE_COLUMNS = (
+    ('creation', 'r.creation_date'),
+    ('assigned', 'r.assigned_time'),
+    ('done', 'r.done_time'),
+)
+
+
+def _int_array(values: Sequence[int]) -> str:
+    # Массив уходит одной константой '{1,2,3}', а не ARRAY[1,2,3]: текст запроса
+    # не зависит от количества элементов, и в метриках по тексту запроса
+    # (db_statements.fingerprint) не появляется серия на каждую длину списка
+    return '{' + ','.join(str(int(value)) for value in values) + '}'
+
+
+def parse_sort(raw: Optional[str]) -> str:
+    """
+    Проверяет ключ сортировки: 'done_time' — по возрастанию, '-done_time' — по убыванию.
+    ValueError — при неизвестном ключе.
+    """
+    if not raw:
+        return DEFAULT_SORT
+    if not isinstance(raw, str) or raw.lstrip('-') not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {raw}. Allowed: {', '.join(SORT_KEYS)}")
+    return raw
+
+
+class RequestFilter:
+    """
+    Набор фильтров по заявкам. В WHERE попадают только заданные фильтры:
+    - списки — '= ANY(%s::int[])' при любом числе элементов
+    - диапазоны — только заданные границы, '>=' и '<='
+    psycopg2 подставляет параметры на клиенте, и каждый запрос планируется
+    заново с реальными значениями, так что лишние условия только портили бы
+    оценки планировщика.
+    """
+
+    def __init__(
+            self,
+            engineer_ids: Optional[Sequence[int]] = None,
+            status_ids: Optional[Sequence[int]] = None,
+            operator_id: Optional[int] = None,
+            creation_from: Optional[datetime] = None,
+            creation_to: Optional[datetime] = None,
+            assigned_from: Optional[datetime] = None,
+            assigned_to: Optional[datetime] = None,
+            done_from: Optional[datetime] = None,
+            done_to: Optional[datetime] = None
+    ):
+        self.engineer_ids = list(engineer_ids) if engineer_ids else None
+        self.status_ids = list(status_ids) if status_ids else None
+        self.operator_id = operator_id
+        self.ranges = {
+            'creation': (creation_from, creation_to),
+            'assigned': (assigned_from, assigned_to),
+            'done': (done_from, done_to),
+        }
+
+    def where(self) -> Tuple[str, List]:
+        """Возвращает условие WHERE (без ключевого слова) и его параметры"""
+        conditions = []
+        params = []
+
+        if self.engineer_ids:
+            conditions.append("r.engineer_id = ANY(%s::int[])")
+            params.append(_int_array(self.engineer_ids))
+
+        if self.status_ids:
+            conditions.append("r.status_id = ANY(%s::int[])")
+            params.append(_int_array(self.status_ids))
+
+        if self.operator_id is not None:
+            conditions.append("r.operator_id = %s")
+            params.append(self.operator_id)
+
+        for name, column in RANGE_COLUMNS:
+            start, end = self.ranges[name]
+            if start is not None:
+                conditions.append(f"{column} >= %s")
+                params.append(start)
+            if end is not None:
+                conditions.append(f"{column} <= %s")
+                params.append(end)
+
+        return (' AND '.join(conditions) or 'TRUE'), params
+
+
+class RequestQuery:
+    """Строит запрос количества и запрос страницы из одного RequestFilter"""
+
+    def __init__(self, filters: RequestFilter):
+        self.filters = filters
+
+    def count(self) -> Tuple[str, List]:
+        where, params = self.filters.where()
+        query = f"SELECT COUNT(*) AS total FROM request r WHERE {where}"
+        return query, params
+
+    def page(
+            self,
+            select_list: str,
+            joins: str = '',
+            sort: str = DEFAULT_SORT,
+            limit: int = 10,
+            offset: int = 0
+    ) -> Tuple[str, List]:
+        where, params = self.filters.where()
+        sort = parse_sort(sort)
+        direction = 'DESC' if sort.startswith('-') else 'ASC'
+        column = SORT_KEYS[sort.lstrip('-')]
+        # request_id как второй ключ делает порядок страниц детерминированным
+        query = (
+            f"SELECT {select_list} FROM request r {joins} WHERE {where} "
+            f"ORDER BY {column} {direction}, r.request_id {direction} "
+            f"LIMIT %s OFFSET %s"
+        )
+        return query, params + [limit, offset]
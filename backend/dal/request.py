@@ -1,14 +1,93 @@
 # dal/request.py
 
-from typing import List, Dict, Union, Optional
-from db_manager import DatabaseManager
+from typing import List, Dict, Union, Optional, Sequence, Tuple
+from db_manager import DatabaseManager, REPORTING
+from tracing import traced
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from dal.status import StatusDAL
+from cache import CacheManager, cached
+from dal.query_builder import DEFAULT_SORT, RequestFilter, RequestQuery
+from dal.request_history import RequestHistoryDAL
+from audit import RequestAudit
 
 logger = logging.getLogger(__name__)
 
+# Поля заявки, которые можно запросить через fields=: имя в ответе -> выражение SELECT
+REQUEST_FIELDS = {
+    'request_id': 'r.request_id',
+    'operator_id': 'r.operator_id',
+    'engineer_id': 'r.engineer_id',
+    'status_id': 'r.status_id',
+    'engineer_name': 'u.name AS engineer_name',
+    'status_name': 's.status AS status_name',
+    'customer_name': 'r.customer_name',
+    'phone': 'r.phone',
+    'address': 'r.adress AS address',
+    'equipment': 'r.techniq AS equipment',
+    'description': 'r.description',
+    'creation_date': 'r.creation_date',
+    'assigned_time': 'r.assigned_time',
+    'in_works_time': 'r.in_works_time',
+    'done_time': 'r.done_time',
+}
+
+# JOIN, которые нужны только при выборке соответствующих полей
+REQUEST_FIELD_JOINS = {
+    'engineer_name': 'LEFT JOIN users u ON r.engineer_id = u.user_id',
+    'status_name': 'LEFT JOIN status s ON r.status_id = s.status_id',
+}
+
+# Облегчённые наборы полей для списков: без описания (неограниченный текст)
+ENGINEER_LIST_FIELDS = (
+    'request_id', 'operator_id', 'engineer_id', 'status_id', 'customer_name', 'phone',
+    'address', 'equipment', 'creation_date', 'assigned_time', 'in_works_time', 'done_time',
+)
+FILTER_LIST_FIELDS = (
+    'request_id', 'operator_id', 'engineer_id', 'status_id', 'engineer_name', 'status_name',
+    'phone', 'customer_name', 'address', 'equipment',
+    'creation_date', 'assigned_time', 'in_works_time', 'done_time',
+)
+
+
+def _projection(fields: Optional[Sequence[str]], default: Sequence[str]) -> Tuple[str, str]:
+    """
+    Собирает список SELECT и нужные JOIN по белому списку REQUEST_FIELDS.
+    Неизвестные поля отклоняются ValueError. Колонки идут в порядке
+    REQUEST_FIELDS, а не в присланном: иначе каждая перестановка ?fields=
+    давала бы свой текст запроса и свою серию метрик по нему.
+    """
+    requested = set(fields or default)
+    unknown = sorted(requested - REQUEST_FIELDS.keys())
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    fields = [field for field in REQUEST_FIELDS if field in requested]
+
+    select_list = ', '.join(REQUEST_FIELDS[field] for field in fields)
+    joins = ' '.join(REQUEST_FIELD_JOINS[field] for field in fields if field in REQUEST_FIELD_JOINS)
+    return select_list, joins
+
+
+def parse_fields(raw: Union[str, Sequence[str], None]) -> Optional[List[str]]:
+    """
+    Разбирает параметр fields (строка через запятую или список).
+    Возвращает None, если параметр не передан; ValueError — при неизвестных полях.
+    """
+    if raw is None or raw == '':
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    if not isinstance(raw, (list, tuple)) or not all(isinstance(field, str) for field in raw):
+        raise ValueError("fields must be a list of field names")
+
+    fields = [field.strip() for field in raw if field.strip()]
+    unknown = [field for field in fields if field not in REQUEST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+
+@traced
 class RequestDAL:
     @staticmethod
     def create_request(
@@ -59,12 +138,13 @@ class RequestDAL:
                 cursor.execute(query, tuple(params))
                 result = cursor.fetchone()
 
-                logger.info(f"Request created with ID {result['request_id']}")
-                return {
-                    "request_id": result["request_id"],
-                    "creation_date": result["creation_date"],
-                    "assigned_time": result["assigned_time"]
-                }
+            logger.info(f"Request created with ID {result['request_id']}")
+            CacheManager.invalidate('reports')
+            return {
+                "request_id": result["request_id"],
+                "creation_date": result["creation_date"],
+                "assigned_time": result["assigned_time"]
+            }
 
         except Exception as e:
             logger.error(f"Error creating request: {e}")
@@ -74,38 +154,33 @@ class RequestDAL:
     def get_requests_by_engineer(
         engineer_id: int,
         status_ids: List[int],
-        date_filter: str  # формат 'YYYY-MM-DD'
+        date_filter: str,  # формат 'YYYY-MM-DD'
+        fields: Optional[List[str]] = None
     ) -> Union[List[Dict], str]:
         """
-        Получает заявки инженера по статусам и дате создания (creation_date)
+        Получает заявки инженера по статусам и дню назначения (assigned_time).
+        День задаётся диапазоном, а не DATE(assigned_time): так условие
+        попадает в индекс (engineer_id, status_id, assigned_time)
         """
 
         try:
-            with DatabaseManager.get_cursor() as cursor:
-                query = """
-                    SELECT 
-                        request_id,
-                        operator_id,
-                        engineer_id,
-                        status_id,
-                        customer_name,
-                        phone,
-                        adress AS address,
-                        techniq AS equipment,
-                        description,
-                        creation_date,
-                        assigned_time,
-                        in_works_time,
-                        done_time
-                    FROM request
-                    WHERE engineer_id = %s
-                      AND status_id = ANY(%s)
-                      AND DATE(assigned_time) = DATE(%s)
-                    ORDER BY assigned_time DESC;
+            select_list, joins = _projection(fields, ENGINEER_LIST_FIELDS)
+
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
+                query = f"""
+                    SELECT {select_list}
+                    FROM request r
+                    {joins}
+                    WHERE r.engineer_id = %s
+                      AND r.status_id = ANY(%s)
+                      AND r.assigned_time >= %s::date
+                      AND r.assigned_time < %s::date + 1
+                    ORDER BY r.assigned_time DESC;
                 """
                 cursor.execute(query, (
                     engineer_id,
                     status_ids,
+                    date_filter,
                     date_filter
                 ))
                 result = cursor.fetchall()
@@ -118,14 +193,20 @@ class RequestDAL:
             return "Internal server error"
 
     @staticmethod
-    def get_completed_requests_with_total(engineer_id: int, page: int = 1, per_page: int = 10) -> Union[Dict, str]:
+    def get_completed_requests_with_total(
+            engineer_id: int,
+            page: int = 1,
+            per_page: int = 10,
+            fields: Optional[List[str]] = None
+    ) -> Union[Dict, str]:
         """
         Получает список выполненных заявок (status_id = 4) и общее количество
         """
         try:
             offset = (page - 1) * per_page
+            select_list, joins = _projection(fields, ENGINEER_LIST_FIELDS)
 
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
                 # Подсчёт общего количества
                 cursor.execute("""
                     SELECT COUNT(*) 
@@ -135,24 +216,12 @@ class RequestDAL:
                 total = cursor.fetchone()['count']
 
                 # Получение данных с пагинацией
-                query = """
-                    SELECT 
-                        request_id,
-                        operator_id,
-                        engineer_id,
-                        status_id,
-                        customer_name,
-                        phone,
-                        adress AS address,
-                        techniq AS equipment,
-                        description,
-                        creation_date,
-                        assigned_time,
-                        in_works_time,
-                        done_time
-                    FROM request
-                    WHERE engineer_id = %s AND status_id = 4
-                    ORDER BY done_time DESC
+                query = f"""
+                    SELECT {select_list}
+                    FROM request r
+                    {joins}
+                    WHERE r.engineer_id = %s AND r.status_id = 4
+                    ORDER BY r.done_time DESC
                     LIMIT %s OFFSET %s;
                 """
                 cursor.execute(query, (engineer_id, per_page, offset))
@@ -167,6 +236,29 @@ class RequestDAL:
             logger.error(f"Error fetching completed requests for engineer {engineer_id}: {e}")
             return "Internal server error"
 
+    @staticmethod
+    @cached('request_detail', ttl=300)
+    def get_request_by_id(request_id: int) -> Optional[Dict]:
+        """
+        Получает одну заявку со всеми полями, включая описание
+        """
+        try:
+            select_list, joins = _projection(None, tuple(REQUEST_FIELDS))
+
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
+                cursor.execute(f"""
+                    SELECT {select_list}
+                    FROM request r
+                    {joins}
+                    WHERE r.request_id = %s;
+                """, (request_id,))
+                result = cursor.fetchone()
+                return dict(result) if result else None
+
+        except Exception as e:
+            logger.error(f"Error fetching request {request_id}: {e}")
+            return "Internal server error"
+
     @staticmethod
     def update_request(
             user_id: int,
@@ -176,19 +268,27 @@ class RequestDAL:
     ) -> Union[Dict[str, any], str]:
         """
         Обновляет заявку с проверкой прав пользователя.
-        Логирует изменения в request_history.
+        Логирует изменения в request_history: сам или, при
+        REQUEST_AUDIT_MODE=trigger, через триггер request_audit (audit.py).
         """
 
         try:
             with DatabaseManager.get_cursor() as cursor:
-                # Получаем текущие данные заявки
-                cursor.execute("""
-                    SELECT * FROM request WHERE request_id = %s;
-                """, (request_id,))
-                request_data = cursor.fetchone()
+                by_trigger = RequestAudit.by_trigger()
+                # Старые значения нужны только для истории, которую пишем сами.
+                # Названия статусов — тем же запросом: отдельный вызов StatusDAL
+                # брал бы второе соединение из пула, пока держим это
+                if not by_trigger:
+                    cursor.execute("""
+                        SELECT r.*, s.status AS status_name
+                        FROM request r
+                        LEFT JOIN status s ON s.status_id = r.status_id
+                        WHERE r.request_id = %s;
+                    """, (request_id,))
+                    request_data = cursor.fetchone()
 
-                if not request_data:
-                    return "Request not found"
+                    if not request_data:
+                        return "Request not found"
 
                 allowed_fields = []
 
@@ -203,46 +303,51 @@ class RequestDAL:
                 if not allowed_fields:
                     return "No valid fields to update"
 
-                # Если обновляется статус — делаем запись в историю
+                # Настройки транзакции для триггера истории ставятся подзапросом
+                # в том же UPDATE: он выполняется один раз до изменения строк
+                audit_sql, audit_params = RequestAudit.session_settings(user_id)
                 set_clause = ', '.join([f"{field} = %s" for field in allowed_fields])
+                returning = "*" if by_trigger else (
+                    "*, (SELECT status FROM status WHERE status_id = request.status_id) AS status_name")
                 query = f"""
                     UPDATE request
                     SET {set_clause}
                     WHERE request_id = %s
-                    RETURNING *;
+                      AND (SELECT {audit_sql}) IS NOT NULL
+                    RETURNING {returning};
                 """
                 params = [updates[field] for field in allowed_fields]
                 params.append(request_id)
+                params.extend(audit_params)
 
                 cursor.execute(query, tuple(params))
                 updated_request = cursor.fetchone()
 
-                # Логируем каждое изменение
-                for field in allowed_fields:
-                    old_value = str(request_data[field]) if request_data[field] is not None else None
-                    new_value = str(updates[field])
-
-                    if field == 'status_id':
-                        old_status = StatusDAL.get_status_by_id(int(old_value)) if old_value else None
-                        new_status = StatusDAL.get_status_by_id(int(new_value)) if new_value else None
-                        old_value = old_status['status'] if old_status and isinstance(old_status, dict) else old_value
-                        new_value = new_status['status'] if new_status and isinstance(new_status, dict) else new_value
-
-                    cursor.execute("""
-                        INSERT INTO request_history (
-                            request_id, changer_id, field_name, old_value, new_value
-                        )
-                        VALUES (%s, %s, %s, %s, %s);
-                    """, (
-                        request_id,
-                        user_id,
-                        field,
-                        old_value,
-                        new_value
-                    ))
-
-                logger.info(f"Request {request_id} updated by user {user_id}")
-                return dict(updated_request)
+                if not updated_request:
+                    return "Request not found"
+                updated_request = dict(updated_request)
+                new_status_name = updated_request.pop('status_name', None)
+                # В режиме trigger историю уже записал триггер
+                if not by_trigger:
+                    changes = []
+                    for field in allowed_fields:
+                        # Новое значение — сохранённое, а не присланное: '2026-01-01T10:00'
+                        # из запроса и datetime из базы дают разный текст (см. audit.py)
+                        old_value = str(request_data[field]) if request_data[field] is not None else None
+                        new_value = str(updated_request[field]) if updated_request[field] is not None else None
+
+                        if field == 'status_id':
+                            old_value = request_data['status_name'] or old_value
+                            new_value = new_status_name or new_value
+
+                        changes.append((field, old_value, new_value))
+                    # Все поля — одним INSERT в той же транзакции
+                    RequestHistoryDAL.record(cursor, request_id, user_id, changes)
+
+            logger.info(f"Request {request_id} updated by user {user_id}")
+            RequestDAL.get_request_by_id.invalidate(request_id)
+            CacheManager.invalidate('reports')
+            return updated_request
 
         except Exception as e:
             logger.error(f"Error updating request {request_id}: {e}")
@@ -258,7 +363,7 @@ class RequestDAL:
         Считает количество выполненных заявок (status_id=4) у инженера за период
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 query = """
                         SELECT COUNT(*) AS count
                         FROM request
@@ -277,12 +382,13 @@ class RequestDAL:
 
 
     @staticmethod
+    @cached('reports', ttl=60)
     def count_all_engineers_completed_requests(start_date: datetime, end_date: datetime) -> Union[List[Dict], str]:
         """
         Возвращает список: инженер и количество его выполненных заявок за период
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
                 query = """
                     SELECT 
                         r.engineer_id,
@@ -303,12 +409,13 @@ class RequestDAL:
             return "Internal server error"
 
     @staticmethod
+    @cached('reports', ttl=60)
     def get_request_stats_this_month() -> Union[Dict, str]:
         """
         Получает статистику по заявкам за текущий месяц
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
                 # Определяем начало текущего месяца
                 today = datetime.today()
                 start_date = datetime(today.year, today.month, 1)
@@ -342,41 +449,13 @@ class RequestDAL:
             return "Internal server error"
 
     @staticmethod
-    def get_filtered_requests_total(
-            engineer_id: Optional[int] = None,
-            status_ids: Optional[list] = None,
-            start_date: Optional[datetime] = None,
-            end_date: Optional[datetime] = None
-    ) -> Union[int, str]:
+    def get_filtered_requests_total(filters: RequestFilter) -> Union[int, str]:
         """
         Возвращает общее количество заявок по фильтрам
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
-                query = """
-                    SELECT COUNT(*) AS total
-                    FROM request r
-                    WHERE 1=1
-                """
-
-                params = []
-
-                if engineer_id is not None:
-                    query += " AND r.engineer_id = %s"
-                    params.append(engineer_id)
-
-                if status_ids:
-                    query += " AND r.status_id = ANY(%s)"
-                    params.append(status_ids)
-
-                if start_date:
-                    query += " AND r.creation_date >= %s"
-                    params.append(start_date)
-
-                if end_date:
-                    query += " AND r.creation_date <= %s"
-                    params.append(end_date)
-
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
+                query, params = RequestQuery(filters).count()
                 cursor.execute(query, params)
                 result = cursor.fetchone()
 
@@ -388,66 +467,23 @@ class RequestDAL:
 
     @staticmethod
     def get_filtered_requests(
-            engineer_id: Optional[int] = None,
-            status_ids: Optional[list] = None,
-            start_date: Optional[datetime] = None,
-            end_date: Optional[datetime] = None,
+            filters: RequestFilter,
             page: int = 1,
-            per_page: int = 10
+            per_page: int = 10,
+            sort: str = DEFAULT_SORT,
+            fields: Optional[List[str]] = None
     ) -> Union[List[Dict], str]:
         """
-        Получает список заявок с фильтрами по инженеру, статусу и периоду с пагинацией
+        Получает страницу заявок по фильтрам (см. RequestFilter) с сортировкой
         """
         try:
             offset = (page - 1) * per_page
+            select_list, joins = _projection(fields, FILTER_LIST_FIELDS)
 
-            with DatabaseManager.get_cursor() as cursor:
-                query = """
-                    SELECT 
-                        r.request_id,
-                        r.operator_id,
-                        r.engineer_id,
-                        r.status_id,
-                        u.name AS engineer_name,
-                        s.status AS status_name,
-                        r.phone,
-                        r.customer_name,
-                        r.adress AS address,
-                        r.techniq AS equipment,
-                        r.description,
-                        r.creation_date,
-                        r.assigned_time,
-                        r.in_works_time,
-                        r.done_time
-                    FROM request r
-                    LEFT JOIN users u ON r.engineer_id = u.user_id
-                    LEFT JOIN status s ON r.status_id = s.status_id
-                    WHERE 1=1
-                """
-
-                params = []
-
-                if engineer_id is not None:
-                    query += " AND r.engineer_id = %s"
-                    params.append(engineer_id)
-
-                if status_ids:
-                    query += " AND r.status_id = ANY(%s)"
-                    params.append(status_ids)
-
-                if start_date:
-                    query += " AND r.creation_date >= %s"
-                    params.append(start_date)
-
-                if end_date:
-                    query += " AND r.creation_date <= %s"
-                    params.append(end_date)
-
-                query += " ORDER BY r.creation_date DESC LIMIT %s OFFSET %s"
-
-                # Добавляем параметры пагинации
-                params.extend([per_page, offset])
-
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
+                query, params = RequestQuery(filters).page(
+                    select_list, joins, sort=sort, limit=per_page, offset=offset
+                )
                 cursor.execute(query, params)
                 return cursor.fetchall()
 
@@ -456,6 +492,7 @@ class RequestDAL:
             return "Internal server error"
 
     @staticmethod
+    @cached('reports', ttl=60)
     def get_engineers_stats_with_balance_and_requests(page: int, per_page: int) -> Union[List[Dict], str]:
         """
         Получает статистику по всем инженерам за текущий месяц с пагинацией:
@@ -464,7 +501,7 @@ class RequestDAL:
         - количество завершённых заявок за месяц (статус 4)
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
                 today = datetime.today()
                 start_of_month = datetime(today.year, today.month, 1)
                 current_time = datetime.now()
@@ -472,26 +509,29 @@ class RequestDAL:
                 # Вычисляем OFFSET на основе page и per_page
                 offset = (page - 1) * per_page
 
+                # Счётчики — подзапросами по частичным индексам: два LEFT JOIN к request
+                # перемножали активные и выполненные заявки каждого инженера перед
+                # COUNT(DISTINCT). GROUP BY тот же, что был при JOIN, — строки результата не меняются
                 query = """
                     SELECT 
                         u.user_id,
                         u.name AS engineer_name,
                         COALESCE(ep.balance, 0) AS balance,
-                        COUNT(DISTINCT r_active.request_id) FILTER (WHERE r_active.status_id IN (2, 3)) AS active_requests,
-                        COUNT(DISTINCT r_completed.request_id) FILTER (WHERE r_completed.status_id = 4 AND r_completed.done_time >= %s) AS completed_in_month
+                        (SELECT COUNT(*) FROM request r_active
+                         WHERE r_active.engineer_id = u.user_id
+                           AND r_active.status_id IN (2, 3)) AS active_requests,
+                        (SELECT COUNT(*) FROM request r_completed
+                         WHERE r_completed.engineer_id = u.user_id
+                           AND r_completed.status_id = 4
+                           AND r_completed.done_time >= %s) AS completed_in_month
                     FROM users u
                     JOIN roles r ON u.role_id = r.role_id AND r.role = 'engineer'
                     LEFT JOIN engineer_profile ep ON u.user_id = ep.user_id
-                    LEFT JOIN request r_active ON r_active.engineer_id = u.user_id 
-                        AND r_active.status_id IN (2, 3)
-                    LEFT JOIN request r_completed ON r_completed.engineer_id = u.user_id 
-                        AND r_completed.status_id = 4 
-                        AND r_completed.done_time >= %s
                     GROUP BY u.user_id, u.name, ep.balance
                     ORDER BY u.user_id
                     LIMIT %s OFFSET %s;
                 """
-                cursor.execute(query, (start_of_month, start_of_month, per_page, offset))
+                cursor.execute(query, (start_of_month, per_page, offset))
                 return [dict(row) for row in cursor.fetchall()]
 
         except Exception as e:
@@ -499,12 +539,13 @@ class RequestDAL:
             return "Internal server error"
 
     @staticmethod
+    @cached('reports', ttl=60)
     def get_total_engineers_count() -> int:
         """
         Возвращает общее количество инженеров.
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
                 query = """
                     SELECT COUNT(user_id) AS count
                     FROM users
@@ -521,70 +562,29 @@ class RequestDAL:
             return 0  # Возвращаем 0 в случае ошибки
 
     @staticmethod
-    def get_assigned_and_in_works_requests(engineer_id: int) -> Union[List[Dict], str]:
+    def get_assigned_and_in_works_requests(
+            engineer_id: int,
+            fields: Optional[List[str]] = None
+    ) -> Union[List[Dict], str]:
         """
         Получает заявки инженера со статусами 2 и 3,
         где assigned_time <= текущее время
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
-                query = """
-                    SELECT 
-                        request_id,
-                        operator_id,
-                        engineer_id,
-                        status_id,
-                        customer_name,
-                        phone,
-                        adress AS address,
-                        techniq AS equipment,
-                        description,
-                        creation_date,
-                        assigned_time,
-                        in_works_time,
-                        done_time
-                    FROM request
-                    WHERE engineer_id = %s
-                      AND status_id IN (2, 3)
-                    ORDER BY assigned_time DESC;
+            select_list, joins = _projection(fields, ENGINEER_LIST_FIELDS)
+
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
+                query = f"""
+                    SELECT {select_list}
+                    FROM request r
+                    {joins}
+                    WHERE r.engineer_id = %s
+                      AND r.status_id IN (2, 3)
+                    ORDER BY r.assigned_time DESC;
                 """
                 cursor.execute(query, (engineer_id,))
                 return cursor.fetchall()
 
         except Exception as e:
             logger.error(f"Error fetching requests for engineer {engineer_id}: {e}")
-            return "Internal server error"
-
-    # dal/request.py
-
-    @staticmethod
-    def nullify_engineer_id_in_requests(engineer_id: int):
-        """
-        Обнуляет engineer_id у всех заявок, где он был назначен
-        """
-        try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("""
-                    UPDATE request
-                    SET engineer_id = NULL
-                    WHERE engineer_id = %s;
-                """, (engineer_id,))
-        except Exception as e:
-            logger.error(f"Error nullifying engineer_id for {engineer_id}: {e}")
-            return "Internal server error"
-
-    @staticmethod
-    def nullify_operator_id_in_requests(operator_id: int):
-        """
-        Обнуляет operator_id у всех заявок, созданных этим оператором
-        """
-        try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("""
-                    UPDATE request
-                    SET operator_id = NULL
-                    WHERE operator_id = %s;
-                """, (operator_id,))
-        except Exception as e:
-            logger.error(f"Error nullifying operator_id for {operator_id}: {e}")
             return "Internal server error"
\ No newline at end of file
@@ -1,43 +1,145 @@
-from typing import List, Dict
-from db_manager import DatabaseManager
+from typing import List, Dict, Optional, Sequence, Tuple
+from psycopg2.extras import Json
+from db_manager import DatabaseManager, REPORTING
+from tracing import traced
+from audit import RequestAudit
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Ключ pg_advisory_xact_lock: буфер истории переносит один воркер за раз
+FLUSH_LOCK_KEY = 7_310_050
+
+@traced
 class RequestHistoryDAL:
     @staticmethod
     def get_request_history(request_id: int) -> List[Dict]:
+        """
+        История заявки построчно по полям. Изменения в компактном формате
+        (request_change) и ещё не перенесённые из буфера
+        (request_history_buffer) разворачиваются из diff в те же строки.
+        """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute("""
                     SELECT 
-                        rh.field_name,
-                        rh.old_value,
-                        rh.new_value,
-                        rh.changed_at,
+                        h.field_name,
+                        h.old_value,
+                        h.new_value,
+                        h.changed_at,
                         u.name AS changer_name
-                    FROM request_history rh
-                    JOIN users u ON rh.changer_id = u.user_id
-                    WHERE rh.request_id = %s
-                    ORDER BY rh.changed_at DESC;
-                """, (request_id,))
+                    FROM (
+                        SELECT rh.field_name, rh.old_value, rh.new_value, rh.changed_at, rh.changer_id
+                        FROM request_history rh
+                        WHERE rh.request_id = %s
+                        UNION ALL
+                        SELECT d.key, d.value ->> 0, d.value ->> 1, rc.changed_at, rc.changer_id
+                        FROM request_change rc
+                        CROSS JOIN LATERAL jsonb_each(rc.diff) d
+                        WHERE rc.request_id = %s
+                        UNION ALL
+                        SELECT d.key, d.value ->> 0, d.value ->> 1, b.changed_at, b.changer_id
+                        FROM request_history_buffer b
+                        CROSS JOIN LATERAL jsonb_each(b.diff) d
+                        WHERE b.request_id = %s
+                    ) h
+                    JOIN users u ON h.changer_id = u.user_id
+                    ORDER BY h.changed_at DESC;
+                """, (request_id, request_id, request_id))
                 return cursor.fetchall()
         except Exception as e:
             logger.error(f"Error fetching history for request {request_id}: {e}")
             return []
 
     @staticmethod
-    def nullify_changer_id_in_request_history(changer_id: int):
+    def record(cursor, request_id: int, changer_id: int,
+               changes: Sequence[Tuple[str, Optional[str], Optional[str]]]) -> None:
         """
-        Обнуляет changer_id у всех записей в истории заявок, где он был указан
+        Записывает изменения (поле, старое, новое) одной заявки в транзакции
+        курсора cursor, одним INSERT: строкой на поле или, в формате compact,
+        одной строкой request_change. В режиме buffered — одной строкой
+        буфера, без индексов и внешних ключей таблиц истории.
         """
-        try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("""
-                    UPDATE request_history
-                    SET changer_id = NULL
-                    WHERE changer_id = %s;
-                """, (changer_id,))
-        except Exception as e:
-            logger.error(f"Error nullifying changer_id in request_history: {e}")
-            return "Internal server error"
\ No newline at end of file
+        if not changes:
+            return
+        if RequestAudit.buffered():
+            diff = {field: [old_value, new_value] for field, old_value, new_value in changes}
+            cursor.execute("""
+                INSERT INTO request_history_buffer (request_id, changer_id, diff)
+                VALUES (%s, %s, %s);
+            """, (request_id, changer_id, Json(diff)))
+            return
+        if RequestAudit.compact():
+            diff = {field: [old_value, new_value] for field, old_value, new_value in changes}
+            cursor.execute("""
+                INSERT INTO request_change (request_id, changer_id, diff)
+                VALUES (%s, %s, %s);
+            """, (request_id, changer_id, Json(diff)))
+            return
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(changes))
+        params = [value for field, old_value, new_value in changes
+                  for value in (request_id, changer_id, field, old_value, new_value)]
+        cursor.execute(f"""
+            INSERT INTO request_history (
+                request_id, changer_id, field_name, old_value, new_value
+            )
+            VALUES {values};
+        """, params)
+
+    @staticmethod
+    def flush_buffer(batch_size: int, backlog_limit: int) -> Tuple[int, int, int]:
+        """
+        Переносит до batch_size самых старых строк request_history_buffer
+        в формат хранения одной транзакцией: DELETE ... RETURNING и INSERT
+        в одном запросе, время изменения сохраняется. Переносит один воркер
+        за раз (pg_try_advisory_xact_lock), так что порядок buffer_id
+        соблюдается; остальные в это время только считают очередь.
+        Изменения удалённых заявок отбрасываются: их история удалена вместе
+        с заявкой (ON DELETE CASCADE), а вставка нарушила бы внешний ключ.
+        Удалённый автор становится NULL.
+        Возвращает (перенесено строк буфера, из них отброшено, строк в буфере
+        до переноса): считать дальше backlog_limit + batch_size + 1 незачем,
+        хватает знать, что после переноса останется больше backlog_limit.
+        """
+        if RequestAudit.compact():
+            insert = """
+                INSERT INTO request_change (request_id, changer_id, changed_at, diff)
+                SELECT b.request_id, u.user_id, b.changed_at, b.diff
+                FROM batch b
+                JOIN request r ON r.request_id = b.request_id
+                LEFT JOIN users u ON u.user_id = b.changer_id
+                ORDER BY b.buffer_id
+            """
+        else:
+            insert = """
+                INSERT INTO request_history (request_id, changer_id, field_name, old_value, new_value, changed_at)
+                SELECT b.request_id, u.user_id, d.key, d.value ->> 0, d.value ->> 1, b.changed_at
+                FROM batch b
+                JOIN request r ON r.request_id = b.request_id
+                LEFT JOIN users u ON u.user_id = b.changer_id
+                CROSS JOIN LATERAL jsonb_each(b.diff) d
+                ORDER BY b.buffer_id
+            """
+        with DatabaseManager.get_cursor(pool=REPORTING) as cursor:
+            cursor.execute(f"""
+                WITH batch AS (
+                    DELETE FROM request_history_buffer
+                    WHERE buffer_id IN (
+                        SELECT buffer_id FROM request_history_buffer
+                        WHERE (SELECT pg_try_advisory_xact_lock(%(lock_key)s))
+                        ORDER BY buffer_id
+                        LIMIT %(batch_size)s
+                    )
+                    RETURNING buffer_id, request_id, changer_id, changed_at, diff
+                ),
+                moved AS ({insert})
+                SELECT (SELECT count(*) FROM batch) AS flushed,
+                       (SELECT count(*) FROM batch b
+                        WHERE NOT EXISTS (SELECT 1 FROM request r WHERE r.request_id = b.request_id)) AS dropped,
+                       (SELECT count(*) FROM (
+                            SELECT 1 FROM request_history_buffer LIMIT %(backlog_limit)s
+                       ) pending) AS backlog;
+            """, {'lock_key': FLUSH_LOCK_KEY, 'batch_size': batch_size,
+                  'backlog_limit': backlog_limit + batch_size + 1})
+            row = cursor.fetchone()
+            return row['flushed'], row['dropped'], row['backlog']
@@ -1,18 +1,22 @@
 from typing import Union, Dict
 from db_manager import DatabaseManager
+from tracing import traced
+from cache import cached
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@traced
 class StatusDAL:
     @staticmethod
+    @cached('reference', ttl=3600)
     def get_status_by_id(status_id: int) -> Union[Dict, str]:
         """
         Получает статус по ID
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute("""
                     SELECT status FROM status WHERE status_id = %s;
                 """, (status_id,))
@@ -2,11 +2,15 @@ from typing import Optional, Dict, Union, List
 import logging
 import psycopg2
 from datetime import datetime
-from db_manager import DatabaseManager
+import audit
+from db_manager import REPORTING, DatabaseManager
+from tracing import traced
+from cache import CacheManager, cached
 
 logger = logging.getLogger(__name__)
 
 
+@traced
 class UserDAL:
     @staticmethod
     def create_user(name: str, login: str, password: str, role_id: int = 1,
@@ -22,8 +26,9 @@ class UserDAL:
                     (role_id, name, login, password, phone, email)
                 )
                 user_id = cursor.fetchone()['user_id']
-                logger.info(f"User {login} created with ID {user_id}")
-                return user_id
+            logger.info(f"User {login} created with ID {user_id}")
+            CacheManager.invalidate('reports')
+            return user_id
         except psycopg2.IntegrityError as e:
             if 'login' in str(e):
                 logger.warning(f"Attempt to create user with existing login: {login}")
@@ -37,7 +42,7 @@ class UserDAL:
     @staticmethod
     def authenticate_user(login: str, password: str) -> Optional[Dict]:
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     """
                     SELECT 
@@ -66,10 +71,11 @@ class UserDAL:
             return None
 
     @staticmethod
+    @cached('identity', ttl=60)
     def get_user_by_id(user_id: int) -> Optional[Dict]:
         """Получение пользователя по ID"""
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     """
                     SELECT 
@@ -92,10 +98,11 @@ class UserDAL:
             return None
 
     @staticmethod
+    @cached('reference', ttl=3600)
     def check_role_exists(role_id: int) -> bool:
         """Проверяет существование роли"""
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     "SELECT 1 FROM roles WHERE role_id = %s;",
                     (role_id,)
@@ -110,7 +117,7 @@ class UserDAL:
     def user_exists_by_id(user_id: int) -> bool:
         """Проверяет существование пользователя по ID"""
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     "SELECT 1 FROM users WHERE user_id = %s;",
                     (user_id,)
@@ -138,7 +145,13 @@ class UserDAL:
                 params = list(fields.values()) + [user_id]
 
                 cursor.execute(query, params)
-                return cursor.fetchone() is not None
+                updated = cursor.fetchone() is not None
+
+            UserDAL.get_user_by_id.invalidate(user_id)
+            # Имя пользователя есть в карточках его заявок (engineer_name)
+            CacheManager.invalidate('request_detail')
+            CacheManager.invalidate('reports')
+            return updated
 
         except Exception as e:
             logger.error(f"Error updating user ID {user_id}: {e}")
@@ -157,7 +170,9 @@ class UserDAL:
                     """,
                     (user_id, schedule)
                 )
-                return cursor.fetchone()['engin_id']
+                engin_id = cursor.fetchone()['engin_id']
+            CacheManager.invalidate('reports')
+            return engin_id
         except Exception as e:
             logger.error(f"Error creating engineer profile: {e}")
             raise
@@ -166,7 +181,7 @@ class UserDAL:
     def get_engineer_profile(user_id: int) -> Optional[Dict]:
         """Получает профиль инженера"""
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute(
                     """
                     SELECT balance, schedule
@@ -205,7 +220,7 @@ class UserDAL:
         Получает логин и пароль пользователя по его ID
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 cursor.execute("""
                     SELECT login, passw FROM users WHERE user_id = %s;
                 """, (user_id,))
@@ -218,12 +233,58 @@ class UserDAL:
     @staticmethod
     def delete_user(user_id: int) -> str:
         """
-        Удаляет пользователя по ID
+        Удаляет пользователя вместе со ссылками на него одним запросом:
+        обнуляет его в заявках, истории заявок (обоих форматов) и истории баланса, удаляет
+        историю баланса и профиль инженера. Всё в одной транзакции — сбой
+        посередине ничего не оставляет наполовину. Каждая подзапись идёт
+        по индексу на ссылающемся столбце (миграции 0002, 0003, 0005).
+        У давно работающего оператора это десятки тысяч строк, поэтому
+        запрос идёт через пул REPORTING с его statement_timeout.
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
-                cursor.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
-                return "OK"
+            with DatabaseManager.get_cursor(pool=REPORTING) as cursor:
+                # Подзапросы WITH видят один снимок, и одна строка не должна
+                # меняться дважды: заявка обнуляется одним UPDATE по обоим
+                # столбцам, а записи баланса самого инженера удаляются, а не обнуляются.
+                # Обнуление ссылок в заявках — не правка заявки: remont.audit='off'
+                # велит триггеру request_audit не писать историю для этого оператора
+                cursor.execute("""
+                    WITH requests AS (
+                        UPDATE request
+                        SET operator_id = NULLIF(operator_id, %(user_id)s),
+                            engineer_id = NULLIF(engineer_id, %(user_id)s)
+                        WHERE (operator_id = %(user_id)s OR engineer_id = %(user_id)s)
+                          AND (SELECT set_config('remont.audit', %(audit)s, true)) IS NOT NULL
+                    ), history AS (
+                        UPDATE request_history
+                        SET changer_id = NULL
+                        WHERE changer_id = %(user_id)s
+                    ), changes AS (
+                        UPDATE request_change
+                        SET changer_id = NULL
+                        WHERE changer_id = %(user_id)s
+                    ), balance_admin AS (
+                        UPDATE balance_history
+                        SET admin_id = NULL
+                        WHERE admin_id = %(user_id)s AND engineer_id IS DISTINCT FROM %(user_id)s
+                    ), balance AS (
+                        DELETE FROM balance_history
+                        WHERE engineer_id = %(user_id)s
+                    ), profile AS (
+                        DELETE FROM engineer_profile
+                        WHERE user_id = %(user_id)s
+                    )
+                    DELETE FROM users
+                    WHERE user_id = %(user_id)s
+                    RETURNING user_id;
+                """, {'user_id': user_id, 'audit': audit.OFF})
+                deleted = cursor.fetchone() is not None
+            if not deleted:
+                return "User not found"
+            UserDAL.get_user_by_id.invalidate(user_id)
+            CacheManager.invalidate('request_detail')
+            CacheManager.invalidate('reports')
+            return "OK"
         except Exception as e:
             logger.error(f"Error deleting user {user_id}: {e}")
             return "Internal server error"
@@ -234,7 +295,7 @@ class UserDAL:
         Получает список всех пользователей, с расписанием и балансом для инженеров
         """
         try:
-            with DatabaseManager.get_cursor() as cursor:
+            with DatabaseManager.get_cursor(readonly=True) as cursor:
                 query = """
                         SELECT
                             u.user_id,
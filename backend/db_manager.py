@@ -1,57 +1,357 @@
-from typing import Iterator
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from psycopg2 import pool
 from contextlib import contextmanager
 import logging
+from contextvars import ContextVar
 from config import Settings
+from cache import CacheManager, MISS
+from db_pool import BlockingConnectionPool, with_statement_timeout
+from db_replicas import ReplicaRouter, checkout
+from db_statements import fingerprint, redact, with_budget
+from metrics import DB_STATEMENT_SECONDS, current_request
+from tracing import CLIENT, current_span, current_trace_id, span
 
 logger = logging.getLogger(__name__)
 
+# Кто выполняет текущий HTTP-запрос и писал ли он уже в БД (read-your-writes)
+_actor: ContextVar[Optional[str]] = ContextVar('db_actor', default=None)
+_wrote: ContextVar[bool] = ContextVar('db_wrote', default=False)
+# Перехваченные запросы внутри DatabaseManager.capture()
+_captured: ContextVar[Optional[List[Tuple[str, str, Any]]]] = ContextVar('db_captured', default=None)
+
+# Ошибки, после которых соединение может оказаться разорванным
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def connection_lost(conn) -> bool:
+    """Соединение разорвано (сервер перезапущен, сеть, pg_terminate_backend)"""
+    return conn is None or conn.closed != 0
+
+
+class ManagedCursor:
+    """
+    Курсор, выдаваемый get_cursor. Ведёт себя как RealDictCursor, а при
+    retry=True, если соединение оборвалось, один раз берёт новое из пула
+    и повторяет запрос. Повтор безопасен только для чтения: после обрыва
+    транзакция всё равно потеряна, а запись могла успеть примениться.
+    readonly=True — соединение в autocommit: запросы идут без BEGIN/COMMIT.
+
+    Каждый execute попадает в гистограмму по DAL-методу (вызывающая функция)
+    и отпечатку запроса; запросы дольше slow_query_ms пишутся в лог без
+    значений параметров. Для методов из budgets перед запросом ставится
+    свой statement_timeout.
+    """
+
+    def __init__(self, pool, conn, retry: bool = False, readonly: bool = False,
+                 slow_query_ms: int = 0, budgets: Optional[Dict[str, int]] = None):
+        self._pool = pool
+        self._retry = retry
+        self.readonly = readonly
+        self._slow_query_ms = slow_query_ms
+        self._budgets = budgets or {}
+        self.last_method = None
+        self.last_statement = None
+        self._attach(conn)
+
+    def _attach(self, conn):
+        self.connection = conn
+        if self.readonly:
+            # Флаг меняется только на клиенте, запроса к серверу нет
+            conn.autocommit = True
+        self._cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    def execute(self, query, params=None):
+        method = sys._getframe(1).f_code.co_qualname
+        statement, normalized = fingerprint(query)
+        self.last_method, self.last_statement = method, statement
+        captured = _captured.get()
+        if captured is not None:
+            captured.append((method, query, params))
+        budget = self._budgets.get(method)
+        sql = with_budget(query, budget) if budget else query
+
+        if current_span() is None:
+            return self._timed_execute(method, statement, normalized, sql, params)
+        attributes = {
+            'db.system': 'postgresql',
+            'db.method': method,
+            'db.fingerprint': statement,
+            'db.statement': normalized,
+            'db.pool': 'readonly' if self.readonly else 'readwrite',
+        }
+        with span('db.query', CLIENT, **attributes) as query_span:
+            result = self._timed_execute(method, statement, normalized, sql, params)
+            query_span.set('db.rows', self._cursor.rowcount)
+            return result
+
+    def _timed_execute(self, method, statement, normalized, sql, params):
+        started = time.perf_counter()
+        try:
+            return self._execute(sql, params)
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_STATEMENT_SECONDS.labels(method, statement).observe(elapsed)
+            stats = current_request()
+            if stats is not None:
+                stats.count_statement(method, statement, elapsed)
+            if self._slow_query_ms and elapsed * 1000 >= self._slow_query_ms:
+                trace_id = current_trace_id()
+                logger.warning(
+                    f"Slow query {elapsed * 1000:.0f}ms in {method} [{statement}]"
+                    f"{f' trace={trace_id}' if trace_id else ''}: {normalized} params={redact(params)}"
+                )
+
+    def _execute(self, query, params):
+        try:
+            return self._cursor.execute(query, params)
+        except CONNECTION_ERRORS as e:
+            if not self._retry or not connection_lost(self.connection):
+                raise
+            self._retry = False
+            logger.warning(f"Database connection lost, retrying on a new connection: {e}")
+            self._reconnect()
+            return self._cursor.execute(query, params)
+
+    def _reconnect(self):
+        self._pool.putconn(self.connection, close=True)
+        self.connection = None
+        self._attach(self._pool.getconn())
+
+    def close(self):
+        if not self._cursor.closed:
+            self._cursor.close()
+        if self.readonly and not connection_lost(self.connection):
+            self.connection.autocommit = False
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Пулы по типу нагрузки. DAL-метод выбирает пул через get_cursor(pool=...)
+INTERACTIVE = 'interactive'
+REPORTING = 'reporting'
+
+
+def pool_specs(config: Settings) -> Dict[str, Dict]:
+    """Размер, ожидание и statement_timeout каждого пула"""
+    return {
+        INTERACTIVE: {
+            'minconn': config.DB_POOL_MIN,
+            'maxconn': config.DB_POOL_MAX,
+            'timeout': config.DB_POOL_TIMEOUT,
+            'statement_timeout': config.DB_POOL_STATEMENT_TIMEOUT,
+        },
+        REPORTING: {
+            'minconn': config.DB_REPORTING_POOL_MIN,
+            'maxconn': config.DB_REPORTING_POOL_MAX,
+            'timeout': config.DB_REPORTING_POOL_TIMEOUT,
+            'statement_timeout': config.DB_REPORTING_STATEMENT_TIMEOUT,
+        },
+    }
+
+
 class DatabaseManager:
-    _pool = None
+    _pools: Dict[str, BlockingConnectionPool] = {}
+    _replicas: Optional[ReplicaRouter] = None
+    _pid = None
+    _config = None
+    _lock = threading.Lock()
 
     @classmethod
     def initialize(cls, config: Settings):
         """Инициализация пула соединений при старте приложения"""
-        if cls._pool is None:
+        with cls._lock:
+            cls._initialize(config)
+
+    @classmethod
+    def _initialize(cls, config: Settings):
+        cls._config = config
+        if cls._pools and cls._pid != os.getpid():
+            # Пулы унаследованы от родителя через fork: их сокеты принадлежат
+            # другому процессу. Закрывать их нельзя — это оборвёт соединения
+            # родителя, поэтому просто забываем пулы и создаём свои
+            cls._pools = {}
+            cls._replicas = None
+        if not cls._pools:
+            connect_kwargs = {
+                'user': config.USER,
+                'password': config.PASSWORD,
+                'host': config.HOST_NAME,
+                'port': config.PORT_NAME,
+                'database': config.DB_NAME,
+            }
+            specs = pool_specs(config)
             try:
-                cls._pool = pool.ThreadedConnectionPool(
-                    minconn=1,
-                    maxconn=10,
-                    user=config.USER,
-                    password=config.PASSWORD,
-                    host=config.HOST_NAME,
-                    port=config.PORT_NAME,
-                    database=config.DB_NAME
+                pools = {}
+                for name, spec in specs.items():
+                    pools[name] = BlockingConnectionPool(
+                        minconn=spec['minconn'],
+                        maxconn=spec['maxconn'],
+                        timeout=spec['timeout'],
+                        max_lifetime=config.DB_POOL_MAX_LIFETIME,
+                        health_check_idle=config.DB_POOL_HEALTHCHECK_IDLE,
+                        **with_statement_timeout(connect_kwargs, spec['statement_timeout'])
+                    )
+                cls._pools = pools
+                cls._replicas = ReplicaRouter.from_settings(config, specs)
+                cls._pid = os.getpid()
+                logger.info(
+                    f"Database connection pools {', '.join(pools)} initialized in process {cls._pid}, "
+                    f"replicas: {len(cls._replicas.replicas)}"
                 )
-                logger.info("Database connection pool initialized")
             except Exception as e:
                 logger.error(f"Connection pool initialization failed: {e}")
                 raise
 
+    @classmethod
+    def set_actor(cls, actor_id) -> None:
+        """Привязывает текущий запрос к пользователю (вызывается в before_request)"""
+        _actor.set(str(actor_id) if actor_id is not None else None)
+        _wrote.set(False)
+
+    @classmethod
+    def reset_actor(cls) -> None:
+        _actor.set(None)
+        _wrote.set(False)
+
+    @classmethod
+    def _recently_wrote(cls) -> bool:
+        """Пользователь недавно писал в БД: его чтения идут на мастер, где запись уже видна"""
+        if _wrote.get():
+            return True
+        actor = _actor.get()
+        return actor is not None and CacheManager.get('rw_sticky', actor) is not MISS
+
+    @classmethod
+    def _remember_write(cls) -> None:
+        actor = _actor.get()
+        # Вне HTTP-запроса (скрипты, фоновые потоки) пользователя нет и метку не ставим
+        if actor is None or not cls._replicas or not cls._replicas.replicas:
+            return
+        _wrote.set(True)
+        # Метка в общем кэше, чтобы следующие запросы пользователя в любом воркере
+        # читали с мастера, пока реплики не догонят
+        CacheManager.set('rw_sticky', actor, True, ttl=cls._config.DB_READ_YOUR_WRITES_WINDOW)
+
+    @classmethod
+    def _checkout(cls, pool_name: str, readonly: bool):
+        """Выбор пула: чтение — на реплику по кругу, всё остальное и запасной вариант — мастер"""
+        started = time.perf_counter()
+        try:
+            return cls._choose_and_checkout(pool_name, readonly)
+        finally:
+            stats = current_request()
+            if stats is not None:
+                stats.checkouts += 1
+                stats.pool_wait += time.perf_counter() - started
+
+    @classmethod
+    def _choose_and_checkout(cls, pool_name: str, readonly: bool):
+        if pool_name not in cls._pools:
+            raise ValueError(f"Unknown connection pool: {pool_name}")
+        if readonly and cls._replicas and cls._replicas.replicas and not cls._recently_wrote():
+            replica = cls._replicas.get()
+            if replica is not None:
+                conn = checkout(replica, pool_name)
+                if conn is not None:
+                    return replica.pools[pool_name], conn
+        pool = cls._pools[pool_name]
+        return pool, pool.getconn()
+
     @classmethod
     @contextmanager
-    def get_cursor(cls) -> Iterator[RealDictCursor]:
-        """Контекстный менеджер для безопасной работы с курсором"""
-        conn = None
+    def get_cursor(cls, readonly: bool = False, retry: Optional[bool] = None,
+                   pool: str = INTERACTIVE) -> Iterator[RealDictCursor]:
+        """
+        Контекстный менеджер для безопасной работы с курсором.
+        readonly=True — для методов, которые только читают: каждый запрос
+        выполняется сразу, без BEGIN и COMMIT, то есть на один сетевой
+        обмен меньше. SET TRANSACTION READ ONLY добавил бы обмен обратно,
+        поэтому запрет записи здесь — соглашение, а не проверка сервера.
+        retry=True — при обрыве соединения запрос один раз повторяется
+        на новом соединении; по умолчанию включён для readonly.
+        Если заданы реплики (DB_REPLICA_DSNS), readonly-запросы идут на них.
+        pool — пул по типу нагрузки: INTERACTIVE (по умолчанию) или REPORTING
+        для тяжёлых отчётов; у каждого свой размер и statement_timeout.
+        """
+        pool_name = pool
+        if retry is None:
+            retry = readonly
+        cursor = None
+        pool = None
+        if cls._pid != os.getpid() and cls._config is not None:
+            cls.initialize(cls._config)
         try:
-            conn = cls._pool.getconn()
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                yield cursor
-            conn.commit()
+            pool, conn = cls._checkout(pool_name, readonly)
+            cursor = ManagedCursor(
+                pool, conn, retry=retry, readonly=readonly,
+                slow_query_ms=cls._config.DB_SLOW_QUERY_MS,
+                budgets=cls._config.DB_STATEMENT_BUDGETS
+            )
+            yield cursor
+            if not readonly:
+                if _captured.get() is not None:
+                    cursor.connection.rollback()
+                else:
+                    cursor.connection.commit()
+                    cls._remember_write()
         except psycopg2.Error as e:
-            logger.error(f"Database error: {e}")
-            if conn:
-                conn.rollback()
+            if cursor and cursor.last_method:
+                logger.error(f"Database error in {cursor.last_method} [{cursor.last_statement}]: {e}")
+            else:
+                logger.error(f"Database error: {e}")
+            if cursor and not readonly and not connection_lost(cursor.connection):
+                cursor.connection.rollback()
             raise
         finally:
-            if conn:
-                cls._pool.putconn(conn)
+            if cursor and cursor.connection is not None:
+                cursor.close()
+                # Разорванное соединение в пул не возвращаем
+                pool.putconn(cursor.connection, close=connection_lost(cursor.connection))
+
+    @classmethod
+    @contextmanager
+    def capture(cls) -> Iterator[List[Tuple[str, str, Any]]]:
+        """
+        Собирает (DAL-метод, запрос, параметры) каждого execute внутри блока.
+        Записывающие транзакции при этом откатываются вместо COMMIT, так что
+        DAL можно вызывать на настоящих данных, не меняя их (tools/plan_check.py).
+        """
+        statements: List[Tuple[str, str, Any]] = []
+        token = _captured.set(statements)
+        try:
+            yield statements
+        finally:
+            _captured.reset(token)
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Статистика пулов по именам: ожидание выдачи соединения, занятость, исчерпания"""
+        stats = {}
+        for name, pool in cls._pools.items():
+            stats[f'primary:{name}'] = pool.stats()
+        if cls._replicas:
+            for replica in cls._replicas.replicas:
+                for name, pool in replica.pools.items():
+                    stats[f'{replica.name}:{name}'] = dict(pool.stats(), lag=replica.lag, healthy=replica.healthy)
+        return stats
 
     @classmethod
     def close_all(cls):
         """Закрыть все соединения при завершении приложения"""
-        if cls._pool:
-            cls._pool.closeall()
-            logger.info("All database connections closed")
\ No newline at end of file
+        if cls._pools and cls._pid == os.getpid():
+            for pool in cls._pools.values():
+                pool.closeall()
+            if cls._replicas:
+                cls._replicas.closeall()
+            logger.info("All database connections closed")
+        cls._pools = {}
+        cls._replicas = None
\ No newline at end of file
@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(pool.PoolError):
+    """Не удалось получить соединение за отведённое время"""
+
+
+# Вместо соединения ожидающему передаётся право открыть новое
+_OPEN_NEW = object()
+
+
+class _Waiter:
+    __slots__ = ('event', 'conn')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+
+
+class PoolStats:
+    """Счётчики пула для подбора размера и мониторинга"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0  # сколько раз свободных соединений не было и пришлось ждать
+        self.timeouts = 0  # ожидание закончилось ошибкой
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.opened = 0
+        self.retired = 0  # закрыто по max_lifetime или из-за ошибки
+
+    def snapshot(self, in_use: int, idle: int, size: int, maxconn: int, waiting: int) -> Dict:
+        return {
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'wait_time_total': self.wait_time_total,
+            'wait_time_max': self.wait_time_max,
+            'wait_time_avg': self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+            'opened': self.opened,
+            'retired': self.retired,
+            'in_use': in_use,
+            'idle': idle,
+            'size': size,
+            'max_size': maxconn,
+            'waiting': waiting,
+        }
+
+
+def with_statement_timeout(connect_kwargs: Dict, statement_timeout: int) -> Dict:
+    """
+    Добавляет statement_timeout (мс) в параметры подключения. Значение уходит
+    в startup-пакете (options), отдельного SET после подключения не нужно.
+    """
+    if not statement_timeout:
+        return connect_kwargs
+    options = f"{connect_kwargs.get('options', '')} -c statement_timeout={int(statement_timeout)}"
+    return dict(connect_kwargs, options=options.strip())
+
+
+class BlockingConnectionPool:
+    """
+    Пул соединений psycopg2, который при исчерпании не бросает PoolError сразу,
+    а ждёт освобождения соединения до timeout секунд.
+    - ожидающие обслуживаются строго по очереди (FIFO)
+    - соединение старше max_lifetime секунд закрывается при возврате в пул
+    - соединение, пролежавшее без дела дольше health_check_idle секунд,
+      перед выдачей проверяется запросом SELECT 1; мёртвое заменяется новым
+    - статистика ожидания и занятости доступна через stats()
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 5.0,
+                 max_lifetime: float = 0, health_check_idle: float = 0, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self._connect_kwargs = connect_kwargs
+
+        self._lock = threading.Lock()
+        self._idle: Deque = deque()
+        self._waiters: Deque[_Waiter] = deque()
+        self._opened_at: Dict[int, float] = {}
+        self._returned_at: Dict[int, float] = {}
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._stats = PoolStats()
+
+        for _ in range(minconn):
+            self._size += 1
+            self._idle.append(self._connect())
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(**self._connect_kwargs)
+        except Exception:
+            with self._lock:
+                self._release_slot()
+            raise
+        self._opened_at[id(conn)] = time.monotonic()
+        self._returned_at[id(conn)] = time.monotonic()
+        self._stats.opened += 1
+        return conn
+
+    def _alive(self, conn) -> bool:
+        """Дешёвая проверка соединения после простоя: один SELECT 1 без транзакции"""
+        idle_for = time.monotonic() - self._returned_at.get(id(conn), 0)
+        if not self.health_check_idle or idle_for < self.health_check_idle:
+            return True
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.autocommit = False
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding dead pooled connection idle for {idle_for:.0f}s: {e}")
+            return False
+
+    def _expired(self, conn) -> bool:
+        if conn.closed:
+            return True
+        if not self.max_lifetime:
+            return False
+        return time.monotonic() - self._opened_at.get(id(conn), 0) > self.max_lifetime
+
+    def _discard(self, conn) -> None:
+        self._opened_at.pop(id(conn), None)
+        self._returned_at.pop(id(conn), None)
+        self._stats.retired += 1
+        if not conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _release_slot(self) -> None:
+        """Место в пуле освободилось: отдаём его первому ожидающему (под self._lock)"""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.conn = _OPEN_NEW
+            waiter.event.set()
+        else:
+            self._size -= 1
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Берёт соединение из пула, при необходимости ожидая его освобождения"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        conn = None
+        waiter = None
+
+        with self._lock:
+            if self._closed:
+                raise pool.PoolError("connection pool is closed")
+            if not self._waiters:
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate):
+                        self._discard(candidate)
+                        self._size -= 1
+                        continue
+                    conn = candidate
+                    break
+                if conn is None and self._size < self.maxconn:
+                    self._size += 1
+                    conn = _OPEN_NEW
+            if conn is None:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self._stats.waits += 1
+
+        if waiter is not None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                conn = waiter.conn
+                if conn is None:
+                    self._waiters.remove(waiter)
+                    self._stats.timeouts += 1
+                    logger.warning(
+                        f"Connection pool exhausted: no connection within {timeout}s "
+                        f"(size={self._size}, waiting={len(self._waiters)})"
+                    )
+                    raise PoolTimeout(f"Timed out after {timeout}s waiting for a database connection")
+
+        if conn is _OPEN_NEW:
+            conn = self._connect()
+        elif not self._alive(conn):
+            # Место в пуле остаётся за нами: закрываем мёртвое и открываем новое
+            with self._lock:
+                self._discard(conn)
+            conn = self._connect()
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._in_use += 1
+            self._stats.checkouts += 1
+            self._stats.wait_time_total += waited
+            self._stats.wait_time_max = max(self._stats.wait_time_max, waited)
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """Возвращает соединение в пул; close=True — закрыть его (например, сломанное)"""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._lock:
+            self._in_use -= 1
+            if close or self._closed or self._expired(conn):
+                self._discard(conn)
+                self._release_slot()
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                self._returned_at[id(conn)] = time.monotonic()
+                waiter.conn = conn
+                waiter.event.set()
+            else:
+                self._returned_at[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+
+    def closeall(self) -> None:
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            for waiter in self._waiters:
+                waiter.event.set()
+            self._waiters.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return self._stats.snapshot(
+                in_use=self._in_use,
+                idle=len(self._idle),
+                size=self._size,
+                maxconn=self.maxconn,
+                waiting=len(self._waiters),
+            )
@@ -0,0 +1,142 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import parse_dsn
+
+from config import Settings
+from db_pool import BlockingConnectionPool, with_statement_timeout
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах. Если всё полученное WAL уже применено,
+# реплика догнала мастер, даже если последняя транзакция была давно
+LAG_QUERY = """
+    SELECT pg_is_in_recovery() AS in_recovery,
+           CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END AS lag
+"""
+
+
+class Replica:
+    """
+    Реплика для чтения: свои пулы соединений (по одному на каждый пул мастера,
+    с теми же statement_timeout) и периодически проверяемое отставание
+    """
+
+    def __init__(self, name: str, pools: Dict[str, BlockingConnectionPool]):
+        self.name = name
+        self.pools = pools
+        self.lag: float = 0.0
+        self.healthy = True
+        self.checked_at = 0.0
+        self._check_lock = threading.Lock()
+
+    def refresh(self, interval: float) -> None:
+        """
+        Обновляет отставание не чаще раза в interval секунд. Проверяет один
+        поток, остальные в это время пользуются прошлым значением.
+        """
+        if time.monotonic() - self.checked_at < interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        check_pool = next(iter(self.pools.values()))
+        try:
+            conn = check_pool.getconn()
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(LAG_QUERY)
+                    in_recovery, lag = cursor.fetchone()
+                conn.autocommit = False
+            finally:
+                check_pool.putconn(conn, close=conn.closed != 0)
+            if not in_recovery and self.healthy and self.checked_at == 0.0:
+                logger.warning(f"Replica {self.name} is not in recovery mode; is it really a standby?")
+            self.lag = float(lag)
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Replica {self.name} is unavailable, reading from primary: {e}")
+            self.healthy = False
+        finally:
+            self.checked_at = time.monotonic()
+            self._check_lock.release()
+
+    def mark_down(self, error: Exception) -> None:
+        """Реплика не дала соединение: не используем её до следующей проверки"""
+        if self.healthy:
+            logger.warning(f"Replica {self.name} is unavailable, reading from primary: {error}")
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """
+    Раздаёт читающие запросы по репликам по кругу. Реплика пропускается,
+    если она недоступна или отстаёт больше max_lag секунд; если подходящих
+    реплик нет, get() возвращает None и запрос идёт на мастер.
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag: float, check_interval: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_settings(cls, config: Settings, pool_specs: Dict[str, Dict]) -> "ReplicaRouter":
+        replicas = []
+        for index, dsn in enumerate(config.DB_REPLICA_DSNS):
+            params = parse_dsn(dsn)
+            # Учётные данные и база по умолчанию — как у мастера
+            params.setdefault('user', config.USER)
+            params.setdefault('password', config.PASSWORD)
+            params.setdefault('dbname', config.DB_NAME)
+            params.setdefault('port', config.PORT_NAME)
+            name = f"replica{index}:{params.get('host', 'localhost')}"
+            pools = {}
+            for pool_name, spec in pool_specs.items():
+                # minconn=0: недоступная при старте реплика не мешает запуску
+                pools[pool_name] = BlockingConnectionPool(
+                    minconn=0,
+                    maxconn=spec['maxconn'],
+                    timeout=spec['timeout'],
+                    max_lifetime=config.DB_POOL_MAX_LIFETIME,
+                    health_check_idle=config.DB_POOL_HEALTHCHECK_IDLE,
+                    **with_statement_timeout(params, spec['statement_timeout'])
+                )
+            replicas.append(Replica(name, pools))
+        return cls(replicas, config.DB_REPLICA_MAX_LAG, config.DB_REPLICA_CHECK_INTERVAL)
+
+    def get(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        for replica in self.replicas:
+            replica.refresh(self.check_interval)
+        usable = [r for r in self.replicas if r.healthy and r.lag <= self.max_lag]
+        if not usable:
+            return None
+        return usable[next(self._counter) % len(usable)]
+
+    def closeall(self) -> None:
+        for replica in self.replicas:
+            for pool in replica.pools.values():
+                pool.closeall()
+
+
+def checkout(replica: Replica, pool_name: str):
+    """Соединение из пула pool_name реплики; None, если реплика не отвечает"""
+    try:
+        return replica.pools[pool_name].getconn()
+    except (psycopg2.Error, pg_pool.PoolError) as e:
+        replica.mark_down(e)
+        return None
@@ -0,0 +1,43 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Tuple
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> Tuple[str, str]:
+    """
+    Нормализует текст запроса: без комментариев и лишних пробелов,
+    литералы заменены на '?'. Возвращает (короткий хэш, нормализованный текст).
+    Запросы, отличающиеся только литералами, получают один отпечаток.
+    """
+    normalized = _COMMENTS.sub(' ', query)
+    normalized = _STRINGS.sub('?', normalized)
+    normalized = _NUMBERS.sub('?', normalized)
+    normalized = _IN_LISTS.sub('(?)', normalized)
+    normalized = _SPACES.sub(' ', normalized).strip().rstrip(';').strip()
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    return digest, normalized
+
+
+def redact(params: Any) -> str:
+    """Параметры для лога без значений (логины, пароли, телефоны): только типы"""
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + '}'
+    return '(' + ', '.join(f"<{type(value).__name__}>" for value in params) + ')'
+
+
+def with_budget(query: str, budget_ms: int) -> str:
+    """
+    Ограничивает время запроса: SET LOCAL уходит в том же сообщении, что и сам
+    запрос, и действует до конца транзакции (в autocommit — только на этот запрос)
+    """
+    return f"SET LOCAL statement_timeout = {int(budget_ms)}; {query}"
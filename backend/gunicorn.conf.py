@@ -0,0 +1,73 @@
+# Конфигурация gunicorn: gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Метрики воркеров prometheus_client пишет в общий каталог, /metrics собирает их вместе.
+# Переменная должна быть задана до импорта prometheus_client (через db_manager)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "remont-metrics"))
+
+from config import Settings
+from db_manager import DatabaseManager
+from cache import CacheManager
+from history_flusher import HistoryFlusher
+
+settings = Settings()
+
+# Приложение загружается один раз в мастере (preload), пул БД создаётся в каждом воркере
+wsgi_app = "main:create_app(init_db=False)"
+preload_app = True
+
+bind = settings.WEB_BIND
+workers = settings.WEB_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = settings.WEB_WORKER_CLASS
+threads = settings.WEB_THREADS
+worker_connections = settings.WEB_WORKER_CONNECTIONS
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+max_requests = settings.WEB_MAX_REQUESTS
+max_requests_jitter = settings.WEB_MAX_REQUESTS // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Метрики прошлого запуска не должны попасть в новые"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_worker_init(worker):
+    """
+    Свои соединения с БД и кэшем в каждом воркере. Не в post_fork:
+    воркер gevent делает monkey patching в init_process, уже после post_fork,
+    и созданные там блокировки пула и поток переноса истории остались бы
+    настоящими — ожидание на них останавливало бы весь hub
+    """
+    if worker_class == "gevent":
+        # psycopg2 блокирует весь процесс без кооперативных вызовов gevent
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    DatabaseManager.initialize(settings)
+    CacheManager.initialize(settings)
+    # Поток переноса буфера истории: в мастере его нет, fork потоки не копирует
+    HistoryFlusher.start(settings)
+    worker.log.info(f"Worker {worker.pid}: database pool initialized")
+
+
+def worker_exit(server, worker):
+    """Корректное закрытие соединений при остановке воркера"""
+    # Остаток буфера истории переносится, пока соединения ещё открыты
+    HistoryFlusher.stop()
+    DatabaseManager.close_all()
+    CacheManager.close_all()
+
+
+def child_exit(server, worker):
+    """Gauge-метрики остановленного воркера больше не учитываются"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
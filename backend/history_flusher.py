@@ -0,0 +1,88 @@
+"""
+Перенос буфера истории заявок (REQUEST_HISTORY_WRITE_MODE=buffered, см. audit.py).
+
+В каждом воркере работает фоновый поток: раз в REQUEST_HISTORY_FLUSH_INTERVAL
+секунд он переносит пачку request_history_buffer в request_history или
+request_change, а если пачка была полной — сразу следующую. Одновременно
+переносит один воркер, остальные только следят за размером буфера.
+Когда в буфере больше REQUEST_HISTORY_BUFFER_LIMIT строк или перенос
+не удаётся, update_request снова пишет историю сразу: запись замедляется
+до прежней, а буфер не растёт, пока поток его не разберёт.
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from audit import BUFFERED, RequestAudit
+from config import Settings
+from dal.request_history import RequestHistoryDAL
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryFlusher:
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _config: Optional[Settings] = None
+
+    @classmethod
+    def start(cls, config: Settings) -> None:
+        """Запускает поток переноса в текущем процессе (после fork — свой в каждом воркере)"""
+        if RequestAudit.write_mode != BUFFERED:
+            return
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        cls._config = config
+        cls._stop = threading.Event()
+        cls._thread = threading.Thread(target=cls._run, name='history-flusher', daemon=True)
+        cls._thread.start()
+        RequestAudit.set_buffer_state(running=True)
+        logger.info(f"Request history flusher started in process {os.getpid()}")
+
+    @classmethod
+    def stop(cls, timeout: float = 10.0) -> None:
+        """
+        Останавливает поток и переносит то, что осталось в буфере: новые
+        изменения к этому моменту уже пишутся сразу
+        """
+        if cls._thread is None:
+            return
+        RequestAudit.set_buffer_state(running=False)
+        cls._stop.set()
+        cls._thread.join(timeout)
+        cls._thread = None
+        try:
+            while cls.flush_once() == cls._config.REQUEST_HISTORY_FLUSH_BATCH:
+                pass
+        except Exception as e:
+            logger.error(f"Final request history flush failed, rows stay in the buffer: {e}")
+        logger.info(f"Request history flusher stopped in process {os.getpid()}")
+
+    @classmethod
+    def flush_once(cls) -> int:
+        """Одна пачка; обновляет состояние буфера. Возвращает число перенесённых строк"""
+        limit = cls._config.REQUEST_HISTORY_BUFFER_LIMIT
+        flushed, dropped, backlog = RequestHistoryDAL.flush_buffer(cls._config.REQUEST_HISTORY_FLUSH_BATCH, limit)
+        if not cls._stop.is_set():
+            RequestAudit.set_buffer_state(running=True, saturated=backlog - flushed > limit)
+        if dropped:
+            logger.warning(f"Dropped {dropped} request history buffer rows of deleted requests")
+        if flushed:
+            logger.debug(f"Flushed {flushed} request history buffer rows, {max(backlog - flushed, 0)} left")
+        return flushed
+
+    @classmethod
+    def _run(cls) -> None:
+        interval = cls._config.REQUEST_HISTORY_FLUSH_INTERVAL
+        batch_size = cls._config.REQUEST_HISTORY_FLUSH_BATCH
+        delay = interval
+        while not cls._stop.wait(delay):
+            try:
+                # Полная пачка — в буфере есть ещё: следующая без паузы
+                delay = 0 if cls.flush_once() == batch_size else interval
+            except Exception as e:
+                # База недоступна или перенос падает: буфер не наполняем, пока не заработает
+                logger.error(f"Request history flush failed: {e}")
+                RequestAudit.set_buffer_state(running=True, saturated=True)
+                delay = interval
@@ -0,0 +1,56 @@
+import time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from flask.json.provider import JSONProvider
+
+from metrics import current_request
+from tracing import span
+
+
+def _default(obj: Any):
+    """Типы, которые orjson не сериализует сам"""
+    if isinstance(obj, Decimal):
+        # Строкой, как у стандартного провайдера Flask: float теряет точность
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    JSON-провайдер Flask на orjson.
+    - строки RealDictRow сериализуются как обычные dict
+    - Decimal (баланс) — строкой, как и со стандартным провайдером
+    - datetime/date — ISO 8601 ('2026-01-01T10:00:00Z') вместо HTTP-формата
+      стандартного провайдера ('Thu, 01 Jan 2026 10:00:00 GMT'). Это видно
+      клиентам: фронтенд разбирает даты через new Date() и DatePipe, которые
+      понимают оба формата, и присылает их обратно в update_request, где
+      Postgres тоже принимает оба. naive-время считается UTC и помечается 'Z',
+      как и раньше 'GMT'; микросекунды сохраняются
+    """
+
+    option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def _option(self) -> int:
+        if self._app.debug:
+            return self.option | orjson.OPT_INDENT_2
+        return self.option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=self._option()).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        with span('serialize.json'):
+            data = orjson.dumps(obj, default=_default, option=self._option())
+        stats = current_request()
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - started
+        return self._app.response_class(data, mimetype='application/json')
@@ -1,32 +1,70 @@
+from typing import Optional
 from flask import Flask
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, get_jwt_identity, verify_jwt_in_request
 from flask_cors import CORS
 from config import Settings
 from db_manager import DatabaseManager
+from cache import CacheManager
+from audit import RequestAudit
+from history_flusher import HistoryFlusher
 from api import main_blueprint
+from json_provider import ORJSONProvider
+from monitoring import init_monitoring
+from profiling import init_profiling
+from tracing import init_tracing
 
-config = Settings()
 
-app = Flask(__name__)
+def create_app(config: Optional[Settings] = None, init_db: bool = True) -> Flask:
+    """
+    Фабрика приложения.
+    init_db=False — пул соединений не создаётся: так приложение загружается
+    в мастер-процессе gunicorn, а каждый воркер открывает свой пул после fork
+    (см. gunicorn.conf.py).
+    """
+    config = config or Settings()
 
-# Конфигурация
-app.config['JWT_SECRET_KEY'] = config.SECRET_KEY
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # Для теста
+    app = Flask(__name__)
+    app.json = ORJSONProvider(app)
 
+    # Конфигурация
+    app.config['JWT_SECRET_KEY'] = config.SECRET_KEY
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # Для теста
 
-CORS(app, origins=["http://localhost:4200"])
+    CORS(app, origins=["http://localhost:4200"])
 
-jwt = JWTManager(app)
-DatabaseManager.initialize(config)
+    JWTManager(app)
+    init_tracing(app, config)
+    init_monitoring(app, config)
+    init_profiling(app, config)
+    RequestAudit.initialize(config)
+    if init_db:
+        DatabaseManager.initialize(config)
+        CacheManager.initialize(config)
+        HistoryFlusher.start(config)
 
-# Регистрация блюпринтов
-app.register_blueprint(main_blueprint)
+    @app.before_request
+    def bind_db_actor():
+        # Для read-your-writes: чтения пользователя после его записи идут на мастер
+        try:
+            verify_jwt_in_request(optional=True)
+            DatabaseManager.set_actor(get_jwt_identity())
+        except Exception:
+            DatabaseManager.set_actor(None)
 
-@app.route('/')
-def root():
-    return 'Backend работает должным образом.'
+    @app.teardown_request
+    def unbind_db_actor(exc):
+        DatabaseManager.reset_actor()
 
+    # Регистрация блюпринтов
+    app.register_blueprint(main_blueprint)
+
+    @app.route('/')
+    def root():
+        return 'Backend работает должным образом.'
+
+    return app
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Только для разработки: в продакшене приложение запускает gunicorn
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
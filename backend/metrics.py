@@ -0,0 +1,172 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Границы корзин для SQL: от миллисекунды до десятков секунд (отчёты)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DB_STATEMENT_SECONDS = Histogram(
+    'remont_db_statement_duration_seconds',
+    'Время выполнения SQL-запроса',
+    ['method', 'statement'],
+    buckets=DB_BUCKETS,
+)
+
+HTTP_REQUESTS = Counter(
+    'remont_http_requests_total',
+    'HTTP-запросы по маршрутам и кодам ответа',
+    ['method', 'route', 'status'],
+)
+HTTP_SECONDS = Histogram(
+    'remont_http_request_duration_seconds',
+    'Полное время обработки HTTP-запроса',
+    ['method', 'route'],
+    buckets=HTTP_BUCKETS,
+)
+# phase: db — выполнение SQL, pool_wait — ожидание соединения,
+# serialize — JSON/MessagePack, python — всё остальное
+HTTP_PHASE_SECONDS = Histogram(
+    'remont_http_request_phase_seconds',
+    'Время HTTP-запроса по составляющим',
+    ['route', 'phase'],
+    buckets=HTTP_BUCKETS,
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'remont_db_pool_connections',
+    'Соединения пула: in_use, idle, size, max_size, waiting',
+    ['pool', 'state'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_EVENTS = Counter(
+    'remont_db_pool_events_total',
+    'События пула: checkouts, waits, timeouts, opened, retired',
+    ['pool', 'event'],
+)
+DB_POOL_WAIT_SECONDS = Counter(
+    'remont_db_pool_wait_seconds_total',
+    'Суммарное ожидание соединения из пула',
+    ['pool'],
+)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    'remont_db_replica_lag_seconds',
+    'Отставание реплики при последней проверке',
+    ['pool'],
+    multiprocess_mode='livemax',
+)
+
+CACHE_REQUESTS = Counter(
+    'remont_cache_requests_total',
+    'Обращения к кэшу: hit, miss, error',
+    ['namespace', 'result'],
+)
+
+
+class RequestStats:
+    """
+    Работа текущего HTTP-запроса с БД: сколько раз брались соединения из пула,
+    сколько выполнено запросов (и каких), сколько времени ушло на БД и на сериализацию
+    """
+
+    __slots__ = ('started', 'db_time', 'pool_wait', 'serialize_time',
+                 'checkouts', 'statements', 'statement_counts', '_token')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.serialize_time = 0.0
+        self.checkouts = 0
+        self.statements = 0
+        # (DAL-метод, отпечаток запроса) -> сколько раз выполнен
+        self.statement_counts: Dict[Tuple[str, str], int] = {}
+        self._token = None
+
+    def count_statement(self, method: str, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.db_time += elapsed
+        key = (method, statement)
+        self.statement_counts[key] = self.statement_counts.get(key, 0) + 1
+
+    def absorb(self, other: "RequestStats") -> None:
+        """Добавляет итоги вложенной области (запроса внутри count_queries)"""
+        self.db_time += other.db_time
+        self.pool_wait += other.pool_wait
+        self.serialize_time += other.serialize_time
+        self.checkouts += other.checkouts
+        self.statements += other.statements
+        for key, count in other.statement_counts.items():
+            self.statement_counts[key] = self.statement_counts.get(key, 0) + count
+
+    def repeated(self, limit: int) -> Dict[Tuple[str, str], int]:
+        """Запросы, выполненные limit и более раз: признак N+1"""
+        return {key: count for key, count in self.statement_counts.items() if count >= limit}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+def begin_request() -> RequestStats:
+    stats = RequestStats()
+    stats._token = _request_stats.set(stats)
+    return stats
+
+
+def current_request() -> Optional[RequestStats]:
+    """Статистика текущего HTTP-запроса; None вне запроса (скрипты, фоновые потоки)"""
+    return _request_stats.get()
+
+
+def end_request() -> None:
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    if stats._token is not None:
+        _request_stats.reset(stats._token)
+    else:
+        _request_stats.set(None)
+    parent = _request_stats.get()
+    if parent is not None:
+        parent.absorb(stats)
+
+
+@contextmanager
+def count_queries() -> Iterator[RequestStats]:
+    """
+    Считает обращения к БД внутри блока, включая запросы через тестовый клиент Flask:
+
+        with count_queries() as stats:
+            client.put('/api/users/51', json=...)
+        print(stats.checkouts, stats.statements)
+    """
+    stats = begin_request()
+    try:
+        yield stats
+    finally:
+        end_request()
+
+
+@contextmanager
+def assert_max_queries(statements: Optional[int] = None, checkouts: Optional[int] = None) -> Iterator[RequestStats]:
+    """
+    Для тестов: AssertionError, если внутри блока выполнено больше запросов
+    или взято больше соединений из пула, чем разрешено
+
+        with assert_max_queries(statements=3, checkouts=2):
+            client.get('/api/requests/75', headers=auth)
+    """
+    with count_queries() as stats:
+        yield stats
+    problems = []
+    if statements is not None and stats.statements > statements:
+        problems.append(f"{stats.statements} statements (max {statements})")
+    if checkouts is not None and stats.checkouts > checkouts:
+        problems.append(f"{stats.checkouts} pool checkouts (max {checkouts})")
+    if problems:
+        executed = ', '.join(f"{method} [{statement}] x{count}"
+                             for (method, statement), count in stats.statement_counts.items())
+        raise AssertionError(f"Too many database round trips: {'; '.join(problems)}. Executed: {executed}")
@@ -0,0 +1,132 @@
+"""
+Миграции схемы БД.
+
+    cd backend
+    python -m migrations status             # применённые и ожидающие
+    python -m migrations up                 # применить все ожидающие
+    python -m migrations up --to 0002       # до версии включительно
+    python -m migrations verify             # код 1, если есть ожидающие или изменённые
+    python -m migrations baseline 0002      # база из прежнего database_schema.sql: отметить без выполнения
+    python -m migrations new add_something  # заготовка следующей миграции (--sql для .sql)
+
+Подключение — настройки приложения (DB_NAME, USER, ...) или --dsn.
+"""
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from migrations.runner import (
+    VERSIONS_DIR, MigrationError, Runner, applied, changed, connect, discover, ensure_table, pending
+)
+
+PYTHON_TEMPLATE = '''"""{title}"""
+
+# False — для CREATE INDEX CONCURRENTLY и порционных UPDATE (ctx.create_index, ctx.backfill);
+# такая миграция должна быть идемпотентной
+transactional = True
+
+
+def upgrade(ctx):
+    ctx.execute("""
+    """)
+'''
+SQL_TEMPLATE = '-- {title}\n-- Выполняется в одной транзакции\n\n'
+
+
+def cmd_status(conn, args) -> int:
+    migrations = discover()
+    ensure_table(conn)
+    done = applied(conn)
+    mismatched = {m.version for m in changed(migrations, done)}
+    for migration in migrations:
+        row = done.get(migration.version)
+        if row is None:
+            state = 'pending'
+        elif migration.version in mismatched:
+            state = 'CHANGED since applied'
+        else:
+            state = f"applied {row['applied_at']:%Y-%m-%d %H:%M:%S}"
+            state += ' (baseline)' if row['baseline'] else f" in {row['duration_ms']}ms"
+        print(f"{os.path.basename(migration.path):<44}{state}")
+    unknown = sorted(set(done) - {m.version for m in migrations})
+    for version in unknown:
+        print(f"{version + '_' + done[version]['name']:<44}applied, file missing")
+    return 0
+
+
+def cmd_verify(conn, args) -> int:
+    migrations = discover()
+    ensure_table(conn)
+    done = applied(conn)
+    problems = [f"pending: {os.path.basename(m.path)}" for m in pending(migrations, done)]
+    problems += [f"changed: {os.path.basename(m.path)}" for m in changed(migrations, done)]
+    for problem in problems:
+        print(problem)
+    print('Schema is up to date' if not problems else f"{len(problems)} problem(s)")
+    return 1 if problems else 0
+
+
+def cmd_up(conn, args) -> int:
+    runner = Runner(conn, lock_timeout_ms=args.lock_timeout, lock_retries=args.lock_retries)
+    done = runner.upgrade(discover(), target=args.to)
+    print(f"Applied {len(done)} migration(s)" if done else 'Nothing to apply')
+    return 0
+
+
+def cmd_baseline(conn, args) -> int:
+    done = Runner(conn).baseline(discover(), args.version)
+    for migration in done:
+        print(f"Marked as applied: {os.path.basename(migration.path)}")
+    return 0
+
+
+def cmd_new(conn, args) -> int:
+    migrations = discover()
+    version = f"{int(migrations[-1].version) + 1 if migrations else 1:04d}"
+    name = args.name.lower().replace('-', '_').replace(' ', '_')
+    path = os.path.join(VERSIONS_DIR, f"{version}_{name}.{'sql' if args.sql else 'py'}")
+    title = name.replace('_', ' ').capitalize()
+    with open(path, 'x', encoding='utf-8') as f:
+        f.write((SQL_TEMPLATE if args.sql else PYTHON_TEMPLATE).format(title=title))
+    print(path)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m migrations', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', help='строка подключения libpq; по умолчанию — настройки приложения')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status')
+    commands.add_parser('verify')
+    up = commands.add_parser('up')
+    up.add_argument('--to', help='последняя применяемая версия')
+    up.add_argument('--lock-timeout', type=int, default=5000,
+                    help='сколько мс ждать блокировку, прежде чем отступить и повторить')
+    up.add_argument('--lock-retries', type=int, default=5)
+    baseline = commands.add_parser('baseline')
+    baseline.add_argument('version')
+    new = commands.add_parser('new')
+    new.add_argument('name')
+    new.add_argument('--sql', action='store_true', help='миграция на SQL вместо Python')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    handler = {'status': cmd_status, 'verify': cmd_verify, 'up': cmd_up,
+               'baseline': cmd_baseline, 'new': cmd_new}[args.command]
+    if args.command == 'new':
+        return handler(None, args)
+    conn = connect(args.dsn)
+    try:
+        return handler(conn, args)
+    except MigrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Перенос request_history в request_change: строки одного изменения
+(заявка, автор, время) сворачиваются в одну строку с diff.
+
+Не миграция: схема одна для обоих форматов (миграция 0005), история
+читается из обеих таблиц, а переносить ли старые строки — решение
+при переходе на REQUEST_HISTORY_FORMAT=compact, а не при обновлении схемы.
+Запускается явно, в любой момент и сколько угодно раз:
+
+    cd backend
+    python -m migrations.compact_history status   # сколько строк осталось перенести
+    python -m migrations.compact_history run      # перенести
+
+Порции по диапазонам request_id, каждая — своя транзакция: перенесённые
+строки удаляются той же командой, поэтому прерванный перенос продолжается
+с места остановки, а повторный ничего не дублирует. Строки, записанные во
+время переноса (пока приложение ещё в формате rows), остаются на месте —
+их переносит следующий запуск. Индексы опустевшей таблицы перестраиваются
+без блокировки записи; место самой таблицы переиспользуется ею же,
+вернуть его системе — VACUUM FULL request_history в окно обслуживания.
+"""
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from migrations.ops import MigrationContext
+from migrations.runner import connect
+
+# Одно поле дважды с тем же автором и временем — два разных изменения:
+# повтор (repeat) уходит в отдельную строку, чтобы diff ничего не потерял
+CONVERT = """
+    WITH moved AS (
+        DELETE FROM request_history
+        WHERE request_id >= %s AND request_id < %s
+        RETURNING request_id, changer_id, field_name, old_value, new_value, changed_at
+    ), numbered AS (
+        SELECT moved.*,
+               ROW_NUMBER() OVER (PARTITION BY request_id, changer_id, changed_at, field_name) AS repeat
+        FROM moved
+    )
+    INSERT INTO request_change (request_id, changer_id, changed_at, diff)
+    SELECT request_id, changer_id, changed_at,
+           jsonb_object_agg(field_name, jsonb_build_array(old_value, new_value))
+    FROM numbered
+    GROUP BY request_id, changer_id, changed_at, repeat;
+"""
+
+
+def remaining(ctx: MigrationContext) -> int:
+    return ctx.fetchone("SELECT count(*) FROM request_history")[0]
+
+
+def convert(ctx: MigrationContext, batch_size: int = 20_000) -> int:
+    """Переносит всё, что есть в request_history. Возвращает число созданных строк request_change"""
+    created = ctx.in_batches(CONVERT, 'request_history', key='request_id', batch_size=batch_size)
+    if created:
+        ctx.execute("VACUUM request_history")
+        ctx.execute("REINDEX TABLE CONCURRENTLY request_history")
+        ctx.analyze('request_history', 'request_change')
+    return created
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('status', 'run'))
+    parser.add_argument('--dsn', help='строка подключения libpq; по умолчанию — настройки приложения')
+    parser.add_argument('--batch-size', type=int, default=20_000, help='диапазон request_id на порцию')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    conn = connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            # Перенос большой таблицы занимает минуты, statement_timeout роли не для него
+            cursor.execute("SET statement_timeout = 0")
+            cursor.execute("SET lock_timeout = '5s'")
+        ctx = MigrationContext(conn, transactional=False)
+        if args.command == 'status':
+            print(f"request_history rows to convert: {remaining(ctx)}")
+        else:
+            created = convert(ctx, args.batch_size)
+            print(f"Created {created} request_change row(s), {remaining(ctx)} request_history row(s) left")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Индексы под реальные запросы DAL.
+
+Вместо одиночных индексов по каждой колонке — составные и частичные под
+формы WHERE/ORDER BY из dal/request.py. Создают и удаляют их миграции
+(versions/0002_index_pack.py, 0008_request_creation_status_index.py);
+этот модуль описывает, какими индексы должны быть после них, и помогает
+сверить с этим живую базу. Новый или изменённый индекс — это новая
+миграция и правка INDEXES/REDUNDANT здесь.
+
+    cd backend
+    python -m migrations up                  # применить
+    python -m migrations.index_pack plan     # расхождения базы с описанием ниже
+    python -m migrations.index_pack report   # использование индексов (pg_stat_user_indexes)
+"""
+import argparse
+import sys
+from typing import List, NamedTuple, Optional
+
+from migrations.ops import MigrationContext
+from migrations.runner import connect
+
+
+class Index(NamedTuple):
+    name: str
+    definition: str
+    # Каким запросам DAL он нужен
+    serves: str
+
+
+INDEXES = [
+    Index('idx_request_engineer_status_assigned',
+          'ON request (engineer_id, status_id, assigned_time)',
+          'get_requests_by_engineer (инженер, статусы, день назначения), фильтр по инженеру'),
+    Index('idx_request_engineer_active',
+          'ON request (engineer_id, assigned_time DESC) WHERE status_id IN (2, 3)',
+          'get_assigned_and_in_works_requests, активные заявки в статистике инженеров'),
+    Index('idx_request_engineer_done',
+          'ON request (engineer_id, done_time DESC) INCLUDE (creation_date) WHERE status_id = 4',
+          'get_completed_requests_with_total, count_completed_requests, выполненные за месяц'),
+    Index('idx_request_done_time',
+          'ON request (done_time DESC) WHERE status_id = 4',
+          'фильтр менеджера по выполненным с сортировкой по done_time'),
+    Index('idx_request_creation_status',
+          'ON request (creation_date) INCLUDE (status_id)',
+          'периоды по creation_date: фильтры, статистика за месяц по статусам'),
+    Index('idx_request_history_request_changed',
+          'ON request_history (request_id, changed_at)',
+          'get_request_history'),
+    Index('idx_balance_history_engineer_changed',
+          'ON balance_history (engineer_id, changed_at)',
+          'get_balance_history'),
+]
+
+# Индексы, которые новые перекрывают полностью (та же ведущая колонка или
+# те же запросы), и дубликат ограничения UNIQUE
+REDUNDANT = [
+    'idx_request_engineer_id',          # idx_request_engineer_status_assigned
+    'idx_request_creation_date',        # idx_request_creation_status
+    'idx_request_live_creation',        # idx_request_creation_status: запросы считают и удалённые заявки
+    'idx_request_history_request_id',   # idx_request_history_request_changed
+    'idx_balance_history_engineer_id',  # idx_balance_history_engineer_changed
+    'idx_users_login',                  # users_login_key (UNIQUE)
+]
+
+def plan(ctx: MigrationContext) -> List[str]:
+    """Чем база отличается от описания: каких индексов нет, какие лишние"""
+    steps = []
+    for index in INDEXES:
+        state = ctx.index_valid(index.name)
+        if state is False:
+            steps.append(f"rebuild INVALID {index.name} {index.definition}")
+        elif state is None:
+            steps.append(f"create {index.name} {index.definition}")
+    for name in REDUNDANT:
+        if ctx.index_valid(name) is not None:
+            steps.append(f"drop {name}")
+    return steps
+
+
+def usage_report(cursor) -> List[dict]:
+    """
+    Использование индексов с последнего сброса статистики: число сканирований,
+    прочитанные записи, размер. Неуникальные индексы без сканирований —
+    кандидаты на удаление, если статистика накоплена за репрезентативный период.
+    """
+    cursor.execute("""
+        SELECT s.relname AS table_name,
+               s.indexrelname AS index_name,
+               s.idx_scan,
+               s.idx_tup_read,
+               s.idx_tup_fetch,
+               pg_relation_size(s.indexrelid) AS size_bytes,
+               i.indisunique OR i.indisprimary AS is_unique,
+               i.indisvalid AS is_valid
+        FROM pg_stat_user_indexes s
+        JOIN pg_index i ON i.indexrelid = s.indexrelid
+        ORDER BY s.relname, s.idx_scan, s.indexrelname;
+    """)
+    columns = [column.name for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def print_report(cursor) -> None:
+    cursor.execute("SELECT stats_reset FROM pg_stat_database WHERE datname = current_database();")
+    print(f"Statistics since: {cursor.fetchone()[0] or 'database creation'}")
+    print(f"{'table':<18}{'index':<40}{'scans':>12}{'tuples read':>14}{'size MB':>10}  note")
+    for row in usage_report(cursor):
+        notes = []
+        if not row['is_valid']:
+            notes.append('INVALID')
+        if row['idx_scan'] == 0 and not row['is_unique']:
+            notes.append('unused')
+        if row['index_name'] in REDUNDANT:
+            notes.append('redundant')
+        print(f"{row['table_name']:<18}{row['index_name']:<40}{row['idx_scan']:>12}{row['idx_tup_read']:>14}"
+              f"{row['size_bytes'] / 1048576:>10.1f}  {', '.join(notes)}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('plan', 'report'))
+    parser.add_argument('--dsn', help='строка подключения libpq; по умолчанию — настройки приложения')
+    args = parser.parse_args(argv)
+
+    conn = connect(args.dsn)
+    conn.autocommit = True
+    try:
+        if args.command == 'plan':
+            for step in plan(MigrationContext(conn, transactional=False)) or ['nothing to do']:
+                print(step)
+        else:
+            with conn.cursor() as cursor:
+                print_report(cursor)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
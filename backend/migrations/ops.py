@@ -0,0 +1,138 @@
+"""
+Операции для изменения схемы работающей базы: построение индексов без
+блокировки записи, порционные UPDATE с паузами и lock_timeout, чтобы
+миграция, не получившая блокировку, отступала и повторяла попытку,
+а не выстраивала за собой очередь из запросов приложения.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from psycopg2 import errors
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationContext:
+    """
+    То, что получает upgrade(ctx) миграции на Python.
+
+    transactional=True — миграция целиком в одной транзакции (как .sql):
+    повтор при нехватке блокировки делает раннер, CONCURRENTLY недоступен.
+    transactional=False — соединение в autocommit: каждая операция —
+    своя транзакция и сама повторяется при lock_timeout. Такая миграция
+    должна быть идемпотентной: после сбоя её запускают заново.
+    """
+
+    def __init__(self, conn, transactional: bool, lock_timeout_ms: int = 5000,
+                 lock_retries: int = 5, retry_delay: float = 1.0):
+        self.conn = conn
+        self.transactional = transactional
+        self.lock_timeout_ms = lock_timeout_ms
+        self.lock_retries = lock_retries
+        self.retry_delay = retry_delay
+
+    @contextmanager
+    def cursor(self) -> Iterator:
+        with self.conn.cursor() as cursor:
+            yield cursor
+
+    def execute(self, sql: str, params: Optional[Sequence] = None) -> int:
+        """Выполняет запрос; вне транзакции повторяет его, если не удалось получить блокировку"""
+        if self.transactional:
+            with self.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.rowcount
+        for attempt in range(1, self.lock_retries + 1):
+            try:
+                with self.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    return cursor.rowcount
+            except errors.LockNotAvailable:
+                if attempt == self.lock_retries:
+                    raise
+                delay = self.retry_delay * attempt
+                logger.warning(f"Lock not acquired in {self.lock_timeout_ms}ms, retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def fetchone(self, sql: str, params: Optional[Sequence] = None):
+        with self.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+    def _require_autocommit(self, operation: str) -> None:
+        if self.transactional:
+            raise RuntimeError(f"{operation} needs a non-transactional migration (transactional = False)")
+
+    def index_valid(self, name: str) -> Optional[bool]:
+        """None — индекса нет, False — недостроенный (INVALID после прерванного CONCURRENTLY)"""
+        row = self.fetchone("""
+            SELECT i.indisvalid
+            FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+            WHERE c.relname = %s AND c.relkind = 'i';
+        """, (name,))
+        return row[0] if row else None
+
+    def create_index(self, name: str, definition: str, unique: bool = False) -> bool:
+        """
+        CREATE INDEX CONCURRENTLY: запись в таблицу не блокируется.
+        definition — всё после имени: 'ON request (engineer_id) WHERE ...'.
+        Недостроенный индекс от прерванной попытки удаляется и строится заново.
+        Возвращает False, если готовый индекс уже есть.
+        """
+        self._require_autocommit('CREATE INDEX CONCURRENTLY')
+        state = self.index_valid(name)
+        if state:
+            return False
+        if state is False:
+            logger.warning(f"Index {name} is INVALID after an interrupted build, rebuilding")
+            self.drop_index(name)
+        self.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+        return True
+
+    def drop_index(self, name: str) -> bool:
+        """DROP INDEX CONCURRENTLY; False, если индекса нет"""
+        self._require_autocommit('DROP INDEX CONCURRENTLY')
+        if self.index_valid(name) is None:
+            return False
+        self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        return True
+
+    def backfill(self, table: str, assignments: str, where: str = 'TRUE', key: str = 'id',
+                 params: Sequence = (), batch_size: int = 10_000, pause: float = 0.1) -> int:
+        """
+        UPDATE {table} SET {assignments} WHERE {where} порциями по диапазонам
+        ключа key (см. in_batches). Условие where должно исключать уже
+        обновлённые строки — тогда прерванное заполнение можно продолжить.
+        params подставляются в assignments; where — без параметров.
+        """
+        sql = f"UPDATE {table} SET {assignments} WHERE {key} >= %s AND {key} < %s AND ({where})"
+        return self.in_batches(sql, table, key, params, batch_size, pause)
+
+    def in_batches(self, sql: str, table: str, key: str = 'id', params: Sequence = (),
+                   batch_size: int = 10_000, pause: float = 0.1) -> int:
+        """
+        Выполняет sql для каждого диапазона ключа key таблицы table: последние
+        два параметра запроса — начало (включительно) и конец диапазона.
+        Каждая порция — отдельная транзакция: блокировки строк держатся
+        недолго, пауза между порциями оставляет место запросам приложения
+        и даёт репликам догнать. Возвращает сумму rowcount.
+        """
+        self._require_autocommit('Batched update')
+        low, high = self.fetchone(f"SELECT MIN({key}), MAX({key}) FROM {table}")
+        if low is None:
+            return 0
+        total = 0
+        started = time.monotonic()
+        for start in range(low, high + 1, batch_size):
+            total += self.execute(sql, (*params, start, start + batch_size))
+            done = min(start + batch_size - low, high - low + 1)
+            logger.info(f"{table}: {total} rows processed, {done * 100 // (high - low + 1)}% of key range "
+                        f"({time.monotonic() - started:.0f}s)")
+            if pause:
+                time.sleep(pause)
+        return total
+
+    def analyze(self, *tables: str) -> None:
+        self.execute(f"ANALYZE {', '.join(tables)}")
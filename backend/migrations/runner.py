@@ -0,0 +1,241 @@
+"""
+Версионные миграции схемы.
+
+Миграции — файлы migrations/versions/NNNN_название.sql или .py, применяются
+по возрастанию номера. Применённые записываются в schema_migrations вместе
+с контрольной суммой файла: изменённая после применения миграция
+обнаруживается, и раннер отказывается продолжать.
+
+.sql выполняется целиком в одной транзакции. .py определяет upgrade(ctx)
+(см. ops.MigrationContext) и может объявить transactional = False для
+операций, которые не работают внутри транзакции (CREATE INDEX CONCURRENTLY,
+порционные UPDATE).
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import psycopg2
+from psycopg2 import errors
+
+from migrations.ops import MigrationContext
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'versions')
+FILE_PATTERN = re.compile(r'^(\d{4})_([a-z0-9_]+)\.(sql|py)$')
+
+# Ключ pg_advisory_lock: два раннера одновременно миграции не применяют
+ADVISORY_LOCK_KEY = 7_310_046
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    path: str
+    checksum: str
+
+    @property
+    def is_python(self) -> bool:
+        return self.path.endswith('.py')
+
+
+class MigrationError(Exception):
+    pass
+
+
+def connect(dsn: Optional[str] = None):
+    """Соединение с базой: строка libpq или настройки приложения"""
+    if dsn:
+        return psycopg2.connect(dsn)
+    from config import Settings
+    settings = Settings()
+    return psycopg2.connect(user=settings.USER, password=settings.PASSWORD, host=settings.HOST_NAME,
+                            port=settings.PORT_NAME, database=settings.DB_NAME)
+
+
+def discover(directory: str = VERSIONS_DIR) -> List[Migration]:
+    """Файлы миграций по возрастанию версии; повтор номера — ошибка"""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version, name, _ = match.groups()
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version}: "
+                                 f"{os.path.basename(migrations[version].path)} and {filename}")
+        path = os.path.join(directory, filename)
+        with open(path, 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations[version] = Migration(version, name, path, checksum)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def ensure_table(conn) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                duration_ms INTEGER NOT NULL DEFAULT 0,
+                baseline BOOLEAN NOT NULL DEFAULT FALSE
+            );
+        """)
+    conn.commit()
+
+
+def applied(conn) -> Dict[str, dict]:
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version, name, checksum, applied_at, duration_ms, baseline FROM schema_migrations")
+        columns = [column.name for column in cursor.description]
+        return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+def changed(migrations: List[Migration], done: Dict[str, dict]) -> List[Migration]:
+    """Применённые миграции, файл которых с тех пор изменился"""
+    return [m for m in migrations if m.version in done and done[m.version]['checksum'] != m.checksum]
+
+
+def pending(migrations: List[Migration], done: Dict[str, dict], target: Optional[str] = None) -> List[Migration]:
+    return [m for m in migrations if m.version not in done and (target is None or m.version <= target)]
+
+
+def _record(cursor, migration: Migration, duration_ms: int, baseline: bool = False) -> None:
+    cursor.execute("""
+        INSERT INTO schema_migrations (version, name, checksum, duration_ms, baseline)
+        VALUES (%s, %s, %s, %s, %s);
+    """, (migration.version, migration.name, migration.checksum, duration_ms, baseline))
+
+
+def _load_module(migration: Migration):
+    spec = importlib.util.spec_from_file_location(f"migration_{migration.version}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not callable(getattr(module, 'upgrade', None)):
+        raise MigrationError(f"{os.path.basename(migration.path)} has no upgrade(ctx)")
+    return module
+
+
+class Runner:
+    """
+    Применяет миграции под pg_advisory_lock. lock_timeout ограничивает
+    ожидание блокировок: миграция, не получившая блокировку за это время,
+    откатывается и повторяется (до lock_retries раз), вместо того чтобы
+    стоять в очереди и задерживать за собой запросы приложения.
+    """
+
+    def __init__(self, conn, lock_timeout_ms: int = 5000, lock_retries: int = 5, retry_delay: float = 2.0):
+        self.conn = conn
+        self.lock_timeout_ms = lock_timeout_ms
+        self.lock_retries = lock_retries
+        self.retry_delay = retry_delay
+
+    def _session(self) -> None:
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            # Длительность ограничивает lock_timeout, а не statement_timeout роли:
+            # построение индекса на большой таблице занимает минуты
+            cursor.execute("SET statement_timeout = 0")
+            cursor.execute("SET lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                raise MigrationError("Another migration run holds the lock")
+        self.conn.autocommit = False
+
+    def _release(self) -> None:
+        if self.conn.closed:
+            return
+        self.conn.rollback()
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+
+    def upgrade(self, migrations: List[Migration], target: Optional[str] = None) -> List[Migration]:
+        """Применяет ожидающие миграции по порядку, до target включительно"""
+        ensure_table(self.conn)
+        self._session()
+        try:
+            done = applied(self.conn)
+            mismatched = changed(migrations, done)
+            if mismatched:
+                raise MigrationError("Applied migrations were modified: "
+                                     + ', '.join(os.path.basename(m.path) for m in mismatched))
+            todo = pending(migrations, done, target)
+            for migration in todo:
+                self._apply(migration)
+            return todo
+        finally:
+            self._release()
+
+    def _apply(self, migration: Migration) -> None:
+        filename = os.path.basename(migration.path)
+        module = _load_module(migration) if migration.is_python else None
+        transactional = getattr(module, 'transactional', True)
+        logger.info(f"Applying {filename}{'' if transactional else ' (non-transactional)'}")
+        started = time.monotonic()
+        if transactional:
+            self._apply_in_transaction(migration, module)
+        else:
+            # Каждая операция — своя транзакция; повторы при lock_timeout внутри ctx.
+            # Транзакция от чтения schema_migrations завершается до переключения
+            self.conn.rollback()
+            self.conn.autocommit = True
+            try:
+                module.upgrade(self._context(transactional=False))
+                with self.conn.cursor() as cursor:
+                    _record(cursor, migration, int((time.monotonic() - started) * 1000))
+            finally:
+                self.conn.autocommit = False
+        logger.info(f"Applied {filename} in {time.monotonic() - started:.1f}s")
+
+    def _apply_in_transaction(self, migration: Migration, module) -> None:
+        for attempt in range(1, self.lock_retries + 1):
+            started = time.monotonic()
+            try:
+                with self.conn.cursor() as cursor:
+                    if module is None:
+                        with open(migration.path, encoding='utf-8') as f:
+                            cursor.execute(f.read())
+                    else:
+                        module.upgrade(self._context(transactional=True))
+                    _record(cursor, migration, int((time.monotonic() - started) * 1000))
+                self.conn.commit()
+                return
+            except errors.LockNotAvailable:
+                self.conn.rollback()
+                if attempt == self.lock_retries:
+                    raise
+                delay = self.retry_delay * attempt
+                logger.warning(f"{os.path.basename(migration.path)}: lock not acquired in {self.lock_timeout_ms}ms, "
+                               f"retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _context(self, transactional: bool) -> MigrationContext:
+        return MigrationContext(self.conn, transactional, self.lock_timeout_ms, self.lock_retries, self.retry_delay)
+
+    def baseline(self, migrations: List[Migration], target: str) -> List[Migration]:
+        """
+        Отмечает миграции до target применёнными, не выполняя их: для базы,
+        созданной из database_schema.sql до того, как схему стали создавать только миграции
+        """
+        ensure_table(self.conn)
+        self._session()
+        try:
+            todo = pending(migrations, applied(self.conn), target)
+            with self.conn.cursor() as cursor:
+                for migration in todo:
+                    _record(cursor, migration, 0, baseline=True)
+            self.conn.commit()
+            return todo
+        finally:
+            self._release()
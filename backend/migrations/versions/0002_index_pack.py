@@ -0,0 +1,37 @@
+"""
+Составные и частичные индексы под запросы DAL. Набор зафиксирован здесь,
+а не берётся из migrations/index_pack.py: тот описывает текущую схему
+и меняется вместе с ней, а применённая миграция меняться не должна.
+"""
+
+# CREATE/DROP INDEX CONCURRENTLY не выполняются внутри транзакции
+transactional = False
+
+INDEXES = [
+    ('idx_request_engineer_status_assigned', 'ON request (engineer_id, status_id, assigned_time)'),
+    ('idx_request_engineer_active', 'ON request (engineer_id, assigned_time DESC) WHERE status_id IN (2, 3)'),
+    ('idx_request_engineer_done',
+     'ON request (engineer_id, done_time DESC) INCLUDE (creation_date) WHERE status_id = 4'),
+    ('idx_request_done_time', 'ON request (done_time DESC) WHERE status_id = 4'),
+    ('idx_request_live_creation', 'ON request (creation_date) WHERE status_id <> 5'),
+    ('idx_request_history_request_changed', 'ON request_history (request_id, changed_at)'),
+    ('idx_balance_history_engineer_changed', 'ON balance_history (engineer_id, changed_at)'),
+]
+
+# Перекрытые новыми индексами и дубликат ограничения UNIQUE
+REDUNDANT = [
+    'idx_request_engineer_id',
+    'idx_request_creation_date',
+    'idx_request_history_request_id',
+    'idx_balance_history_engineer_id',
+    'idx_users_login',
+]
+
+
+def upgrade(ctx):
+    # Новые создаются раньше, чем удаляются старые: запросы всё время с подходящим индексом
+    for name, definition in INDEXES:
+        ctx.create_index(name, definition)
+    for name in REDUNDANT:
+        ctx.drop_index(name)
+    ctx.analyze('request', 'request_history', 'balance_history')
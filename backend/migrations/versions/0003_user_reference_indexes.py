@@ -0,0 +1,16 @@
+"""Индексы по столбцам, ссылающимся на users: удаление пользователя без полного просмотра таблиц"""
+
+transactional = False
+
+# request.engineer_id и balance_history.engineer_id уже ведут индексы из 0002
+INDEXES = [
+    ('idx_request_operator_id', 'ON request (operator_id)'),
+    ('idx_request_history_changer_id', 'ON request_history (changer_id)'),
+    ('idx_balance_history_admin_id', 'ON balance_history (admin_id)'),
+]
+
+
+def upgrade(ctx):
+    for name, definition in INDEXES:
+        ctx.create_index(name, definition)
+    ctx.analyze('request', 'request_history', 'balance_history')
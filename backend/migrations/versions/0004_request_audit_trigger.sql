@@ -0,0 +1,41 @@
+-- Триггер истории заявок: изменившиеся поля request пишутся в request_history
+-- тем же оператором UPDATE, одной вставкой на оператор (см. backend/audit.py)
+
+CREATE OR REPLACE FUNCTION request_audit() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- REQUEST_AUDIT_MODE=app: update_request пишет историю сам
+    IF current_setting('remont.audit', true) = 'app' THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO request_history (request_id, changer_id, field_name, old_value, new_value)
+    SELECT n.request_id,
+           NULLIF(current_setting('remont.changer_id', true), '')::integer,
+           d.field_name,
+           COALESCE(old_status.status, d.old_value),
+           COALESCE(new_status.status, d.new_value)
+    FROM old_rows o
+    JOIN new_rows n ON n.request_id = o.request_id
+    CROSS JOIN LATERAL (
+        SELECT nv.key AS field_name, ov.value #>> '{}' AS old_value, nv.value #>> '{}' AS new_value
+        FROM jsonb_each(to_jsonb(n)) nv
+        JOIN jsonb_each(to_jsonb(o)) ov ON ov.key = nv.key
+        WHERE nv.value IS DISTINCT FROM ov.value
+    ) d
+    -- Статус в истории — название, как в режиме app
+    LEFT JOIN status old_status
+        ON old_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.old_value::integer END
+    LEFT JOIN status new_status
+        ON new_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.new_value::integer END;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Уровень оператора с таблицами переходов: массовый UPDATE — одна вставка, а не триггер на строку
+CREATE TRIGGER request_audit
+    AFTER UPDATE ON request
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION request_audit();
@@ -0,0 +1,66 @@
+-- Компактная история заявок: одна строка request_change на изменение заявки,
+-- изменившиеся поля — в diff: {"поле": [старое, новое], ...}.
+-- Формат записи выбирает REQUEST_HISTORY_FORMAT (см. backend/audit.py)
+
+CREATE TABLE request_change (
+    request_id INTEGER NOT NULL REFERENCES request(request_id) ON DELETE CASCADE,
+    changer_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    diff JSONB NOT NULL
+);
+
+-- История читается только по заявке, а изменений у одной заявки единицы:
+-- индекс по одному request_id меньше составного и сжимается дедупликацией
+CREATE INDEX idx_request_change_request_id ON request_change (request_id);
+CREATE INDEX idx_request_change_changer_id ON request_change (changer_id);
+
+-- Изменившиеся поля заявки: старая и новая строка как jsonb, статус — названием
+CREATE FUNCTION request_audit_diff(old_row JSONB, new_row JSONB)
+RETURNS TABLE (field_name TEXT, old_value TEXT, new_value TEXT)
+LANGUAGE sql STABLE AS $$
+    SELECT d.field_name,
+           COALESCE(old_status.status, d.old_value),
+           COALESCE(new_status.status, d.new_value)
+    FROM (
+        SELECT nv.key AS field_name, ov.value #>> '{}' AS old_value, nv.value #>> '{}' AS new_value
+        FROM jsonb_each(new_row) nv
+        JOIN jsonb_each(old_row) ov ON ov.key = nv.key
+        WHERE nv.value IS DISTINCT FROM ov.value
+    ) d
+    LEFT JOIN status old_status
+        ON old_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.old_value::integer END
+    LEFT JOIN status new_status
+        ON new_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.new_value::integer END;
+$$;
+
+-- Триггер пишет в формате, который передало приложение (remont.history_format);
+-- для изменений в обход приложения — значение по умолчанию базы:
+-- ALTER DATABASE ... SET remont.history_format = 'compact'
+CREATE OR REPLACE FUNCTION request_audit() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changer INTEGER := NULLIF(current_setting('remont.changer_id', true), '')::integer;
+BEGIN
+    -- REQUEST_AUDIT_MODE=app: update_request пишет историю сам
+    IF current_setting('remont.audit', true) = 'app' THEN
+        RETURN NULL;
+    END IF;
+
+    IF current_setting('remont.history_format', true) = 'compact' THEN
+        INSERT INTO request_change (request_id, changer_id, diff)
+        SELECT n.request_id, changer, jsonb_object_agg(d.field_name, jsonb_build_array(d.old_value, d.new_value))
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d
+        GROUP BY n.request_id;
+    ELSE
+        INSERT INTO request_history (request_id, changer_id, field_name, old_value, new_value)
+        SELECT n.request_id, changer, d.field_name, d.old_value, d.new_value
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
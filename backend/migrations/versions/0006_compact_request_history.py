@@ -0,0 +1,11 @@
+"""
+Формат истории compact не требует схемы сверх request_change (0005).
+Данные миграция не трогает: переносить ли старые строки request_history,
+решает переход на REQUEST_HISTORY_FORMAT=compact, а не обновление схемы —
+это явная команда python -m migrations.compact_history run, которую можно
+запускать повторно.
+"""
+
+
+def upgrade(ctx):
+    pass
@@ -0,0 +1,60 @@
+-- Отложенная запись истории заявок: update_request кладёт изменение в буфер
+-- в своей же транзакции, фоновый поток переносит буфер в request_history
+-- или request_change пачками (REQUEST_HISTORY_WRITE_MODE=buffered, см. backend/audit.py)
+
+-- Ни индексов, ни внешних ключей: вставка в буфер — только запись в кучу.
+-- Таблица остаётся маленькой (её держат поток переноса и REQUEST_HISTORY_BUFFER_LIMIT),
+-- поэтому читается целиком. Порядок изменений — по buffer_id
+CREATE TABLE request_history_buffer (
+    buffer_id BIGINT GENERATED ALWAYS AS IDENTITY,
+    request_id INTEGER NOT NULL,
+    changer_id INTEGER,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    diff JSONB NOT NULL
+)
+-- Строки живут секунды: чистить мёртвые после каждой тысячи, а не после доли таблицы,
+-- иначе чтение буфера целиком замедляется вместе с его раздуванием
+WITH (autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 1000,
+      autovacuum_analyze_scale_factor = 0, autovacuum_analyze_threshold = 1000);
+
+-- Без статистики планировщик считает новую таблицу десятком страниц,
+-- и чтение истории по заявке выглядит дороже, чем есть
+ANALYZE request_history_buffer;
+
+-- remont.history_write = 'buffered' ставит приложение, пока буфер не переполнен;
+-- изменения в обход приложения пишутся сразу
+CREATE OR REPLACE FUNCTION request_audit() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changer INTEGER := NULLIF(current_setting('remont.changer_id', true), '')::integer;
+BEGIN
+    -- REQUEST_AUDIT_MODE=app: update_request пишет историю сам
+    IF current_setting('remont.audit', true) = 'app' THEN
+        RETURN NULL;
+    END IF;
+
+    IF current_setting('remont.history_write', true) = 'buffered' THEN
+        INSERT INTO request_history_buffer (request_id, changer_id, diff)
+        SELECT n.request_id, changer, jsonb_object_agg(d.field_name, jsonb_build_array(d.old_value, d.new_value))
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d
+        GROUP BY n.request_id;
+    ELSIF current_setting('remont.history_format', true) = 'compact' THEN
+        INSERT INTO request_change (request_id, changer_id, diff)
+        SELECT n.request_id, changer, jsonb_object_agg(d.field_name, jsonb_build_array(d.old_value, d.new_value))
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d
+        GROUP BY n.request_id;
+    ELSE
+        INSERT INTO request_history (request_id, changer_id, field_name, old_value, new_value)
+        SELECT n.request_id, changer, d.field_name, d.old_value, d.new_value
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
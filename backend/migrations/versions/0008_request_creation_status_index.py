@@ -0,0 +1,14 @@
+"""
+Индекс по creation_date для всех заявок, включая удалённые: статистика
+за месяц и фильтры по периоду считают заявки с любым статусом, а частичный
+idx_request_live_creation (WHERE status_id <> 5) под такое условие не подходит.
+status_id в INCLUDE — счётчики по статусам читаются только из индекса.
+"""
+
+transactional = False
+
+
+def upgrade(ctx):
+    ctx.create_index('idx_request_creation_status', 'ON request (creation_date) INCLUDE (status_id)')
+    ctx.drop_index('idx_request_live_creation')
+    ctx.analyze('request')
@@ -0,0 +1,79 @@
+-- Триггер истории пропускает только транзакции, которые сами отказались от него
+-- настройкой remont.audit: 'app' — историю пишет update_request
+-- (REQUEST_AUDIT_MODE=app, см. backend/audit.py), 'off' — запись сознательно
+-- без истории (обнуление ссылок в UserDAL.delete_user). Всё остальное —
+-- массовые UPDATE, правки из psql — пишется в историю с пустым changer_id.
+-- Отключить историю для ручной правки:
+--     BEGIN; SET LOCAL remont.audit = 'off'; UPDATE request ...; COMMIT;
+
+-- Значения — как их пишет приложение (str() в Python): время без 'T',
+-- дробная часть секунд — только если она есть, шестью знаками
+CREATE OR REPLACE FUNCTION request_audit_value(field_name TEXT, value JSONB)
+RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+    SELECT CASE
+        WHEN jsonb_typeof(value) = 'string'
+         AND (SELECT atttypid FROM pg_attribute
+              WHERE attrelid = 'request'::regclass AND attname = field_name) = 'timestamp'::regtype THEN
+            to_char((value #>> '{}')::timestamp, 'YYYY-MM-DD HH24:MI:SS')
+            || CASE WHEN (value #>> '{}')::timestamp = date_trunc('second', (value #>> '{}')::timestamp) THEN ''
+                    ELSE to_char((value #>> '{}')::timestamp, '.US') END
+        ELSE value #>> '{}'
+    END
+$$;
+
+CREATE OR REPLACE FUNCTION request_audit_diff(old_row JSONB, new_row JSONB)
+RETURNS TABLE (field_name TEXT, old_value TEXT, new_value TEXT)
+LANGUAGE sql STABLE AS $$
+    SELECT d.field_name,
+           COALESCE(old_status.status, d.old_value),
+           COALESCE(new_status.status, d.new_value)
+    FROM (
+        SELECT nv.key AS field_name,
+               request_audit_value(nv.key, ov.value) AS old_value,
+               request_audit_value(nv.key, nv.value) AS new_value
+        FROM jsonb_each(new_row) nv
+        JOIN jsonb_each(old_row) ov ON ov.key = nv.key
+        WHERE nv.value IS DISTINCT FROM ov.value
+    ) d
+    LEFT JOIN status old_status
+        ON old_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.old_value::integer END
+    LEFT JOIN status new_status
+        ON new_status.status_id = CASE WHEN d.field_name = 'status_id' THEN d.new_value::integer END;
+$$;
+
+CREATE OR REPLACE FUNCTION request_audit() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changer INTEGER := NULLIF(current_setting('remont.changer_id', true), '')::integer;
+BEGIN
+    -- app: update_request пишет историю сам; off: изменение без истории
+    IF current_setting('remont.audit', true) IN ('app', 'off') THEN
+        RETURN NULL;
+    END IF;
+
+    IF current_setting('remont.history_write', true) = 'buffered' THEN
+        INSERT INTO request_history_buffer (request_id, changer_id, diff)
+        SELECT n.request_id, changer, jsonb_object_agg(d.field_name, jsonb_build_array(d.old_value, d.new_value))
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d
+        GROUP BY n.request_id;
+    ELSIF current_setting('remont.history_format', true) = 'compact' THEN
+        INSERT INTO request_change (request_id, changer_id, diff)
+        SELECT n.request_id, changer, jsonb_object_agg(d.field_name, jsonb_build_array(d.old_value, d.new_value))
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d
+        GROUP BY n.request_id;
+    ELSE
+        INSERT INTO request_history (request_id, changer_id, field_name, old_value, new_value)
+        SELECT n.request_id, changer, d.field_name, d.old_value, d.new_value
+        FROM old_rows o
+        JOIN new_rows n ON n.request_id = o.request_id
+        CROSS JOIN LATERAL request_audit_diff(to_jsonb(o), to_jsonb(n)) d;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+from flask import Flask, Response, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+from config import Settings
+from db_manager import DatabaseManager
+from metrics import (
+    DB_POOL_CONNECTIONS, DB_POOL_EVENTS, DB_POOL_WAIT_SECONDS, DB_REPLICA_LAG_SECONDS,
+    HTTP_PHASE_SECONDS, HTTP_REQUESTS, HTTP_SECONDS, RequestStats, begin_request, current_request, end_request
+)
+
+logger = logging.getLogger(__name__)
+
+POOL_STATES = ('in_use', 'idle', 'size', 'max_size', 'waiting')
+POOL_EVENTS = ('checkouts', 'waits', 'timeouts', 'opened', 'retired')
+
+# Статистика пулов переносится в метрики не чаще раза в столько секунд
+POOL_EXPORT_INTERVAL = 1.0
+
+_export_lock = threading.Lock()
+_exported_at = 0.0
+_last_counts: Dict[str, Dict[str, float]] = {}
+
+
+def export_pool_stats(force: bool = False) -> None:
+    """
+    Переносит счётчики пулов DatabaseManager в метрики. Пулы ведут счёт сами,
+    здесь только разница с прошлым разом, поэтому путь выдачи соединения
+    метрики не замедляют.
+    """
+    global _exported_at
+    now = time.monotonic()
+    if not force and now - _exported_at < POOL_EXPORT_INTERVAL:
+        return
+    if not _export_lock.acquire(blocking=False):
+        return
+    try:
+        _exported_at = now
+        for name, stats in DatabaseManager.pool_stats().items():
+            for state in POOL_STATES:
+                DB_POOL_CONNECTIONS.labels(name, state).set(stats[state])
+            last = _last_counts.setdefault(name, {})
+            for event in POOL_EVENTS:
+                delta = stats[event] - last.get(event, 0)
+                if delta > 0:
+                    DB_POOL_EVENTS.labels(name, event).inc(delta)
+                last[event] = stats[event]
+            delta = stats['wait_time_total'] - last.get('wait_time_total', 0.0)
+            if delta > 0:
+                DB_POOL_WAIT_SECONDS.labels(name).inc(delta)
+            last['wait_time_total'] = stats['wait_time_total']
+            if 'lag' in stats:
+                DB_REPLICA_LAG_SECONDS.labels(name).set(stats['lag'])
+    finally:
+        _export_lock.release()
+
+
+def _route() -> str:
+    # Шаблон маршрута, а не путь: /api/requests/<int:request_id> — одна серия на все id
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def check_db_budget(stats: RequestStats, route: str, config: Settings) -> None:
+    """Пишет в лог HTTP-запросы, которые слишком часто ходят в БД"""
+    problems = []
+    if config.REQUEST_MAX_DB_CHECKOUTS and stats.checkouts > config.REQUEST_MAX_DB_CHECKOUTS:
+        problems.append(f"{stats.checkouts} pool checkouts (budget {config.REQUEST_MAX_DB_CHECKOUTS})")
+    if config.REQUEST_MAX_DB_STATEMENTS and stats.statements > config.REQUEST_MAX_DB_STATEMENTS:
+        problems.append(f"{stats.statements} statements (budget {config.REQUEST_MAX_DB_STATEMENTS})")
+    db_ms = stats.db_time * 1000
+    if config.REQUEST_MAX_DB_MS and db_ms > config.REQUEST_MAX_DB_MS:
+        problems.append(f"{db_ms:.0f}ms in database (budget {config.REQUEST_MAX_DB_MS}ms)")
+    if config.REQUEST_REPEATED_STATEMENT_LIMIT:
+        for (method, statement), count in stats.repeated(config.REQUEST_REPEATED_STATEMENT_LIMIT).items():
+            problems.append(f"possible N+1: {method} [{statement}] executed {count} times")
+    if problems:
+        logger.warning(f"{request.method} {route} over database budget: {'; '.join(problems)}")
+
+
+def init_monitoring(app: Flask, config: Settings) -> None:
+    """
+    Метрики по маршрутам и эндпоинт /metrics в формате Prometheus.
+    Запросы сверх бюджета обращений к БД пишутся в лог, в режиме отладки
+    счётчики возвращаются в заголовках X-DB-Checkouts, X-DB-Statements, X-DB-Time-Ms.
+    """
+
+    @app.before_request
+    def start_request_metrics():
+        begin_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = current_request()
+        if stats is None or request.endpoint == 'metrics':
+            return response
+        elapsed = time.perf_counter() - stats.started
+        route = _route()
+        HTTP_REQUESTS.labels(request.method, route, str(response.status_code)).inc()
+        HTTP_SECONDS.labels(request.method, route).observe(elapsed)
+        HTTP_PHASE_SECONDS.labels(route, 'db').observe(stats.db_time)
+        HTTP_PHASE_SECONDS.labels(route, 'pool_wait').observe(stats.pool_wait)
+        HTTP_PHASE_SECONDS.labels(route, 'serialize').observe(stats.serialize_time)
+        python_time = elapsed - stats.db_time - stats.pool_wait - stats.serialize_time
+        HTTP_PHASE_SECONDS.labels(route, 'python').observe(max(python_time, 0.0))
+        check_db_budget(stats, route, config)
+        if app.debug:
+            response.headers['X-DB-Checkouts'] = str(stats.checkouts)
+            response.headers['X-DB-Statements'] = str(stats.statements)
+            response.headers['X-DB-Time-Ms'] = f"{stats.db_time * 1000:.1f}"
+        export_pool_stats()
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        end_request()
+
+    @app.route('/metrics')
+    def metrics():
+        export_pool_stats(force=True)
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            # gunicorn: метрики всех воркеров собираются из общего каталога
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
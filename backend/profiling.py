@@ -0,0 +1,157 @@
+import cProfile
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from flask import Flask
+from flask_jwt_extended import decode_token
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+AUTH_HEADER = 'HTTP_AUTHORIZATION'
+ADMIN_ROLE_ID = 3
+_UNSAFE = re.compile(r'[^A-Za-z0-9]+')
+
+# Профилировщик в процессе может работать только один: в Python 3.12+ cProfile
+# использует sys.monitoring, и второй enable() падает с ValueError
+_profiler_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """
+    WSGI-обёртка, которая профилирует отдельные запросы через cProfile:
+    - запрос администратора (JWT с ролью 3) с заголовком X-Profile: 1,
+      если включён PROFILE_ON_DEMAND
+    - случайную долю запросов PROFILE_SAMPLE_RATE
+    Остальные запросы идут мимо без профилирования. Одновременно в процессе
+    профилируется один запрос: выбранный, пока идёт другой, выполняется без
+    профиля. В Python 3.12+ профиль охватывает все потоки процесса, поэтому
+    запросы, шедшие параллельно, тоже попадают в него — их число пишется
+    в имя файла (.concurrentN) и в лог.
+    Результат — файл pstats в PROFILE_DIR (открывается pstats, snakeviz,
+    flameprof для flamegraph); хранится не больше PROFILE_KEEP последних файлов.
+    """
+
+    def __init__(self, app: Callable, config: Settings, flask_app: Optional[Flask] = None):
+        self.app = app
+        self.flask_app = flask_app
+        self.on_demand = config.PROFILE_ON_DEMAND and flask_app is not None
+        self.sample_rate = config.PROFILE_SAMPLE_RATE
+        self.directory = config.PROFILE_DIR
+        self.keep = config.PROFILE_KEEP
+        self._cleanup_lock = threading.Lock()
+        # Сколько запросов выполняется и сколько пришло: next() у count атомарен под GIL
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._arrivals = itertools.count()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _requested_by_admin(self, environ) -> bool:
+        """X-Profile от пользователя с ролью администратора; токен проверяется как в jwt_required"""
+        if not self.on_demand or environ.get(PROFILE_HEADER) != '1':
+            return False
+        scheme, _, token = environ.get(AUTH_HEADER, '').partition(' ')
+        if scheme != 'Bearer' or not token:
+            return False
+        from dal.users import UserDAL
+        try:
+            with self.flask_app.app_context():
+                identity = decode_token(token)['sub']
+            user = UserDAL.get_user_by_id(identity)
+        except Exception as e:
+            logger.warning(f"Profiling requested with an invalid token: {e}")
+            return False
+        return isinstance(user, dict) and user['role_id'] == ADMIN_ROLE_ID
+
+    def _selected(self, environ) -> bool:
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return True
+        return self._requested_by_admin(environ)
+
+    def __call__(self, environ, start_response) -> Iterable[bytes]:
+        next(self._arrivals)
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            if self._selected(environ) and _profiler_lock.acquire(blocking=False):
+                try:
+                    return self._profiled(environ, start_response)
+                finally:
+                    _profiler_lock.release()
+            return self.app(environ, start_response)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+
+    def _profiled(self, environ, start_response) -> Iterable[bytes]:
+        profile = cProfile.Profile()
+        body = []
+        # Другие запросы, которые шли во время профиля: уже начатые и пришедшие за это время
+        concurrent = self._in_flight - 1
+        arrivals = next(self._arrivals)
+        started = time.perf_counter()
+        enabled = False
+        try:
+            profile.enable()
+            enabled = True
+            app_iter = self.app(environ, start_response)
+            try:
+                # Тело собирается здесь, чтобы в профиль попала и сериализация ответа
+                body.extend(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            if enabled:
+                profile.disable()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                concurrent += next(self._arrivals) - arrivals - 1
+                self._save(profile, environ, elapsed_ms, concurrent)
+        return body
+
+    def _save(self, profile: cProfile.Profile, environ, elapsed_ms: float, concurrent: int) -> None:
+        path = _UNSAFE.sub('.', environ.get('PATH_INFO', '/')).strip('.') or 'root'
+        name = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}.{environ.get('REQUEST_METHOD', 'GET')}."
+            f"{path}.{elapsed_ms:.0f}ms.{os.getpid()}.{random.randrange(1 << 16):04x}"
+            f"{f'.concurrent{concurrent}' if concurrent else ''}.prof"
+        )
+        try:
+            profile.dump_stats(os.path.join(self.directory, name))
+            logger.info(f"Profile saved: {name}"
+                        + (f" (includes {concurrent} concurrent requests)" if concurrent else ''))
+            self._enforce_retention()
+        except OSError as e:
+            logger.warning(f"Failed to save profile {name}: {e}")
+
+    def _enforce_retention(self) -> None:
+        """Удаляет самые старые профили сверх PROFILE_KEEP"""
+        if not self._cleanup_lock.acquire(blocking=False):
+            return
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.prof')]
+            if len(entries) <= self.keep:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.keep]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        finally:
+            self._cleanup_lock.release()
+
+
+def init_profiling(app: Flask, config: Settings) -> None:
+    """Включает профилирование, если разрешён X-Profile или задана доля выборки"""
+    if config.PROFILE_ON_DEMAND or config.PROFILE_SAMPLE_RATE > 0:
+        app.wsgi_app = SamplingProfiler(app.wsgi_app, config, flask_app=app)
+        logger.info(f"Request profiling enabled, profiles in {config.PROFILE_DIR}")
@@ -0,0 +1,85 @@
+import struct
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any
+
+import msgpack
+
+# Коды ext-типов MessagePack для значений, которые приходят из psycopg2
+EXT_DECIMAL = 1
+EXT_DATETIME = 2
+EXT_DATETIME_TZ = 3
+EXT_DATE = 4
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_TZ = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _micros(delta: timedelta) -> int:
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _default(obj: Any):
+    """Упаковка типов, которые msgpack не знает, в компактные ext-значения"""
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, datetime):
+        offset = obj.utcoffset()
+        if offset is None:
+            return msgpack.ExtType(EXT_DATETIME, struct.pack('>q', _micros(obj - _EPOCH)))
+        return msgpack.ExtType(
+            EXT_DATETIME_TZ,
+            struct.pack('>qi', _micros(obj - _EPOCH_TZ), int(offset.total_seconds()))
+        )
+    if isinstance(obj, date):
+        return msgpack.ExtType(EXT_DATE, struct.pack('>i', obj.toordinal()))
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == EXT_DECIMAL:
+        return Decimal(data.decode())
+    if code == EXT_DATETIME:
+        return _EPOCH + timedelta(microseconds=struct.unpack('>q', data)[0])
+    if code == EXT_DATETIME_TZ:
+        micros, offset = struct.unpack('>qi', data)
+        tz = timezone(timedelta(seconds=offset))
+        return (_EPOCH_TZ + timedelta(microseconds=micros)).astimezone(tz)
+    if code == EXT_DATE:
+        return date.fromordinal(struct.unpack('>i', data)[0])
+    return msgpack.ExtType(code, data)
+
+
+def _wire_default(obj: Any):
+    """
+    Упаковка для клиентов API: время — стандартный Timestamp (ext -1),
+    который декодируют все библиотеки msgpack; naive-время считается UTC.
+    Decimal — ext 1 со строковым значением, date — строка ISO.
+    """
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+def packb(value: Any) -> bytes:
+    """
+    Сериализует значение (строки RealDictRow, Decimal, datetime, date)
+    в компактный бинарный вид без потери типов
+    """
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """Восстанавливает значение, упакованное через packb"""
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def packb_wire(value: Any) -> bytes:
+    """Сериализует ответ API в MessagePack"""
+    return msgpack.packb(value, default=_wire_default, use_bin_type=True)
@@ -0,0 +1,74 @@
+"""
+Тесты, которым нужна база, берут подключение из тех же переменных окружения,
+что и приложение (DB_NAME, USER, PASSWORD, HOST_NAME, PORT_NAME, SECRET_KEY),
+и ожидают схему после python -m migrations up. Без базы они пропускаются.
+"""
+import uuid
+
+import psycopg2
+import pytest
+from pydantic import ValidationError
+
+from config import Settings
+
+
+@pytest.fixture(scope='session')
+def settings():
+    try:
+        # Без кэша число запросов к БД не зависит от того, что уже закэшировано
+        config = Settings(CACHE_BACKEND='none')
+    except ValidationError:
+        pytest.skip('database settings are not configured')
+    try:
+        psycopg2.connect(user=config.USER, password=config.PASSWORD, host=config.HOST_NAME,
+                         port=config.PORT_NAME, dbname=config.DB_NAME, connect_timeout=3).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"database is not available: {e}")
+    return config
+
+
+@pytest.fixture(scope='session')
+def app(settings):
+    from cache import CacheManager
+    from db_manager import DatabaseManager
+    from main import create_app
+
+    app = create_app(settings)
+    yield app
+    DatabaseManager.close_all()
+    CacheManager.close_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    """Курсор в autocommit для подготовки и уборки данных теста"""
+    from db_manager import DatabaseManager
+
+    with DatabaseManager.get_cursor(readonly=True, retry=False) as cursor:
+        yield cursor
+
+
+def auth_headers(app, user_id: int) -> dict:
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+@pytest.fixture
+def engineer(app, db):
+    """Инженер без заявок; его заявки и он сам удаляются после теста"""
+    db.execute("""
+        INSERT INTO users (role_id, name, login, passw)
+        VALUES (1, 'Test engineer', %s, 'test')
+        RETURNING user_id;
+    """, (f"test-{uuid.uuid4().hex}",))
+    user_id = db.fetchone()['user_id']
+    yield {'user_id': user_id, 'headers': auth_headers(app, user_id)}
+    db.execute("DELETE FROM request WHERE engineer_id = %s", (user_id,))
+    db.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
@@ -0,0 +1,67 @@
+import pytest
+
+import audit
+from audit import RequestAudit
+from dal.request import RequestDAL
+from metrics import count_queries
+from tests.test_query_counts import add_requests
+
+
+@pytest.fixture
+def request_id(db, engineer):
+    add_requests(db, engineer['user_id'], 1)
+    db.execute("SELECT request_id FROM request WHERE engineer_id = %s", (engineer['user_id'],))
+    return db.fetchone()['request_id']
+
+
+def update_without_history(db, assignments, request_id):
+    """Подготовка данных теста: UPDATE с remont.audit='off', триггер его пропускает"""
+    db.execute(f"""
+        UPDATE request SET {assignments}
+        WHERE request_id = %s AND (SELECT set_config('remont.audit', %s, true)) IS NOT NULL;
+    """, (request_id, audit.OFF))
+
+
+def history(db, request_id):
+    db.execute("""
+        SELECT field_name, old_value, new_value FROM request_history
+        WHERE request_id = %s ORDER BY field_name;
+    """, (request_id,))
+    return [tuple(row.values()) for row in db.fetchall()]
+
+
+@pytest.mark.parametrize('mode', [audit.APP, audit.TRIGGER])
+def test_history_values_match_in_both_modes(monkeypatch, db, engineer, request_id, mode):
+    monkeypatch.setattr(RequestAudit, 'mode', mode)
+    monkeypatch.setattr(RequestAudit, 'history_format', audit.ROWS)
+    update_without_history(db, "done_time = '2026-01-01 09:00:00.25'", request_id)
+
+    result = RequestDAL.update_request(engineer['user_id'], 1, request_id, {'done_time': '2026-01-01T10:00:00'})
+    assert isinstance(result, dict)
+    assert history(db, request_id) == [('done_time', '2026-01-01 09:00:00.250000', '2026-01-01 10:00:00')]
+
+
+def test_update_outside_app_is_audited_without_changer(db, request_id):
+    db.execute("UPDATE request SET description = 'edited in psql' WHERE request_id = %s", (request_id,))
+    assert history(db, request_id) == [('description', 'description', 'edited in psql')]
+    db.execute("SELECT changer_id FROM request_history WHERE request_id = %s", (request_id,))
+    assert db.fetchone()['changer_id'] is None
+
+
+def test_update_marked_off_writes_no_history(db, request_id):
+    update_without_history(db, "description = 'no history'", request_id)
+    assert history(db, request_id) == []
+
+
+@pytest.mark.parametrize('mode', [audit.APP, audit.TRIGGER])
+def test_status_names_resolved_on_one_connection(monkeypatch, db, engineer, request_id, mode):
+    monkeypatch.setattr(RequestAudit, 'mode', mode)
+    monkeypatch.setattr(RequestAudit, 'history_format', audit.ROWS)
+    update_without_history(db, "status_id = 2", request_id)
+
+    with count_queries() as stats:
+        result = RequestDAL.update_request(engineer['user_id'], 1, request_id, {'status_id': 3})
+    assert result['status_id'] == 3 and 'status_name' not in result
+    # Без второго соединения из пула на названия статусов
+    assert stats.checkouts == 1
+    assert history(db, request_id) == [('status_id', 'Назначена', 'В работе')]
@@ -0,0 +1,168 @@
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from cache import MISS, CacheManager, MemoryLRUBackend, RedisBackend, cached
+
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    """RedisBackend поверх fakeredis: тот же протокол без сервера"""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, 'from_url',
+                        classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server)))
+    backend = RedisBackend('redis://cache-stand-in', prefix='test')
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def cache_manager(redis_backend):
+    CacheManager._backend = redis_backend
+    CacheManager._default_ttl = None
+    yield CacheManager
+    CacheManager._backend = None
+
+
+def test_redis_get_set(redis_backend):
+    assert redis_backend.get('users', '1') is None
+    redis_backend.set('users', '1', b'value')
+    assert redis_backend.get('users', '1') == b'value'
+    assert redis_backend.get('other', '1') is None
+
+
+def test_redis_ttl(redis_backend):
+    redis_backend.set('users', '1', b'value', ttl=60)
+    client = redis_backend._client
+    assert 0 < client.ttl('test:users:1') <= 60
+    redis_backend.set('users', '2', b'value')
+    assert client.ttl('test:users:2') == -1
+    # Индекс не истекает, пока в нём есть ключи
+    assert client.ttl('test:users:__keys__') == -1
+
+
+def test_redis_clear_after_mixed_ttls(redis_backend):
+    """Короткий TTL не укорачивает жизнь индекса: clear() находит и долгие ключи"""
+    client = redis_backend._client
+    redis_backend.set('users', 'long', b'a', ttl=3600)
+    redis_backend.set('users', 'short', b'b', ttl=1)
+    redis_backend.set('users', 'forever', b'c')
+    assert client.ttl('test:users:__keys__') == -1
+    client.pexpire('test:users:short', 1)
+    time.sleep(0.01)
+    assert redis_backend.get('users', 'short') is None
+
+    redis_backend.clear('users')
+    assert redis_backend.get('users', 'long') is None
+    assert redis_backend.get('users', 'forever') is None
+
+
+def test_redis_index_prunes_expired_keys(redis_backend):
+    redis_backend._prune_threshold = 4
+    client = redis_backend._client
+    for key in range(4):
+        redis_backend.set('users', str(key), b'a', ttl=60)
+        client.pexpire(f"test:users:{key}", 1)
+    time.sleep(0.01)
+    redis_backend.set('users', 'live', b'b', ttl=60)
+    assert client.smembers('test:users:__keys__') == {b'test:users:live'}
+
+
+def test_redis_delete(redis_backend):
+    redis_backend.set('users', '1', b'a')
+    redis_backend.set('users', '2', b'b')
+    redis_backend.delete('users', '1')
+    assert redis_backend.get('users', '1') is None
+    assert redis_backend.get('users', '2') == b'b'
+    assert redis_backend._client.smembers('test:users:__keys__') == {b'test:users:2'}
+
+
+def test_redis_clear(redis_backend):
+    redis_backend.set('users', '1', b'a')
+    redis_backend.set('users', '2', b'b')
+    redis_backend.set('reports', '1', b'c')
+    redis_backend.clear('users')
+    assert redis_backend.get('users', '1') is None
+    assert redis_backend.get('users', '2') is None
+    assert not redis_backend._client.exists('test:users:__keys__')
+    assert redis_backend.get('reports', '1') == b'c'
+    # Пустой namespace сбрасывается без ошибок
+    redis_backend.clear('missing')
+
+
+def test_redis_clear_retries_when_index_changes(redis_backend):
+    """Ключ, записанный между SMEMBERS и EXEC, не остаётся в кэше без индекса"""
+    redis_backend.set('users', '1', b'a')
+    client = redis_backend._client
+    original = client.transaction
+    raced = []
+
+    def racing_transaction(func, *watches, **kwargs):
+        def with_concurrent_write(pipe):
+            result = func(pipe)
+            if not raced:
+                raced.append(True)
+                # Другой воркер пишет в namespace, пока транзакция ещё не выполнена
+                redis_backend.set('users', '2', b'b')
+            return result
+        return original(with_concurrent_write, *watches, **kwargs)
+
+    client.transaction = racing_transaction
+    redis_backend.clear('users')
+    assert raced
+    assert redis_backend.get('users', '1') is None
+    assert redis_backend.get('users', '2') is None
+    assert not client.exists('test:users:__keys__')
+
+
+def test_memory_ttl_and_clear():
+    backend = MemoryLRUBackend(max_entries=2)
+    backend.set('users', '1', b'a', ttl=0.05)
+    backend.set('users', '2', b'b')
+    time.sleep(0.06)
+    assert backend.get('users', '1') is None
+    backend.set('users', '3', b'c')
+    backend.set('users', '4', b'd')
+    # LRU: при переполнении вытесняется самая старая запись
+    assert backend.get('users', '2') is None
+    backend.clear('users')
+    assert backend.get('users', '4') is None
+
+
+def test_cached_invalidate(cache_manager):
+    calls = []
+
+    @cached('users')
+    def get_user(user_id):
+        calls.append(user_id)
+        return {'user_id': user_id, 'version': len(calls)}
+
+    assert get_user(1) == {'user_id': 1, 'version': 1}
+    assert get_user(1) == {'user_id': 1, 'version': 1}
+    assert get_user(2) == {'user_id': 2, 'version': 2}
+    assert calls == [1, 2]
+
+    get_user.invalidate(1)
+    assert get_user(1) == {'user_id': 1, 'version': 3}
+    assert get_user(2) == {'user_id': 2, 'version': 2}
+
+    CacheManager.invalidate('users')
+    assert CacheManager.get('users', f"{get_user.__qualname__}:2") is MISS
+    assert get_user(2) == {'user_id': 2, 'version': 4}
+
+
+def test_cached_skips_errors(cache_manager):
+    calls = []
+
+    @cached('users')
+    def get_user(user_id):
+        calls.append(user_id)
+        return None if user_id == 0 else 'Internal server error'
+
+    get_user(0)
+    get_user(0)
+    get_user(1)
+    get_user(1)
+    assert calls == [0, 0, 1, 1]
@@ -0,0 +1,27 @@
+import logging
+
+from audit import RequestAudit
+from history_flusher import HistoryFlusher
+from tests.test_query_counts import add_requests
+
+
+def test_flush_logs_rows_of_deleted_requests(monkeypatch, caplog, settings, db, engineer):
+    monkeypatch.setattr(HistoryFlusher, '_config', settings)
+    monkeypatch.setattr(RequestAudit, '_flusher_running', False)
+    monkeypatch.setattr(RequestAudit, '_saturated', False)
+    add_requests(db, engineer['user_id'], 1)
+    db.execute("SELECT request_id FROM request WHERE engineer_id = %s", (engineer['user_id'],))
+    request_id = db.fetchone()['request_id']
+    db.execute("SELECT max(request_id) + 1000 AS id FROM request")
+    deleted_id = db.fetchone()['id']
+    db.execute("""
+        INSERT INTO request_history_buffer (request_id, changer_id, diff)
+        VALUES (%s, NULL, '{"description": ["a", "b"]}'), (%s, NULL, '{"description": ["a", "b"]}');
+    """, (request_id, deleted_id))
+
+    with caplog.at_level(logging.WARNING, logger='history_flusher'):
+        assert HistoryFlusher.flush_once() == 2
+
+    assert "Dropped 1 request history buffer rows of deleted requests" in caplog.text
+    db.execute("SELECT count(*) AS n FROM request_history WHERE request_id = %s", (request_id,))
+    assert db.fetchone()['n'] == 1
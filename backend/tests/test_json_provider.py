@@ -0,0 +1,16 @@
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Flask
+
+from json_provider import ORJSONProvider
+
+
+def test_decimal_is_exact_string_and_datetime_is_iso_utc():
+    app = Flask(__name__)
+    app.json = ORJSONProvider(app)
+    data = app.json.loads(app.json.dumps({
+        'balance': Decimal('1234567890.12'),
+        'done_time': datetime(2026, 1, 1, 10, 0, 0, 250000),
+    }))
+    assert data == {'balance': '1234567890.12', 'done_time': '2026-01-01T10:00:00.250000Z'}
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+import profiling
+from config import Settings
+from dal.users import UserDAL
+from profiling import SamplingProfiler
+
+
+def profiler_settings(tmp_path, **overrides) -> Settings:
+    return Settings(PROFILE_DIR=str(tmp_path), **overrides)
+
+
+def call(wsgi, headers=None):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/test', **(headers or {})}
+    statuses = []
+    body = b''.join(wsgi(environ, lambda status, response_headers: statuses.append(status)))
+    return statuses[0], body
+
+
+def ok_app(environ, start_response):
+    start_response('200 OK', [])
+    return [b'ok']
+
+
+def profiles(tmp_path):
+    return sorted(path.name for path in tmp_path.glob('*.prof'))
+
+
+def test_concurrent_sampled_requests_profile_one_at_a_time(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        # Ждёт только первый запрос, второй выполняется, пока первый ещё идёт
+        if not started.is_set():
+            started.set()
+            release.wait(5)
+        return ok_app(environ, start_response)
+
+    wsgi = SamplingProfiler(slow_app, profiler_settings(tmp_path, PROFILE_SAMPLE_RATE=1.0))
+    results = []
+    first = threading.Thread(target=lambda: results.append(call(wsgi)))
+    first.start()
+    assert started.wait(5)
+    # Второй выбранный запрос, пока первый профилируется: без профиля, но и без ошибки
+    results.append(call(wsgi))
+    release.set()
+    first.join(5)
+
+    assert results == [('200 OK', b'ok'), ('200 OK', b'ok')]
+    saved = profiles(tmp_path)
+    assert len(saved) == 1
+    assert '.concurrent1.' in saved[0]
+    assert not profiling._profiler_lock.locked()
+
+
+def test_profiler_released_when_app_fails(tmp_path):
+    def failing_app(environ, start_response):
+        raise RuntimeError('boom')
+
+    wsgi = SamplingProfiler(failing_app, profiler_settings(tmp_path, PROFILE_SAMPLE_RATE=1.0))
+    with pytest.raises(RuntimeError):
+        call(wsgi)
+    assert not profiling._profiler_lock.locked()
+    assert len(profiles(tmp_path)) == 1
+    assert call(SamplingProfiler(ok_app, profiler_settings(tmp_path, PROFILE_SAMPLE_RATE=1.0)))[0] == '200 OK'
+
+
+@pytest.fixture
+def on_demand(tmp_path, monkeypatch):
+    users = {'1': {'user_id': 1, 'role_id': 1}, '3': {'user_id': 3, 'role_id': 3}}
+    monkeypatch.setattr(UserDAL, 'get_user_by_id', staticmethod(lambda user_id: users.get(str(user_id))))
+    flask_app = Flask(__name__)
+    flask_app.config['JWT_SECRET_KEY'] = 'test-secret-test-secret-test-secret'
+    JWTManager(flask_app)
+    wsgi = SamplingProfiler(ok_app, profiler_settings(tmp_path, PROFILE_ON_DEMAND=True), flask_app=flask_app)
+
+    def headers(user_id):
+        with flask_app.app_context():
+            token = create_access_token(identity=user_id)
+        return {'HTTP_X_PROFILE': '1', 'HTTP_AUTHORIZATION': f"Bearer {token}"}
+
+    return wsgi, headers
+
+
+def test_on_demand_profiling_requires_admin(tmp_path, on_demand):
+    wsgi, headers = on_demand
+    assert call(wsgi, headers('1')) == ('200 OK', b'ok')
+    assert call(wsgi, {'HTTP_X_PROFILE': '1', 'HTTP_AUTHORIZATION': 'Bearer forged'}) == ('200 OK', b'ok')
+    assert call(wsgi, {'HTTP_X_PROFILE': '1'}) == ('200 OK', b'ok')
+    assert profiles(tmp_path) == []
+
+    assert call(wsgi, headers('3')) == ('200 OK', b'ok')
+    assert len(profiles(tmp_path)) == 1
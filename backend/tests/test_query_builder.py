@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from dal.query_builder import RequestFilter
+
+START = datetime(2026, 1, 1)
+END = datetime(2026, 2, 1)
+
+
+def test_only_given_filters_reach_where():
+    assert RequestFilter().where() == ('TRUE', [])
+    assert RequestFilter(creation_from=START).where() == ('r.creation_date >= %s', [START])
+    assert RequestFilter(done_to=END).where() == ('r.done_time <= %s', [END])
+    assert RequestFilter(engineer_ids=[3, 1], assigned_from=START, assigned_to=END).where() == (
+        'r.engineer_id = ANY(%s::int[]) AND r.assigned_time >= %s AND r.assigned_time <= %s',
+        ['{3,1}', START, END],
+    )
+
+
+def test_list_filters_do_not_depend_on_length():
+    one, _ = RequestFilter(status_ids=[2]).where()
+    many, _ = RequestFilter(status_ids=[1, 2, 3, 4]).where()
+    assert one == many == 'r.status_id = ANY(%s::int[])'
@@ -0,0 +1,26 @@
+from metrics import assert_max_queries, count_queries
+
+
+def add_requests(db, engineer_id: int, count: int) -> None:
+    db.execute("""
+        INSERT INTO request (engineer_id, status_id, phone, adress, techniq, description,
+                             customer_name, assigned_time)
+        SELECT %s, 2 + n %% 2, '1', 'address', 'techniq', 'description', 'customer', now() - n * interval '1 hour'
+        FROM generate_series(1, %s) n;
+    """, (engineer_id, count))
+
+
+def test_engineer_active_list_has_no_n_plus_one(client, db, engineer):
+    add_requests(db, engineer['user_id'], 1)
+    with count_queries() as one:
+        response = client.get('/api/requests/engineer/active', headers=engineer['headers'])
+    assert response.status_code == 200
+    assert response.json['total'] == 1
+
+    add_requests(db, engineer['user_id'], 20)
+    # Пользователь и список — по запросу на каждого, сколько бы ни было заявок
+    with assert_max_queries(statements=one.statements, checkouts=one.checkouts):
+        response = client.get('/api/requests/engineer/active', headers=engineer['headers'])
+    assert response.status_code == 200
+    assert response.json['total'] == 21
+    assert one.statements <= 2
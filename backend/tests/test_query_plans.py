@@ -0,0 +1,26 @@
+"""
+Сценарии tools/plan_check.py как тесты: планы запросов DAL на сгенерированных
+данных (python -m tools.generate_data). На маленькой базе планы не о чем
+проверять — тесты пропускаются.
+"""
+import pytest
+
+from tools import plan_check
+
+
+@pytest.fixture(scope='module')
+def plan_params(app):
+    try:
+        params = plan_check.sample_params()
+    except plan_check.MissingDataError as e:
+        pytest.skip(str(e))
+    if 'request' not in params['large_tables']:
+        pytest.skip(f"request has fewer than {plan_check.LARGE_TABLE_ROWS} rows: generate data first")
+    return params
+
+
+@pytest.mark.parametrize('case', plan_check.CASES, ids=lambda case: case.name)
+def test_query_plan(case, plan_params):
+    results = plan_check.check_case(case, plan_params)
+    failed = [result for result in results if result.problems]
+    assert not failed, '\n' + '\n'.join(line for result in failed for line in result.report(case))
@@ -0,0 +1,34 @@
+import itertools
+
+import pytest
+
+from cache import CacheManager, MemoryLRUBackend
+from dal.request import RequestDAL, _projection
+from dal.users import UserDAL
+from tests.test_query_counts import add_requests
+
+
+def test_projection_is_canonical_for_any_field_order():
+    fields = ('done_time', 'engineer_name', 'request_id')
+    projections = {_projection(list(order), ()) for order in itertools.permutations(fields)}
+    projections.add(_projection(['request_id', 'done_time', 'request_id', 'engineer_name'], ()))
+    assert projections == {(
+        'r.request_id, u.name AS engineer_name, r.done_time',
+        'LEFT JOIN users u ON r.engineer_id = u.user_id',
+    )}
+
+
+def test_projection_rejects_unknown_fields():
+    with pytest.raises(ValueError, match='Unknown fields: passw'):
+        _projection(['request_id', 'passw'], ())
+
+
+def test_rename_refreshes_cached_request(monkeypatch, db, engineer):
+    monkeypatch.setattr(CacheManager, '_backend', MemoryLRUBackend())
+    add_requests(db, engineer['user_id'], 1)
+    db.execute("SELECT request_id FROM request WHERE engineer_id = %s", (engineer['user_id'],))
+    request_id = db.fetchone()['request_id']
+    assert RequestDAL.get_request_by_id(request_id)['engineer_name'] == 'Test engineer'
+
+    assert UserDAL.update_user(engineer['user_id'], name='Renamed engineer')
+    assert RequestDAL.get_request_by_id(request_id)['engineer_name'] == 'Renamed engineer'
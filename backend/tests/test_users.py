@@ -0,0 +1,29 @@
+from dal.users import UserDAL
+from tests.test_query_counts import add_requests
+
+
+def test_delete_user_clears_references_without_history(db, engineer):
+    user_id = engineer['user_id']
+    add_requests(db, user_id, 2)
+    db.execute("SELECT array_agg(request_id) AS ids FROM request WHERE engineer_id = %s", (user_id,))
+    request_ids = db.fetchone()['ids']
+    db.execute("""
+        INSERT INTO balance_history (admin_id, engineer_id, old_sum, new_sum)
+        VALUES (%(user_id)s, %(user_id)s, 0, 100);
+    """, {'user_id': user_id})
+    try:
+        assert UserDAL.delete_user(user_id) == "OK"
+
+        db.execute("SELECT count(*) AS n FROM request WHERE request_id = ANY(%s) AND engineer_id IS NULL",
+                   (request_ids,))
+        assert db.fetchone()['n'] == 2
+        # Обнуление инженера при удалении пользователя — не правка заявки
+        db.execute("""
+            SELECT (SELECT count(*) FROM request_history WHERE request_id = ANY(%(ids)s))
+                 + (SELECT count(*) FROM request_change WHERE request_id = ANY(%(ids)s)) AS n;
+        """, {'ids': request_ids})
+        assert db.fetchone()['n'] == 0
+        db.execute("SELECT count(*) AS n FROM balance_history WHERE engineer_id = %s", (user_id,))
+        assert db.fetchone()['n'] == 0
+    finally:
+        db.execute("DELETE FROM request WHERE request_id = ANY(%s)", (request_ids,))
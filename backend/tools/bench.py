@@ -0,0 +1,380 @@
+"""
+Нагрузочный тест API: смесь запросов инженеров, операторов и менеджеров
+против запущенного стенда, пропускная способность и перцентили задержки
+по каждому эндпоинту. Результат — JSON с коммитом, чтобы сравнивать прогоны.
+
+    cd backend
+    python -m tools.generate_data --requests 1000000 --truncate --yes
+    gunicorn main:app ...
+    python -m tools.bench --url http://127.0.0.1:5000 --concurrency 32 --duration 60 -o before.json
+    python -m tools.bench ... -o after.json --compare before.json
+
+Пользователи — из tools/generate_data.py: engineerN, operatorN, managerN с общим паролем.
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Операции смеси: имя -> (роль, метод, шаблон маршрута для отчёта)
+OPERATIONS = {
+    'engineer_active': ('engineer', 'GET', '/api/requests/engineer/active'),
+    'engineer_status': ('engineer', 'PUT', '/api/requests/engineer/<id>'),
+    'engineer_month_stats': ('engineer', 'GET', '/api/requests/stats'),
+    'operator_create': ('operator', 'POST', '/api/requests/'),
+    'manager_filter': ('manager', 'POST', '/api/requests/filter'),
+    'manager_engineers_stats': ('manager', 'POST', '/api/requests/engineers/stats'),
+}
+# Инженеры опрашивают свои заявки чаще всего, отчёты менеджеров — редко
+DEFAULT_MIX = {
+    'engineer_active': 50,
+    'engineer_status': 12,
+    'engineer_month_stats': 5,
+    'operator_create': 10,
+    'manager_filter': 18,
+    'manager_engineers_stats': 5,
+}
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def git_commit() -> Dict[str, Optional[str]]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+class Client:
+    """Keep-alive соединение одного потока; после сетевой ошибки переподключается"""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, token: Optional[str] = None, body=None):
+        """(статус, разобранный JSON или None); статус 0 — сетевая ошибка"""
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        for attempt in (1, 2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, self.prefix + path, body=data, headers=headers)
+                response = self.conn.getresponse()
+                payload = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                # Сервер мог закрыть простаивающее соединение — одна повторная попытка
+                if attempt == 2:
+                    return 0, None
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = None
+        return response.status, parsed
+
+
+class Recorder:
+    """Задержки и статусы по операциям; запросы прогрева не учитываются"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, operation: str, status: int, elapsed: float) -> None:
+        if not self.recording:
+            return
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+            self.statuses[operation][status] += 1
+
+
+class Workload:
+    """Пользователи стенда и состояние смеси: известные инженерам активные заявки"""
+
+    def __init__(self, args):
+        self.args = args
+        self.sessions: Dict[str, List[Dict]] = {}
+        self.active: Dict[int, List[Dict]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def login_all(self, client: Client) -> None:
+        counts = {'engineer': self.args.engineers, 'operator': self.args.operators, 'manager': self.args.managers}
+        for role, count in counts.items():
+            sessions = []
+            for number in range(1, count + 1):
+                login = f"{self.args.login_prefix}{role}{number}"
+                status, data = client.request('POST', '/api/users/login',
+                                              body={'login': login, 'password': self.args.password})
+                if status != 200:
+                    raise SystemExit(f"Login {login} failed: HTTP {status} {data}")
+                sessions.append({'user_id': data['user']['user_id'], 'token': data['access_token']})
+            self.sessions[role] = sessions
+
+    def remember_active(self, engineer_id: int, requests: List[Dict]) -> None:
+        with self.lock:
+            self.active[engineer_id] = [item for item in requests if item.get('status_id') in (2, 3)]
+
+    def take_active(self, engineer_id: int) -> Optional[Dict]:
+        with self.lock:
+            known = self.active.get(engineer_id)
+            return known.pop(random.randrange(len(known))) if known else None
+
+    def run(self, operation: str, client: Client, rng: random.Random):
+        """Выполняет операцию; (имя для учёта, статус). Имя может отличаться, если пришлось сначала опросить"""
+        role = OPERATIONS[operation][0]
+        session = rng.choice(self.sessions[role])
+        token = session['token']
+
+        if operation == 'engineer_status':
+            item = self.take_active(session['user_id'])
+            if item is None:
+                # Инженер ещё не видел своих заявок — сначала список
+                return self.run_active(client, session)
+            now = datetime.now().isoformat(timespec='seconds')
+            if item.get('status_id') == 2:
+                body = {'status_id': 3, 'in_works_time': now}
+            else:
+                body = {'status_id': 4, 'done_time': now}
+            status, _ = client.request('PUT', f"/api/requests/engineer/{item['request_id']}", token, body)
+            return operation, status
+
+        if operation == 'engineer_active':
+            return self.run_active(client, session)
+
+        if operation == 'engineer_month_stats':
+            return operation, client.request('GET', '/api/requests/stats', token)[0]
+
+        if operation == 'operator_create':
+            engineer = rng.choice(self.sessions['engineer'])
+            body = {
+                'status_id': 2,
+                'phone': f"89{rng.randrange(10 ** 9):09d}",
+                'address': f"ул. Нагрузочная, д. {rng.randint(1, 150)}",
+                'techniq': 'Стиральная машина',
+                'description': 'Не сливает воду, ошибка на дисплее',
+                'customer_name': 'Тестовый Клиент',
+                'engineer_id': engineer['user_id'],
+                'assigned_time': datetime.now().isoformat(timespec='seconds'),
+            }
+            return operation, client.request('POST', '/api/requests/', token, body)[0]
+
+        if operation == 'manager_filter':
+            body = {'page': rng.randint(1, 5), 'per_page': 20}
+            roll = rng.random()
+            if roll < 0.4:
+                body['engineer_id'] = rng.choice(self.sessions['engineer'])['user_id']
+            elif roll < 0.7:
+                body['status_ids'] = rng.choice(([2, 3], [1], [4]))
+            return operation, client.request('POST', '/api/requests/filter', token, body)[0]
+
+        if operation == 'manager_engineers_stats':
+            body = {'page': rng.randint(1, 3), 'per_page': 20}
+            return operation, client.request('POST', '/api/requests/engineers/stats', token, body)[0]
+
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def run_active(self, client: Client, session: Dict):
+        status, data = client.request('GET', '/api/requests/engineer/active', session['token'])
+        if status == 200 and data:
+            self.remember_active(session['user_id'], data.get('requests', []))
+        return 'engineer_active', status
+
+
+def worker(workload: Workload, recorder: Recorder, mix: Dict[str, int], stop: threading.Event, seed: int):
+    rng = random.Random(seed)
+    client = Client(workload.args.url, workload.args.timeout)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while not stop.is_set():
+        operation = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            recorded, status = workload.run(operation, client, rng)
+        except Exception as e:
+            print(f"{operation}: {e}", file=sys.stderr)
+            recorded, status = operation, 0
+        recorder.add(recorded, status, time.perf_counter() - started)
+        if workload.args.think_time:
+            time.sleep(rng.expovariate(1 / workload.args.think_time))
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], duration: float) -> Dict:
+    values = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+    result = {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / duration, 2),
+        'latency_ms': {'mean': round(sum(values) / len(values) * 1000, 2) if values else 0.0},
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+    for pct in PERCENTILES:
+        result['latency_ms'][f"p{pct}"] = round(percentile(values, pct) * 1000, 2)
+    result['latency_ms']['max'] = round(values[-1] * 1000, 2) if values else 0.0
+    return result
+
+
+def report(recorder: Recorder, args, mix: Dict[str, int], duration: float) -> Dict:
+    endpoints = {}
+    for operation in OPERATIONS:
+        if operation in recorder.latencies:
+            _, method, route = OPERATIONS[operation]
+            endpoints[operation] = {'method': method, 'route': route,
+                                    **summarize(recorder.latencies[operation], recorder.statuses[operation], duration)}
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    all_statuses: Dict[int, int] = defaultdict(int)
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+    return {
+        'started_at': datetime.now().astimezone().isoformat(timespec='seconds'),
+        **git_commit(),
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'duration_s': round(duration, 2),
+        'warmup_s': args.warmup,
+        'mix': mix,
+        'total': summarize(all_latencies, all_statuses, duration),
+        'endpoints': endpoints,
+    }
+
+
+def print_table(result: Dict, baseline: Optional[Dict] = None, out=sys.stderr) -> None:
+    header = f"{'operation':<26}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    if baseline:
+        header += f"{'Δrps':>9}{'Δp99':>9}"
+    print(header, file=out)
+    rows = list(result['endpoints'].items()) + [('TOTAL', result['total'])]
+    for name, data in rows:
+        latency = data['latency_ms']
+        line = (f"{name:<26}{data['requests']:>8}{data['errors']:>6}{data['throughput_rps']:>9.1f}"
+                f"{latency['p50']:>9.1f}{latency['p90']:>9.1f}{latency['p99']:>9.1f}{latency['max']:>9.1f}")
+        if baseline:
+            old = baseline['total'] if name == 'TOTAL' else baseline['endpoints'].get(name)
+            if old and old['throughput_rps'] and old['latency_ms']['p99']:
+                line += (f"{(data['throughput_rps'] / old['throughput_rps'] - 1) * 100:>+8.1f}%"
+                         f"{(latency['p99'] / old['latency_ms']['p99'] - 1) * 100:>+8.1f}%")
+        print(line, file=out)
+    if baseline:
+        print(f"baseline: {baseline.get('commit')} ({baseline.get('started_at')})", file=out)
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, int]:
+    """'engineer_active=50,manager_filter=10' — только перечисленные операции"""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; known: {', '.join(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='адрес API (gunicorn или nginx)')
+    parser.add_argument('--concurrency', type=int, default=16, help='параллельных клиентов')
+    parser.add_argument('--duration', type=float, default=30.0, help='секунд измерения')
+    parser.add_argument('--warmup', type=float, default=5.0, help='секунд прогрева, не попадающих в результат')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='средняя пауза клиента между запросами, с (0 — без пауз, максимальная нагрузка)')
+    parser.add_argument('--mix', type=parse_mix, default=None,
+                        help=f"веса операций, по умолчанию {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument('--engineers', type=int, default=50, help='инженеров среди клиентов (engineer1..N)')
+    parser.add_argument('--operators', type=int, default=10)
+    parser.add_argument('--managers', type=int, default=3)
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--login-prefix', default='')
+    parser.add_argument('--timeout', type=float, default=30.0, help='таймаут одного запроса, с')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help='файл для JSON с результатом (по умолчанию stdout)')
+    parser.add_argument('--compare', help='JSON прошлого прогона: вывести изменение rps и p99')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    mix = args.mix or dict(DEFAULT_MIX)
+
+    workload = Workload(args)
+    workload.login_all(Client(args.url, args.timeout))
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(workload, recorder, mix, stop, args.seed + number), daemon=True)
+        for number in range(args.concurrency)
+    ]
+    print(f"{args.concurrency} clients against {args.url}: warmup {args.warmup}s, measure {args.duration}s",
+          file=sys.stderr)
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    duration = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join(args.timeout)
+
+    result = report(recorder, args, mix, duration)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(result, baseline)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if result['total']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Генератор синтетических данных для нагрузочных тестов и проверки планов запросов.
+
+Заполняет уже созданную миграциями (python -m migrations up) базу пользователями, профилями
+инженеров, заявками с правдоподобной историей статусов, request_history
+(или request_change при --history-format compact, см. audit.py)
+и balance_history. Загрузка идёт через COPY, миллион заявок — за минуты.
+
+    cd backend
+    python -m tools.generate_data --requests 1000000 --engineers 500 --truncate --yes
+
+Подключение — те же переменные окружения, что у приложения (DB_NAME, USER, ...),
+или --dsn. Все созданные пользователи получают пароль --password, логины
+предсказуемы: manager1.., operator1.., engineer1.. (их использует tools/bench.py).
+"""
+import argparse
+import io
+import itertools
+import json
+import random
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+import psycopg2
+
+STATUS_CREATED, STATUS_ASSIGNED, STATUS_IN_WORK, STATUS_DONE, STATUS_DELETED = 1, 2, 3, 4, 5
+STATUS_NAMES = {
+    STATUS_CREATED: 'Создана',
+    STATUS_ASSIGNED: 'Назначена',
+    STATUS_IN_WORK: 'В работе',
+    STATUS_DONE: 'Выполнена',
+    STATUS_DELETED: 'Удалена',
+}
+ROLE_ENGINEER, ROLE_OPERATOR, ROLE_MANAGER = 1, 2, 3
+
+FIRST_NAMES = ('Иван', 'Пётр', 'Сергей', 'Алексей', 'Дмитрий', 'Анна', 'Мария', 'Ольга', 'Елена', 'Наталья')
+LAST_NAMES = ('Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Волков', 'Фёдоров', 'Морозов', 'Новиков')
+STREETS = ('Ленина', 'Мира', 'Советская', 'Гагарина', 'Пушкина', 'Садовая', 'Лесная', 'Молодёжная', 'Школьная')
+EQUIPMENT = ('Стиральная машина', 'Холодильник', 'Посудомоечная машина', 'Плита', 'Духовой шкаф',
+             'Микроволновая печь', 'Кондиционер', 'Водонагреватель', 'Телевизор', 'Ноутбук')
+PROBLEMS = ('не включается', 'шумит при работе', 'течёт вода', 'не греет', 'выбивает автомат',
+            'ошибка на дисплее', 'не сливает воду', 'искрит', 'не охлаждает', 'требуется диагностика')
+
+COPY_CHUNK_ROWS = 50_000
+
+REQUEST_COLUMNS = ('request_id', 'operator_id', 'engineer_id', 'status_id', 'phone', 'adress', 'techniq',
+                   'description', 'customer_name', 'creation_date', 'assigned_time', 'in_works_time', 'done_time')
+HISTORY_COLUMNS = ('request_id', 'changer_id', 'field_name', 'old_value', 'new_value', 'changed_at')
+CHANGE_COLUMNS = ('request_id', 'changer_id', 'changed_at', 'diff')
+
+
+def _text(value) -> str:
+    """Значение в текстовом формате COPY"""
+    if value is None:
+        return r'\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """Загружает строки через COPY ... FROM STDIN порциями, не держа всё в памяти"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, COPY_CHUNK_ROWS))
+        if not chunk:
+            return total
+        buffer = io.StringIO()
+        buffer.writelines('\t'.join(_text(value) for value in row) + '\n' for row in chunk)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += len(chunk)
+
+
+def compact_history(history: Iterable[Sequence]) -> List[tuple]:
+    """
+    Строки request_history -> строки request_change: одно изменение (заявка,
+    автор, время) — один diff. Повтор поля в том же изменении (время этапов
+    упёрлось в «сейчас») начинает новое изменение.
+    """
+    changes = {}
+    for request_id, changer_id, field, old_value, new_value, at in history:
+        diffs = changes.setdefault((request_id, changer_id, at), [{}])
+        if field in diffs[-1]:
+            diffs.append({})
+        diffs[-1][field] = [old_value, new_value]
+    return [(request_id, changer_id, at, json.dumps(diff, ensure_ascii=False))
+            for (request_id, changer_id, at), diffs in changes.items() for diff in diffs]
+
+
+class ZipfChooser:
+    """
+    Выбор с перекосом: i-й элемент выбирается с весом 1 / (i + 1) ** skew.
+    skew=0 — равномерно, 1 и выше — немногие инженеры получают большую часть заявок.
+    """
+
+    def __init__(self, items: Sequence[int], skew: float, rng: random.Random):
+        self.items = list(items)
+        self.rng = rng
+        weights = [1.0 / (rank + 1) ** skew for rank in range(len(self.items))]
+        self.cumulative = list(itertools.accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def choice(self) -> int:
+        return self.items[bisect_left(self.cumulative, self.rng.random() * self.total)]
+
+
+class Generator:
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.now = datetime.now().replace(microsecond=0)
+        self.start = self.now - timedelta(days=args.days)
+
+    def person(self) -> str:
+        return f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(FIRST_NAMES)}"
+
+    def phone(self) -> str:
+        return f"89{self.rng.randrange(10 ** 9):09d}"
+
+    def users(self, first_id: int):
+        """(user_id, role_id, name, login, passw, phone, email) по ролям"""
+        plan = (
+            (ROLE_MANAGER, 'manager', self.args.managers),
+            (ROLE_OPERATOR, 'operator', self.args.operators),
+            (ROLE_ENGINEER, 'engineer', self.args.engineers),
+        )
+        user_id = first_id
+        ids = {ROLE_MANAGER: [], ROLE_OPERATOR: [], ROLE_ENGINEER: []}
+        rows = []
+        for role_id, prefix, count in plan:
+            for number in range(1, count + 1):
+                login = f"{self.args.login_prefix}{prefix}{number}"
+                rows.append((user_id, role_id, self.person(), login, self.args.password,
+                             self.phone(), f"{login}@example.com"))
+                ids[role_id].append(user_id)
+                user_id += 1
+        return rows, ids
+
+    def status_for_age(self, age_days: float) -> int:
+        """Старые заявки почти все закрыты, свежие — в работе или ждут инженера"""
+        roll = self.rng.random()
+        if age_days > 14:
+            return STATUS_DONE if roll < 0.92 else STATUS_DELETED if roll < 0.97 else STATUS_IN_WORK
+        if age_days > 2:
+            return (STATUS_DONE if roll < 0.6 else STATUS_IN_WORK if roll < 0.8
+                    else STATUS_ASSIGNED if roll < 0.93 else STATUS_DELETED if roll < 0.96 else STATUS_CREATED)
+        return (STATUS_CREATED if roll < 0.25 else STATUS_ASSIGNED if roll < 0.6
+                else STATUS_IN_WORK if roll < 0.85 else STATUS_DONE)
+
+    def creation_times(self) -> Iterable[datetime]:
+        """
+        Время создания заявок по возрастанию, как их нумерует приложение:
+        request_id растёт вместе с creation_date. Поток заявок со временем
+        растёт — в последний день их втрое больше, чем в первый.
+        """
+        days = self.args.days
+        weights = [1 + 2 * day / max(days - 1, 1) for day in range(days)]
+        total_weight = sum(weights)
+        remaining = self.args.requests
+        carry = 0.0
+        for day, weight in enumerate(weights):
+            exact = self.args.requests * weight / total_weight + carry
+            count = remaining if day == days - 1 else min(int(exact), remaining)
+            carry = exact - count
+            remaining -= count
+            day_start = self.start + timedelta(days=day)
+            for second in sorted(self.rng.randrange(86400) for _ in range(count)):
+                yield min(day_start + timedelta(seconds=second), self.now)
+
+    def requests(self, first_id: int, operators: List[int], engineers: ZipfChooser):
+        """
+        Заявки и их история. Для каждой заявки: (строка request, строки request_history).
+        Время этапов согласовано со статусом: назначение после создания,
+        начало работы после назначения, выполнение после начала.
+        """
+        rng = self.rng
+        for request_id, created in enumerate(self.creation_times(), start=first_id):
+            age_days = (self.now - created).total_seconds() / 86400
+            status = self.status_for_age(age_days)
+            operator_id = rng.choice(operators)
+            engineer_id = None
+            assigned = in_works = done = None
+            history = []
+
+            def change(at, field, old, new, changer):
+                history.append((request_id, changer, field, old, new, at))
+
+            deleted_after = None
+            if status == STATUS_DELETED:
+                # Удаляют на любом этапе до выполнения
+                deleted_after = rng.choice((STATUS_CREATED, STATUS_ASSIGNED, STATUS_IN_WORK))
+
+            reached = deleted_after if deleted_after else status
+            if reached >= STATUS_ASSIGNED:
+                engineer_id = engineers.choice()
+                assigned = min(created + timedelta(minutes=rng.randint(5, 60 * 24)), self.now)
+                change(assigned, 'engineer_id', None, str(engineer_id), operator_id)
+                change(assigned, 'status_id', STATUS_NAMES[STATUS_CREATED], STATUS_NAMES[STATUS_ASSIGNED], operator_id)
+            if reached >= STATUS_IN_WORK:
+                in_works = min(assigned + timedelta(minutes=rng.randint(30, 60 * 48)), self.now)
+                change(in_works, 'status_id', STATUS_NAMES[STATUS_ASSIGNED], STATUS_NAMES[STATUS_IN_WORK], engineer_id)
+                change(in_works, 'in_works_time', None, in_works.isoformat(), engineer_id)
+            if reached >= STATUS_DONE:
+                done = min(in_works + timedelta(minutes=rng.randint(20, 60 * 72)), self.now)
+                change(done, 'status_id', STATUS_NAMES[STATUS_IN_WORK], STATUS_NAMES[STATUS_DONE], engineer_id)
+                change(done, 'done_time', None, done.isoformat(), engineer_id)
+            if deleted_after:
+                last = max(t for t in (created, assigned, in_works) if t is not None)
+                deleted_at = min(last + timedelta(hours=rng.randint(1, 72)), self.now)
+                change(deleted_at, 'status_id', STATUS_NAMES[deleted_after], STATUS_NAMES[STATUS_DELETED], operator_id)
+
+            row = (
+                request_id, operator_id, engineer_id, status, self.phone(),
+                f"ул. {rng.choice(STREETS)}, д. {rng.randint(1, 150)}, кв. {rng.randint(1, 300)}",
+                rng.choice(EQUIPMENT),
+                f"{rng.choice(EQUIPMENT)}: {rng.choice(PROBLEMS)}",
+                self.person(), created, assigned, in_works, done,
+            )
+            yield row, history
+
+    def balance_history(self, engineers: List[int], managers: List[int]):
+        """История баланса и итоговый баланс каждого инженера"""
+        rows = []
+        balances = {}
+        for engineer_id in engineers:
+            balance = 0
+            changes = max(0, int(self.rng.gauss(self.args.balance_changes, self.args.balance_changes / 3)))
+            moments = sorted(self.start + timedelta(seconds=self.rng.random() * self.args.days * 86400)
+                             for _ in range(changes))
+            for moment in moments:
+                new_balance = max(0, balance + self.rng.choice((-1, 1, 1, 1)) * self.rng.randint(500, 5000))
+                rows.append((self.rng.choice(managers), engineer_id, balance, new_balance, moment))
+                balance = new_balance
+            balances[engineer_id] = balance
+        return rows, balances
+
+
+def connect(args):
+    if args.dsn:
+        return psycopg2.connect(args.dsn)
+    from config import Settings
+    settings = Settings()
+    return psycopg2.connect(user=settings.USER, password=settings.PASSWORD, host=settings.HOST_NAME,
+                            port=settings.PORT_NAME, database=settings.DB_NAME)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', help='строка подключения libpq; по умолчанию — настройки приложения')
+    parser.add_argument('--requests', type=int, default=100_000, help='количество заявок')
+    parser.add_argument('--engineers', type=int, default=200)
+    parser.add_argument('--operators', type=int, default=20)
+    parser.add_argument('--managers', type=int, default=3)
+    parser.add_argument('--days', type=int, default=730, help='за сколько дней назад создавать заявки')
+    parser.add_argument('--skew', type=float, default=1.0,
+                        help='перекос нагрузки по инженерам (Zipf): 0 — равномерно, 1 — сильный')
+    parser.add_argument('--balance-changes', type=int, default=24, help='в среднем изменений баланса на инженера')
+    parser.add_argument('--password', default='bench', help='пароль всех создаваемых пользователей')
+    parser.add_argument('--login-prefix', default='', help='префикс логинов, чтобы не пересекаться с существующими')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--history-format', choices=('rows', 'compact'), default='rows',
+                        help='формат истории заявок, как REQUEST_HISTORY_FORMAT приложения')
+    parser.add_argument('--truncate', action='store_true',
+                        help='очистить пользователей, заявки и историю перед загрузкой')
+    parser.add_argument('--yes', action='store_true', help='подтверждение для --truncate')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.truncate and not args.yes:
+        print('--truncate удалит все данные в базе; добавьте --yes для подтверждения', file=sys.stderr)
+        return 2
+
+    rng = random.Random(args.seed)
+    gen = Generator(args, rng)
+    started = time.monotonic()
+
+    conn = connect(args)
+    try:
+        with conn.cursor() as cursor:
+            dsn = conn.get_dsn_parameters()
+            print(f"Target: {dsn.get('host')}:{dsn.get('port')}/{dsn.get('dbname')}")
+            if args.truncate:
+                cursor.execute("TRUNCATE request_history, request_change, request_history_buffer, balance_history, request, "
+                               "engineer_profile, users RESTART IDENTITY CASCADE")
+            cursor.execute("INSERT INTO status (status_id, status) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                           (STATUS_DELETED, STATUS_NAMES[STATUS_DELETED]))
+
+            cursor.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM users")
+            user_rows, ids = gen.users(cursor.fetchone()[0])
+            copy_rows(cursor, 'users', ('user_id', 'role_id', 'name', 'login', 'passw', 'phone', 'email'), user_rows)
+            print(f"users: {len(user_rows)}")
+
+            engineers = ids[ROLE_ENGINEER]
+            balance_rows, balances = gen.balance_history(engineers, ids[ROLE_MANAGER])
+            copy_rows(cursor, 'engineer_profile', ('user_id', 'balance', 'schedule'),
+                      ((engineer_id, balances[engineer_id], 'Пн-Пт 9:00-18:00') for engineer_id in engineers))
+            copy_rows(cursor, 'balance_history', ('admin_id', 'engineer_id', 'old_sum', 'new_sum', 'changed_at'),
+                      balance_rows)
+            print(f"engineer_profile: {len(engineers)}, balance_history: {len(balance_rows)}")
+
+            # Порядок инженеров перемешан, чтобы «нагруженные» не совпадали с первыми id
+            shuffled = engineers[:]
+            rng.shuffle(shuffled)
+            chooser = ZipfChooser(shuffled, args.skew, rng)
+
+            cursor.execute("SELECT COALESCE(MAX(request_id), 0) + 1 FROM request")
+            generated = gen.requests(cursor.fetchone()[0], ids[ROLE_OPERATOR], chooser)
+            loaded = history_loaded = 0
+            # Заявки и их история грузятся порциями, чтобы память не росла с объёмом
+            while True:
+                chunk = list(itertools.islice(generated, COPY_CHUNK_ROWS))
+                if not chunk:
+                    break
+                loaded += copy_rows(cursor, 'request', REQUEST_COLUMNS, (row for row, _ in chunk))
+                # Внутри порции история идёт порядком изменений, как её писало бы приложение
+                history = sorted((item for _, items in chunk for item in items), key=lambda item: item[5])
+                if args.history_format == 'compact':
+                    history_loaded += copy_rows(cursor, 'request_change', CHANGE_COLUMNS, compact_history(history))
+                else:
+                    history_loaded += copy_rows(cursor, 'request_history', HISTORY_COLUMNS, history)
+                print(f"request: {loaded}, history: {history_loaded} "
+                      f"({time.monotonic() - started:.0f}s)", flush=True)
+
+            for table, column in (('users', 'user_id'), ('request', 'request_id'),
+                                  ('engineer_profile', 'engin_id'), ('balance_history', 'bh_id')):
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                               f"COALESCE((SELECT MAX({column}) FROM {table}), 1))")
+        conn.commit()
+
+        # ANALYZE вне транзакции загрузки: планировщику нужна статистика по новым данным
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE users, engineer_profile, request, request_history, request_change, balance_history")
+    finally:
+        conn.close()
+
+    prefix = args.login_prefix
+    print(f"Done in {time.monotonic() - started:.0f}s. Logins (password '{args.password}'): "
+          f"{prefix}manager1..{args.managers}, {prefix}operator1..{args.operators}, "
+          f"{prefix}engineer1..{args.engineers}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Проверка планов запросов DAL на большом наборе данных.
+
+Каждый сценарий вызывает метод DAL с характерными параметрами внутри
+DatabaseManager.capture(): запросы выполняются как обычно, запись
+откатывается. Для каждого перехваченного запроса строится
+EXPLAIN (FORMAT JSON) и проверяется:
+- нет Seq Scan по большим таблицам (NO_SEQ_SCAN), если сценарий это не разрешает
+- оценка стоимости не выше потолка сценария
+- используются ожидаемые индексы, если они указаны
+
+    cd backend
+    python -m tools.generate_data --requests 1000000 --truncate --yes
+    python -m tools.plan_check              # все сценарии
+    python -m tools.plan_check -k filter -v # подходящие по имени, с планами
+
+Код выхода 1, если хоть один план нарушает правила. Те же сценарии —
+тесты tests/test_query_plans.py (python -m pytest), они пропускаются,
+если базы нет или данных в ней меньше, чем нужно для осмысленных планов. Подключение — настройки приложения.
+Оценки стоимости зависят от статистики: запускать после ANALYZE
+(tools.generate_data делает его сам). Откатываемые записи (удаление
+пользователя — десятки тысяч строк) оставляют мёртвые версии строк,
+которые раздувают индексы: после частых запусков — VACUUM ANALYZE.
+"""
+import argparse
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+from config import Settings
+from db_manager import REPORTING, DatabaseManager
+from dal.balance_history import BalanceHistoryDAL
+from dal.engineer_profile import EngineerProfileDAL
+from dal.query_builder import RequestFilter
+from dal.request import RequestDAL
+from dal.request_history import RequestHistoryDAL
+from dal.status import StatusDAL
+from dal.users import UserDAL
+
+# Таблицы, которые растут с количеством заявок: полный просмотр на них — регрессия.
+# Почти пустая таблица (история в другом формате, см. audit.py) не в счёт
+NO_SEQ_SCAN = ('request', 'request_history', 'request_change')
+LARGE_TABLE_ROWS = 10_000
+
+# Потолки оценки стоимости: точечные запросы, списки, отчёты
+POINT = 100
+LIST = 2_000
+REPORT = 20_000
+# Массовая запись: стоимость растёт с числом затронутых строк
+BULK = 200_000
+
+
+class MissingDataError(RuntimeError):
+    """В базе нет данных, на которых планы имеет смысл проверять"""
+
+
+class Case(NamedTuple):
+    name: str
+    call: Callable[[Dict[str, Any]], Any]
+    max_cost: float = POINT
+    allow_seq_scan: Sequence[str] = ()
+    uses: Sequence[str] = ()
+
+
+CASES = [
+    # Заявки: экран инженера
+    Case('engineer_active', lambda s: RequestDAL.get_assigned_and_in_works_requests(s['engineer_id']), LIST),
+    Case('engineer_by_day', lambda s: RequestDAL.get_requests_by_engineer(
+        s['engineer_id'], [2, 3, 4], s['engineer_day']), LIST),
+    Case('engineer_completed_first_page', lambda s: RequestDAL.get_completed_requests_with_total(
+        s['engineer_id'], 1, 10), REPORT),
+    Case('engineer_completed_deep_page', lambda s: RequestDAL.get_completed_requests_with_total(
+        s['engineer_id'], 50, 10), REPORT),
+    Case('engineer_completed_count', lambda s: RequestDAL.count_completed_requests(
+        s['engineer_id'], s['month_start'], s['now']), LIST),
+    Case('engineer_update_status', lambda s: RequestDAL.update_request(
+        s['engineer_id'], 1, s['active_request_id'], {'status_id': 3, 'in_works_time': s['now']})),
+    Case('request_by_id', lambda s: RequestDAL.get_request_by_id(s['request_id'])),
+    Case('request_create', lambda s: RequestDAL.create_request(
+        s['operator_id'], 2, '89000000000', 'ул. Проверочная, д. 1', 'Холодильник',
+        'Не охлаждает', 'Проверка Планов', s['engineer_id'], s['now'])),
+    Case('request_history', lambda s: RequestHistoryDAL.get_request_history(s['request_id'])),
+
+    # Заявки: фильтры и отчёты менеджера
+    Case('filter_total_all', lambda s: RequestDAL.get_filtered_requests_total(RequestFilter()),
+         REPORT * 5, allow_seq_scan=('request',)),
+    Case('filter_total_engineer', lambda s: RequestDAL.get_filtered_requests_total(
+        RequestFilter(engineer_ids=[s['engineer_id']])), REPORT),
+    Case('filter_total_active', lambda s: RequestDAL.get_filtered_requests_total(
+        RequestFilter(status_ids=[2, 3])), REPORT),
+    Case('filter_total_last_week', lambda s: RequestDAL.get_filtered_requests_total(
+        RequestFilter(creation_from=s['week_start'], creation_to=s['now'])), REPORT),
+    Case('filter_page_all', lambda s: RequestDAL.get_filtered_requests(RequestFilter(), 1, 20), LIST),
+    Case('filter_page_all_deep', lambda s: RequestDAL.get_filtered_requests(RequestFilter(), 100, 20), LIST),
+    Case('filter_page_engineer', lambda s: RequestDAL.get_filtered_requests(
+        RequestFilter(engineer_ids=[s['engineer_id']]), 1, 20), LIST),
+    Case('filter_page_active', lambda s: RequestDAL.get_filtered_requests(
+        RequestFilter(status_ids=[2, 3]), 1, 20), LIST),
+    Case('filter_page_operator', lambda s: RequestDAL.get_filtered_requests(
+        RequestFilter(operator_id=s['operator_id']), 1, 20), LIST),
+    Case('filter_page_done_sorted', lambda s: RequestDAL.get_filtered_requests(
+        RequestFilter(status_ids=[4], done_from=s['month_start']), 1, 20, sort='-done_time'), LIST),
+    Case('stats_this_month', lambda s: RequestDAL.get_request_stats_this_month(), REPORT),
+    Case('stats_completed_by_engineer', lambda s: RequestDAL.count_all_engineers_completed_requests(
+        s['month_start'], s['now']), REPORT),
+    Case('stats_engineers_page', lambda s: RequestDAL.get_engineers_stats_with_balance_and_requests(1, 20), REPORT),
+    Case('stats_engineers_total', lambda s: RequestDAL.get_total_engineers_count()),
+
+    # Пользователи, профили, баланс
+    Case('user_login', lambda s: UserDAL.authenticate_user(s['engineer_login'], 'wrong password')),
+    Case('user_by_id', lambda s: UserDAL.get_user_by_id(s['engineer_id'])),
+    Case('user_exists', lambda s: UserDAL.user_exists_by_id(s['engineer_id'])),
+    Case('user_role_exists', lambda s: UserDAL.check_role_exists(1)),
+    Case('user_update', lambda s: UserDAL.update_user(s['engineer_id'], phone='89000000000')),
+    Case('user_credentials', lambda s: UserDAL.get_user_login_and_password_by_id(s['engineer_id'])),
+    Case('user_list', lambda s: UserDAL.get_all_users_with_details(), LIST),
+    Case('user_create', lambda s: UserDAL.create_user('Проверка Планов', 'plan-check', 'x', 2)),
+    Case('profile_get', lambda s: EngineerProfileDAL.get_profile(s['engineer_id'])),
+    Case('profile_schedule', lambda s: EngineerProfileDAL.update_schedule(s['engineer_id'], 'Пн-Пт')),
+    Case('balance_get', lambda s: EngineerProfileDAL.get_engineer_balance(s['engineer_id'])),
+    Case('balance_update', lambda s: EngineerProfileDAL.update_engineer_balance(
+        s['manager_id'], s['engineer_id'], 1000)),
+    Case('balance_history', lambda s: BalanceHistoryDAL.get_balance_history(s['engineer_id']), LIST),
+    Case('status_by_id', lambda s: StatusDAL.get_status_by_id(2)),
+
+    # Удаление пользователя одним запросом (api/users.py, delete_user)
+    Case('delete_engineer', lambda s: UserDAL.delete_user(s['quiet_engineer_id']), REPORT,
+         uses=('idx_request_engineer_status_assigned', 'idx_request_operator_id', 'idx_balance_history_admin_id')),
+    Case('delete_operator', lambda s: UserDAL.delete_user(s['operator_id']), BULK, uses=('idx_request_operator_id',)),
+]
+
+
+def sample_params() -> Dict[str, Any]:
+    """
+    Характерные параметры: загруженный инженер (90-й перцентиль по числу
+    заявок — крайние выбросы перекоса дали бы планы, которые не о чем
+    сравнивать), последний день его работы, свежая заявка с историей.
+    Удаление проверяется на наименее загруженном инженере, чтобы
+    откатываемые UPDATE не упирались в statement_timeout.
+    """
+    now = datetime.now().replace(microsecond=0)
+    with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
+        cursor.execute("""
+            WITH load AS (
+                SELECT engineer_id, COUNT(*) AS total,
+                       PERCENT_RANK() OVER (ORDER BY COUNT(*)) AS rank
+                FROM request
+                WHERE engineer_id IS NOT NULL
+                GROUP BY engineer_id
+            )
+            SELECT l.engineer_id, u.login,
+                   (SELECT engineer_id FROM load ORDER BY total LIMIT 1) AS quiet_engineer_id
+            FROM load l JOIN users u ON u.user_id = l.engineer_id
+            WHERE l.rank >= 0.9
+            ORDER BY l.rank
+            LIMIT 1;
+        """)
+        engineer = cursor.fetchone()
+        if engineer is None:
+            raise MissingDataError("No assigned requests found: generate data first (python -m tools.generate_data)")
+        cursor.execute("""
+            SELECT MAX(assigned_time) AS last_day,
+                   MAX(request_id) FILTER (WHERE status_id IN (2, 3)) AS active_request_id
+            FROM request WHERE engineer_id = %s;
+        """, (engineer['engineer_id'],))
+        engineer_requests = cursor.fetchone()
+        # История в любом из форматов (audit.py)
+        cursor.execute("""
+            SELECT GREATEST((SELECT MAX(request_id) FROM request_history),
+                            (SELECT MAX(request_id) FROM request_change)) AS request_id;
+        """)
+        request_id = cursor.fetchone()['request_id']
+        cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s);", (list(NO_SEQ_SCAN),))
+        large_tables = {row['relname'] for row in cursor.fetchall() if row['reltuples'] >= LARGE_TABLE_ROWS}
+        cursor.execute("""
+            SELECT MIN(user_id) FILTER (WHERE role_id = 2) AS operator_id,
+                   MIN(user_id) FILTER (WHERE role_id = 3) AS manager_id
+            FROM users;
+        """)
+        users = cursor.fetchone()
+    return {
+        'engineer_id': engineer['engineer_id'],
+        'engineer_login': engineer['login'],
+        'quiet_engineer_id': engineer['quiet_engineer_id'],
+        'engineer_day': engineer_requests['last_day'].strftime('%Y-%m-%d'),
+        'active_request_id': engineer_requests['active_request_id'],
+        'request_id': request_id,
+        'operator_id': users['operator_id'],
+        'manager_id': users['manager_id'],
+        'large_tables': large_tables,
+        'now': now,
+        'week_start': now - timedelta(days=7),
+        'month_start': now.replace(day=1, hour=0, minute=0, second=0),
+    }
+
+
+def plan_nodes(plan: Dict) -> Iterator[Dict]:
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def explain(query: str, params: Any) -> Dict:
+    with DatabaseManager.get_cursor(readonly=True, pool=REPORTING) as cursor:
+        sql = cursor.mogrify(query, params).decode()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        return cursor.fetchone()['QUERY PLAN'][0]['Plan']
+
+
+def check_plan(plan: Dict, case: Case, large_tables: Set[str]) -> List[str]:
+    problems = []
+    used = set()
+    for node in plan_nodes(plan):
+        relation = node.get('Relation Name')
+        if node['Node Type'] == 'Seq Scan' and relation in large_tables and relation not in case.allow_seq_scan:
+            problems.append(f"Seq Scan on {relation}")
+        if 'Index Name' in node:
+            used.add(node['Index Name'])
+    if plan['Total Cost'] > case.max_cost:
+        problems.append(f"cost {plan['Total Cost']:.0f} over ceiling {case.max_cost}")
+    for index in case.uses:
+        if index not in used:
+            problems.append(f"index {index} not used")
+    return problems
+
+
+def format_plan(plan: Dict, depth: int = 0) -> Iterator[str]:
+    target = plan.get('Index Name') or plan.get('Relation Name') or ''
+    yield (f"{'  ' * depth}-> {plan['Node Type']}{f' on {target}' if target else ''}"
+           f"  (cost={plan['Total Cost']:.0f} rows={plan['Plan Rows']})")
+    for child in plan.get('Plans', ()):
+        yield from format_plan(child, depth + 1)
+
+
+class Result(NamedTuple):
+    method: str
+    plan: Optional[Dict]
+    problems: List[str]
+
+    def report(self, case: Case, verbose: bool = False) -> Iterator[str]:
+        if self.plan is None:
+            yield f"FAIL {case.name} {self.method}: {'; '.join(self.problems)}"
+            return
+        status = 'FAIL' if self.problems else 'ok  '
+        yield (f"{status} {case.name} {self.method} cost={self.plan['Total Cost']:.0f}"
+               f"{': ' + '; '.join(self.problems) if self.problems else ''}")
+        if verbose or self.problems:
+            yield from format_plan(self.plan, 1)
+
+
+def check_case(case: Case, params: Dict[str, Any]) -> List[Result]:
+    """Вызывает сценарий с откатом записи и проверяет план каждого его запроса"""
+    with DatabaseManager.capture() as statements:
+        case.call(params)
+    if not statements:
+        return [Result('-', None, ['no statements executed'])]
+    results = []
+    for method, query, query_params in statements:
+        try:
+            plan = explain(query, query_params)
+        except Exception as e:
+            results.append(Result(method, None, [f"EXPLAIN failed: {e}"]))
+            continue
+        results.append(Result(method, plan, check_plan(plan, case, params['large_tables'])))
+    return results
+
+
+def run_case(case: Case, params: Dict[str, Any], verbose: bool) -> bool:
+    results = check_case(case, params)
+    for result in results:
+        for line in result.report(case, verbose):
+            print(line)
+    return not any(result.problems for result in results)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='pattern', help='только сценарии, в имени которых есть подстрока')
+    parser.add_argument('-v', '--verbose', action='store_true', help='печатать план каждого запроса')
+    args = parser.parse_args(argv)
+
+    # Ошибки DAL видны в выводе проверки, остальной лог не нужен
+    logging.basicConfig(level=logging.ERROR)
+    DatabaseManager.initialize(Settings())
+    try:
+        try:
+            params = sample_params()
+        except MissingDataError as e:
+            print(e, file=sys.stderr)
+            return 2
+        cases = [case for case in CASES if not args.pattern or args.pattern in case.name]
+        failed = [case.name for case in cases if not run_case(case, params, args.verbose)]
+    finally:
+        DatabaseManager.close_all()
+
+    print(f"{len(cases) - len(failed)}/{len(cases)} cases passed"
+          f"{': failed ' + ', '.join(failed) if failed else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,339 @@
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Виды спанов, как в OpenTelemetry (SpanKind в OTLP)
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Span:
+    """Участок работы внутри трассировки: HTTP-запрос, DAL-метод, SQL-запрос"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind',
+                 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str] = None,
+                 kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+        trace.spans.append(self)
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    """Все спаны одного HTTP-запроса; экспортируются вместе после его завершения"""
+
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Дочерний спан текущего. Вне трассируемого запроса ничего не создаёт
+    и отдаёт None, поэтому стоит почти ничего.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def traced(cls):
+    """
+    Декоратор класса DAL: каждый статический метод выполняется в спане
+    'ИмяКласса.метод'. Вне трассировки — прямой вызов.
+    """
+    for name, attr in list(vars(cls).items()):
+        if not isinstance(attr, staticmethod) or name.startswith('_'):
+            continue
+        func = attr.__func__
+        span_name = f"{cls.__name__}.{name}"
+
+        def wrap(func=func, span_name=span_name):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return func(*args, **kwargs)
+                with span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+
+        setattr(cls, name, staticmethod(wrap()))
+    return cls
+
+
+def parse_traceparent(header: Optional[str]):
+    """W3C traceparent -> (trace_id, parent_id, sampled) или None"""
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class FileExporter:
+    """Спаны построчно в JSONL-файл"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for item in spans:
+                f.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OTLPHttpExporter:
+    """Отправка в OpenTelemetry Collector (или совместимый приёмник) по OTLP/HTTP в JSON"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def _span(self, item: Span) -> Dict[str, Any]:
+        data = {
+            'traceId': item.trace.trace_id,
+            'spanId': item.span_id,
+            'name': item.name,
+            'kind': item.kind,
+            'startTimeUnixNano': str(item.start_ns),
+            'endTimeUnixNano': str(item.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in item.attributes.items()],
+            'status': {'code': 2, 'message': item.error} if item.error else {'code': 1},
+        }
+        if item.parent_id:
+            data['parentSpanId'] = item.parent_id
+        return data
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    {'key': 'service.name', 'value': {'stringValue': self.service_name}},
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'remont.tracing'},
+                    'spans': [self._span(item) for item in spans],
+                }],
+            }],
+        }
+        req = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload, default=str).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class BatchSpanProcessor:
+    """
+    Экспорт в фоновом потоке, чтобы запись файла или сеть не задерживали ответ.
+    Если очередь переполнена, трассировка отбрасывается. Поток создаётся
+    лениво в процессе, который экспортирует (после fork в воркере gunicorn).
+    """
+
+    def __init__(self, exporter, max_queue: int = 2048):
+        self.exporter = exporter
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=max_queue)
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                threading.Thread(target=self._run, name='trace-exporter', daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, spans: List[Span]) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            # Забираем всё накопившееся, чтобы отправить одним пакетом
+            while len(batch) < 512:
+                try:
+                    batch = batch + self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Trace export failed ({len(batch)} spans): {e}")
+
+
+class Tracer:
+    """Трассировка HTTP-запросов: решение о выборке, корневой спан, экспорт"""
+
+    def __init__(self, processor: BatchSpanProcessor, sample_rate: float = 1.0):
+        self.processor = processor
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_settings(cls, config: Settings) -> Optional["Tracer"]:
+        if config.TRACE_EXPORTER == 'none':
+            return None
+        if config.TRACE_EXPORTER == 'file':
+            exporter = FileExporter(config.TRACE_FILE)
+        elif config.TRACE_EXPORTER == 'otlp':
+            exporter = OTLPHttpExporter(config.TRACE_OTLP_ENDPOINT, config.TRACE_SERVICE_NAME)
+        else:
+            raise ValueError(f"Unknown trace exporter: {config.TRACE_EXPORTER}")
+        return cls(BatchSpanProcessor(exporter), config.TRACE_SAMPLE_RATE)
+
+    def start_request(self, name: str, traceparent: Optional[str], attributes: Dict[str, Any]):
+        """
+        Открывает серверный спан. Входящий traceparent с флагом sampled
+        трассируется всегда, иначе — с вероятностью sample_rate (идентификатор
+        трассировки из заголовка при этом сохраняется, чтобы совпадать с логами nginx).
+        Возвращает токен для finish_request или None, если запрос не трассируется.
+        """
+        parent = parse_traceparent(traceparent)
+        trace_id, parent_id, sampled = parent if parent else (None, None, False)
+        if not sampled and random.random() >= self.sample_rate:
+            return None
+        root = Span(Trace(trace_id), name, parent_id, SERVER, attributes)
+        return _current_span.set(root)
+
+    def finish_request(self, token, error: Optional[BaseException] = None) -> None:
+        root = _current_span.get()
+        _current_span.reset(token)
+        if root is None:
+            return
+        if error is not None:
+            root.error = f"{type(error).__name__}: {error}"
+        root.end()
+        for item in root.trace.spans:
+            item.end()
+        self.processor.submit(root.trace.spans)
+
+
+def init_tracing(app, config: Settings) -> None:
+    """Спан на каждый HTTP-запрос; DAL и SQL добавляют дочерние спаны сами"""
+    tracer = Tracer.from_settings(config)
+    if tracer is None:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def start_trace():
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        g._trace_token = tracer.start_request(
+            f"{request.method} {route}",
+            request.headers.get('traceparent'),
+            {'http.method': request.method, 'http.route': route, 'http.target': request.full_path.rstrip('?')},
+        )
+
+    @app.after_request
+    def tag_trace(response):
+        current = _current_span.get()
+        if current is not None and g.get('_trace_token') is not None:
+            current.set('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = current.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc):
+        token = g.pop('_trace_token', None)
+        if token is not None:
+            tracer.finish_request(token, exc)
+
+    logger.info(f"Request tracing enabled: {config.TRACE_EXPORTER}")
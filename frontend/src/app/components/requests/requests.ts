@@ -96,11 +96,39 @@ export class Requests implements OnInit {
   toggleDetails(requestId: number): void {
     this.openedDetailsId =
       this.openedDetailsId === requestId ? null : requestId;
+    if (this.openedDetailsId !== null) {
+      this.loadDetail(requestId);
+    }
+  }
+
+  // Список приходит без описания — догружаем полную карточку по запросу
+  loadDetail(requestId: number, onLoaded?: (detail: any) => void): void {
+    const requests = this.managerService.getStoredRequests();
+    const stored = requests.find((r) => r.request_id === requestId);
+    if (stored && stored.description !== undefined) {
+      onLoaded?.(stored);
+      return;
+    }
+
+    this.managerService.getRequestDetail(requestId).subscribe((detail) => {
+      if (!detail) return;
+      const index = requests.findIndex((r) => r.request_id === requestId);
+      if (index !== -1) {
+        requests[index] = { ...requests[index], ...detail };
+        this.managerService.updateRequests([...requests]);
+      }
+      onLoaded?.(detail);
+    });
   }
 
   startEditing(request: any): void {
     this.editingRequestId = request.request_id;
     this.editableRequest = { ...request };
+    this.loadDetail(request.request_id, (detail) => {
+      if (this.editingRequestId === request.request_id) {
+        this.editableRequest = { ...detail, ...this.editableRequest, description: detail.description };
+      }
+    });
   }
 
   cancelEdit(): void {
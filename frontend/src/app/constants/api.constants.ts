@@ -7,6 +7,7 @@ export const API = {
   REQUESTS: `${BASE_URL}/requests`, // Создание новой заявки
   FILTER_REQUESTS: `${BASE_URL}/requests/filter`, // Получение заявок по фильтру
   ENGINEERS_STATS: `${BASE_URL}/requests/engineers/stats`, // Получение статистики по инженерам
+  REQUEST_DETAIL: (id: number) => `${BASE_URL}/requests/${id}`, // Полная карточка заявки (с описанием)
   REQUEST_BY_ID: (id: number) => `${BASE_URL}/requests/engineer/${id}`, // Обновление заявки по ID
   REQUEST_HISTORY: (id: number) => `${BASE_URL}/requests/history/${id}`, // Получение истории изменений по заявке
   BALANCE_UPDATE: (id: number) => `${BASE_URL}/balance/${id}`, // Обновление баланса инженера
@@ -34,6 +34,24 @@ export interface CompletedRequestsResponse {
   total: number;
 }
 
+// Карточки инженера показывают описание, поэтому запрашиваем его явно:
+// по умолчанию списки приходят без description
+const ENGINEER_CARD_FIELDS = [
+  'request_id',
+  'operator_id',
+  'engineer_id',
+  'status_id',
+  'customer_name',
+  'phone',
+  'address',
+  'equipment',
+  'description',
+  'creation_date',
+  'assigned_time',
+  'in_works_time',
+  'done_time',
+].join(',');
+
 @Injectable({
   providedIn: 'root',
 })
@@ -44,13 +62,13 @@ export class EngineerService {
 
   getEngineerRequests(date: string): Observable<EngineerRequestsResponse> {
     const headers = this.createAuthHeaders();
-    const url = `${this.baseUrl}?date=${encodeURIComponent(date)}`;
+    const url = `${this.baseUrl}?date=${encodeURIComponent(date)}&fields=${ENGINEER_CARD_FIELDS}`;
     return this.http.get<EngineerRequestsResponse>(url, { headers });
   }
 
   getEngineerActive(): Observable<EngineerRequestsResponse> {
     const headers = this.createAuthHeaders();
-    const url = `${this.baseUrl}/active`;
+    const url = `${this.baseUrl}/active?fields=${ENGINEER_CARD_FIELDS}`;
     return this.http.get<EngineerRequestsResponse>(url, { headers });
   }
 
@@ -76,7 +94,7 @@ export class EngineerService {
 
   getCompletedRequests(page: number): Observable<CompletedRequestsResponse> {
     const headers = this.createAuthHeaders();
-    const url = `${this.baseUrl}/completed/${page}`;
+    const url = `${this.baseUrl}/completed/${page}?fields=${ENGINEER_CARD_FIELDS}`;
     return this.http.get<CompletedRequestsResponse>(url, { headers });
   }
 
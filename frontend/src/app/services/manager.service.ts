@@ -105,6 +105,19 @@ export class ManagerService {
     return this.updateRequest(requestId, { engineer_id: engineerId });
   }
 
+  getRequestDetail(requestId: number): Observable<any> {
+    return this.http
+      .get(API.REQUEST_DETAIL(requestId), {
+        headers: this.getAuthHeaders(),
+      })
+      .pipe(
+        catchError((error) => {
+          console.error('Ошибка при загрузке заявки:', error);
+          return of(null);
+        })
+      );
+  }
+
   getRequestHistory(requestId: number): Observable<any> {
     return this.http
       .get(API.REQUEST_HISTORY(requestId), {